@@ -0,0 +1,130 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPT_DIR))
+
+from etf_parser import BACKENDS, available_backends, detect_encoding  # noqa: E402
+
+FIXTURE_DIR = os.path.join(SCRIPT_DIR, 'fixtures')
+
+
+def load_pages(fixture_dir):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(fixture_dir, '*.html'))):
+        with open(path, 'rb') as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
+
+
+def bench_backend(name, pages, min_time):
+    parse = BACKENDS[name]
+    encodings = [detect_encoding(content) for _, content in pages]
+    count = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time:
+        for (_, content), encoding in zip(pages, encodings):
+            parse(content, encoding)
+        count += len(pages)
+        elapsed = time.perf_counter() - start
+    return {
+        'backend': name,
+        'pages': count,
+        'seconds': round(elapsed, 4),
+        'pages_per_sec': round(count / elapsed, 1),
+        'ms_per_page': round(elapsed / count * 1000, 3),
+    }
+
+
+def pool_sizes(limit=None):
+    """1, 2, 4, ... 코어 수까지 (코어 수가 2의 거듭제곱이 아니면 마지막에 코어 수)"""
+    limit = limit or os.cpu_count() or 1
+    sizes = []
+    n = 1
+    while n < limit:
+        sizes.append(n)
+        n *= 2
+    return sizes + [limit]
+
+
+def bench_pool(workers, pages, min_pages=2000):
+    """ParsePool(workers)에 페이지를 하나씩 넘겨 처리량을 잰다 (갱신할 때와 같은 경로)
+
+    프로세스를 띄우는 시간은 빼고, 모든 결과가 돌아올 때까지의 시간을 잰다.
+    """
+    from concurrent.futures import wait
+    from parse_pool import ParsePool
+
+    contents = [content for _, content in pages]
+    count = max(min_pages, len(contents))
+    with ParsePool(workers) as pool:
+        pool.start()
+        start = time.perf_counter()
+        futures = [pool.submit(contents[i % len(contents)]) for i in range(count)]
+        wait(futures)
+        elapsed = time.perf_counter() - start
+        parse_seconds = sum(future.result()[1] for future in futures)
+    return {
+        'workers': workers,
+        'pages': count,
+        'seconds': round(elapsed, 4),
+        'pages_per_sec': round(count / elapsed, 1),
+        # 프로세스들이 실제로 파싱에 쓴 시간의 비율 (1에 가까울수록 전달 비용이 작다)
+        'busy': round(parse_seconds / (elapsed * workers), 3),
+    }
+
+
+def bench_pool_scaling(pages, sizes=None, min_pages=2000):
+    """프로세스 수별 처리량과 1개일 때 대비 배율(speedup), 배율/프로세스 수(efficiency)"""
+    results = [bench_pool(workers, pages, min_pages) for workers in sizes or pool_sizes()]
+    base = results[0]['pages_per_sec'] / results[0]['workers']
+    for result in results:
+        result['speedup'] = round(result['pages_per_sec'] / base, 2)
+        result['efficiency'] = round(result['speedup'] / result['workers'], 2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ETF 페이지 파서 처리량 측정")
+    parser.add_argument('--fixtures', default=FIXTURE_DIR, help="저장된 페이지(.html) 디렉터리")
+    parser.add_argument('--backend', action='append', help="측정할 백엔드 (기본: 설치된 전체)")
+    parser.add_argument('--min-time', type=float, default=1.0, help="백엔드별 최소 측정 시간(초)")
+    parser.add_argument('--pool', nargs='?', const='', default=None,
+                        help="프로세스 풀 처리량도 잰다 (프로세스 수 목록, 예: 1,2,4,8. 생략하면 코어 수까지)")
+    parser.add_argument('--pool-pages', type=int, default=2000, help="프로세스 수마다 파싱할 페이지 수")
+    args = parser.parse_args()
+
+    pages = load_pages(args.fixtures)
+    if not pages:
+        sys.exit(f"fixture 페이지가 없습니다: {args.fixtures}")
+
+    backends = args.backend or available_backends()
+
+    # 모든 백엔드가 같은 결과를 내는지 먼저 확인
+    reference = None
+    for name in backends:
+        results = [BACKENDS[name](content, detect_encoding(content)) for _, content in pages]
+        if reference is None:
+            reference = results
+        elif results != reference:
+            sys.exit(f"{name} 백엔드 결과가 {backends[0]} 백엔드와 다릅니다")
+
+    report = {
+        'benchmark': 'parser',
+        'fixture_pages': len(pages),
+        'results': [bench_backend(name, pages, args.min_time) for name in backends],
+    }
+    if args.pool is not None:
+        sizes = [int(n) for n in args.pool.split(',')] if args.pool else None
+        report['cpus'] = os.cpu_count()
+        report['pool'] = bench_pool_scaling(pages, sizes, args.pool_pages)
+    print(json.dumps(report, ensure_ascii=False, indent=4))
+
+
+if __name__ == '__main__':
+    main()
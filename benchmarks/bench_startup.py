@@ -0,0 +1,145 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+
+# 프로그램 시작 시간 측정: 새 프로세스에서 main을 불러와 창을 띄우고
+# 첫 화면이 그려질 때까지 / DB 확인과 검색 색인까지 끝날 때까지의 시간을 잰다.
+#
+#   python benchmarks/bench_startup.py --sizes 1000,10000
+#
+# snapshot: 종료할 때 저장한 stock.snapshot이 있는 보통의 실행
+# db:       스냅샷 없이 stock.db에서 읽는 실행 (첫 실행, 비정상 종료 후 등)
+MODES = ('snapshot', 'db')
+
+
+def _child(db_path, snapshot_path, spawned_at):
+    """자식 프로세스: 측정값을 JSON 한 줄로 출력"""
+    start = time.perf_counter()
+    sys.path.insert(0, ROOT_DIR)
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtCore import QObject, QEvent, QTimer
+
+    import main
+    imported = time.perf_counter()
+    main.DB_FILE_PATH = db_path
+    main.JSON_FILE_PATH = os.path.join(os.path.dirname(db_path), 'missing.json')
+    main.SNAPSHOT_FILE_PATH = snapshot_path
+    main.WARM_REFRESH = False
+
+    app = QApplication([])
+    marks = {}
+
+    class PaintWatcher(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Type.Paint and 'first_paint' not in marks:
+                marks['first_paint'] = time.perf_counter()
+                marks['rows_at_first_paint'] = viewer.proxy.rowCount()
+            return False
+
+    finish_startup = main.ETFDataViewer.finish_startup
+
+    def finished(self):
+        finish_startup(self)
+        self.proxy.search_index.build()
+        marks['ready'] = time.perf_counter()
+
+    main.ETFDataViewer.finish_startup = finished
+    viewer = main.ETFDataViewer()
+    constructed = time.perf_counter()
+    watcher = PaintWatcher()
+    viewer.table.viewport().installEventFilter(watcher)
+    viewer.show()
+
+    def ms(value):
+        return round((value - start) * 1000, 2)
+
+    def poll():
+        if 'first_paint' not in marks or 'ready' not in marks:
+            QTimer.singleShot(1, poll)
+            return
+        print(json.dumps({
+            'spawn_ms': round((time.time() - spawned_at) * 1000 - (time.perf_counter() - start) * 1000, 2),
+            'import_ms': ms(imported),
+            'window_ms': ms(constructed),
+            'first_paint_ms': ms(marks['first_paint']),
+            'ready_ms': ms(marks['ready']),
+            'rows_at_first_paint': marks['rows_at_first_paint'],
+            'rows': len(viewer.model.store),
+        }))
+        sys.stdout.flush()
+        # 창을 닫으면 stock.json/스냅샷을 저장하므로 그대로 끝낸다
+        os._exit(0)
+
+    QTimer.singleShot(0, poll)
+    app.exec()
+
+def _prepare(tmp_dir, size, mode):
+    sys.path.insert(0, ROOT_DIR)
+    sys.path.insert(0, SCRIPT_DIR)
+    from make_fixtures import synthetic_records
+    from etf_db import ETFDatabase
+    from etf_table import ColumnStore, save_snapshot
+
+    db_path = os.path.join(tmp_dir, f'startup_{size}.db')
+    snapshot_path = os.path.join(tmp_dir, f'startup_{size}_{mode}.snapshot')
+    if not os.path.exists(db_path):
+        records = synthetic_records(size)
+        with ETFDatabase(db_path) as db:
+            db.upsert(records)
+    if mode == 'snapshot':
+        with ETFDatabase(db_path) as db:
+            save_snapshot(ColumnStore.from_records(db.records()), snapshot_path, db.revision())
+    elif os.path.exists(snapshot_path):
+        os.remove(snapshot_path)
+    return db_path, snapshot_path
+
+
+def measure_startup(size, mode, tmp_dir, repeat=3):
+    """repeat번 새 프로세스로 띄워서 항목별 중앙값"""
+    db_path, snapshot_path = _prepare(tmp_dir, size, mode)
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'),
+               KOR_ETF_WARM_REFRESH='0')
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.check_output(
+            [sys.executable, os.path.abspath(__file__), '--child', db_path, snapshot_path, repr(time.time())],
+            env=env, cwd=ROOT_DIR, text=True)
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    result = {'name': f'startup.{mode}', 'rows': size, 'repeat': repeat}
+    for key in runs[0]:
+        result[key] = statistics.median(run[key] for run in runs)
+    result['seconds'] = round(result['first_paint_ms'] / 1000, 6)  # run_benchmarks --compare 기준값
+    return result
+
+
+def bench_startup(sizes, tmp_dir, repeat=3):
+    try:
+        import PyQt6.QtWidgets  # noqa: F401
+    except ImportError as e:
+        return [{'name': 'startup', 'skipped': str(e)}]
+    return [measure_startup(size, mode, tmp_dir, repeat) for size in sizes for mode in MODES]
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        _child(sys.argv[2], sys.argv[3], float(sys.argv[4]))
+        return
+    parser = argparse.ArgumentParser(description="프로그램 시작 시간 벤치마크 (Qt offscreen)")
+    parser.add_argument('--sizes', default='10,1000,10000', help="표의 행 수")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = bench_startup([int(size) for size in args.sizes.split(',')], tmp_dir, args.repeat)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
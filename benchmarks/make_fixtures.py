@@ -0,0 +1,213 @@
+import json
+import os
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+FIXTURE_DIR = os.path.join(SCRIPT_DIR, 'fixtures')
+
+# item/main.naver 페이지 구조(EUC-KR)를 본뜬 템플릿.
+# 실제 페이지와 같은 위치에 같은 선택자로 값이 들어가도록 구성하고,
+# 뉴스/시세 영역을 채워 넣어 실제 페이지 크기(약 100KB)에 맞춘다.
+PAGE_TEMPLATE = """<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
+<html lang="ko">
+<head>
+<meta http-equiv="Content-Type" content="text/html; charset=euc-kr">
+<title>{name} : 네이버페이 증권</title>
+<link rel="stylesheet" type="text/css" href="https://ssl.pstatic.net/imgstock/static.pc/20240101/css/newstock.css">
+<script type="text/javascript">
+var itemCode = "{code}";
+// <![CDATA[
+function toggleTab(id) {{ if (document.getElementById(id)) {{ return "<div class=\\"first\\">"; }} }}
+// ]]>
+</script>
+</head>
+<body>
+<div id="wrap">
+<div id="header"><h1><a href="https://finance.naver.com/">네이버페이 증권</a></h1></div>
+<div id="middle" class="new_totalinfo">
+	<div class="h_company">
+		<div class="wrap_company">
+			<h2><a href="#" onclick="clickcr(this, 'sop.title', '', '', event);window.location.reload();">{name}</a></h2>
+			<div class="description">
+				<img src="https://ssl.pstatic.net/imgstock/images/ico_etf.gif" alt="ETF">
+				<span class="code">{code}</span>
+				<span class="date">2024.10.18 <em>기준</em>(장마감)</span>
+			</div>
+		</div>
+	</div>
+	<div class="rate_info">
+		<div class="today"><p class="no_today"><em class="no_up"><span class="blind">{price}</span></em></p></div>
+	</div>
+</div>
+<div id="content" class="new_totalinfo">
+{filler}
+<div class="section etf_asset">
+	<h4 class="h_sub sub_tit5"><em>ETF 개요</em></h4>
+	<table class="tbl_type1" summary="ETF 개요">
+		<caption>ETF 개요</caption>
+		<tbody>
+		<tr><th scope="row">기초지수</th><td>{index}</td></tr>
+		<tr><th scope="row">유형</th><td>해외주식</td></tr>
+		<tr><th scope="row">펀드보수</th><td><em>{fee}</em></td></tr>
+		</tbody>
+	</table>
+	<table class="tbl_type1 tbl_type1_2" summary="운용사 정보">
+		<caption>운용사 정보</caption>
+		<tbody>
+		<tr><th scope="row">상장일</th><td>2020.08.07</td></tr>
+		<tr><th scope="row">자산운용사</th><td>{manager}</td></tr>
+		</tbody>
+	</table>
+</div>
+</div>
+<div id="aside">
+<div class="aside_invest_info">
+<div id="tab_con1">
+	<div class="first">
+		<table summary="시가총액 정보">
+		<caption>시가총액 정보</caption>
+		<tr class="strong">
+			<th scope="row">시가총액</th>
+			<td><em id="_market_sum">{market_cap_html}</em>억원</td>
+		</tr>
+		<tr><th scope="row">상장주식수</th><td><em>221,350,000</em></td></tr>
+		</table>
+	</div>
+	<div class="gray">
+		<table summary="NAV 정보">
+		<tr><th scope="row">NAV</th><td><em>19,721</em></td></tr>
+		</table>
+	</div>
+	<div>
+		<table summary="기간수익률 정보">
+		<caption>기간수익률 정보</caption>
+		<tr><th scope="row">1개월 수익률</th><td><em class="up">+1.21%</em></td></tr>
+		<tr><th scope="row">3개월 수익률</th><td><em class="up">+4.82%</em></td></tr>
+		<tr><th scope="row">6개월 수익률</th><td><em class="up">{six_month}</em></td></tr>
+		<tr><th scope="row">1년 수익률</th><td><em class="up">{one_year}</em></td></tr>
+		</table>
+	</div>
+</div>
+</div>
+</div>
+<div id="footer"><address>&copy; NAVER Corp.</address></div>
+</div>
+</body>
+</html>
+"""
+
+FILLER_BLOCK = """<div class="section new_bbs">
+	<h4 class="h_sub sub_tit7"><em>뉴스공시</em></h4>
+	<ul class="news_section">
+{items}
+	</ul>
+</div>
+<table class="type2" summary="일별 시세"><tbody>
+{rows}
+</tbody></table>
+"""
+
+
+def render_filler(seed, size=80000):
+    items = []
+    rows = []
+    i = 0
+    while sum(len(x) for x in items) + sum(len(x) for x in rows) < size:
+        items.append(
+            f'\t\t<li><span class="txt"><a href="/item/news_read.naver?article_id={seed}{i:05d}">'
+            f'[마감시황] 코스피 {i % 7}일 연속 상승&hellip; 외국인 순매수 {i * 13 % 997}억원</a></span>'
+            f'<span class="date">10.{i % 28 + 1:02d}</span></li>')
+        rows.append(
+            f'<tr><td><span class="tah p10 gray03">2024.10.{i % 28 + 1:02d}</span></td>'
+            f'<td class="num"><span class="tah p11">{19000 + i * 7 % 900:,}</span></td>'
+            f'<td class="num"><span class="tah p11 red02">{i * 3 % 120:,}</span></td>'
+            f'<td class="num"><span class="tah p11">{1200000 + i * 311:,}</span></td></tr>')
+        i += 1
+    return FILLER_BLOCK.format(items='\n'.join(items), rows='\n'.join(rows))
+
+
+def market_cap_html(value):
+    # 실제 페이지처럼 조 단위와 억 단위 사이에 줄바꿈/탭이 섞여 있다
+    if '조' in value:
+        trillion, rest = value.split('조', 1)
+        return f'\n\t\t\t\t\t\t{trillion}조\n\t\t\t\t\t\t{rest}\n\t\t\t\t\t'
+    return f'\n\t\t\t\t\t\t{value}\n\t\t\t\t\t'
+
+
+def render_page(record, index_name='S&amp;P 500'):
+    html = PAGE_TEMPLATE.format(
+        name=record['ETF이름'].replace('&', '&amp;'),
+        code=record['종목코드'],
+        price='19,735',
+        index=index_name,
+        fee=record['펀드보수'],
+        manager=record['자산운용사'],
+        market_cap_html=market_cap_html(record['시가총액']),
+        six_month=record['6개월 수익률'],
+        one_year=record['1년 수익률'],
+        filler=render_filler(record['종목코드']))
+    return html.encode('cp949')
+
+
+def parse_market_cap(value):
+    jo, _, eok = value.rpartition('조')
+    return int(jo.replace(',', '') or 0) * 10000 + int(eok.replace(',', '') or 0)
+
+
+def render_etf_item_list(records, extra=900):
+    """sise/etfItemList 응답(EUC-KR JSON)을 본뜬 목록. 실제 목록처럼 약 900종목으로 채운다"""
+    items = []
+    for i, record in enumerate(records):
+        items.append({
+            'itemcode': record['종목코드'], 'etfTabCode': 4, 'itemname': record['ETF이름'],
+            'nowVal': 19735 - i * 100, 'risefall': '2', 'changeVal': 35, 'changeRate': 0.18,
+            'nav': 19721.5, 'threeMonthEarnRate': 4.82, 'quant': 1234567, 'amonut': 24318,
+            'marketSum': parse_market_cap(record['시가총액']),
+        })
+    for i in range(extra):
+        items.append({
+            'itemcode': f'{400000 + i:06d}', 'etfTabCode': 1 + i % 7, 'itemname': f'합성 ETF {i:03d}',
+            'nowVal': 10000 + i, 'risefall': '3', 'changeVal': 0, 'changeRate': 0.0,
+            'nav': 10000.0 + i, 'threeMonthEarnRate': round(i % 17 - 8.5, 2), 'quant': i * 10,
+            'amonut': i, 'marketSum': 100 + i * 7,
+        })
+    payload = {'resultCode': 'success', 'result': {'etfItemList': items}}
+    return json.dumps(payload, ensure_ascii=False).encode('cp949')
+
+
+def synthetic_records(count, json_path=os.path.join(ROOT_DIR, 'stock.json')):
+    """stock.json 레코드를 돌려 쓰며 종목코드만 다른 count개의 레코드"""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        base = json.load(f)
+    records = []
+    for i in range(count):
+        record = dict(base[i % len(base)])
+        record['종목코드'] = f'{100000 + i:06d}'
+        record['ETF이름'] = f"{record['ETF이름']} #{i}"
+        records.append(record)
+    return records
+
+
+def main(json_path=os.path.join(ROOT_DIR, 'stock.json')):
+    with open(json_path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    expected = {}
+    for record in records:
+        path = os.path.join(FIXTURE_DIR, f"item_main_{record['종목코드']}.html")
+        with open(path, 'wb') as f:
+            f.write(render_page(record))
+        expected[record['종목코드']] = record
+
+    with open(os.path.join(FIXTURE_DIR, 'etf_item_list.json'), 'wb') as f:
+        f.write(render_etf_item_list(records))
+
+    with open(os.path.join(FIXTURE_DIR, 'expected.json'), 'w', encoding='utf-8') as f:
+        json.dump(expected, f, ensure_ascii=False, indent=4)
+    print(f"{len(records)}개 fixture 생성: {FIXTURE_DIR}")
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,224 @@
+import argparse
+import datetime
+import glob
+import gzip
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(SCRIPT_DIR, 'fixtures')
+
+_FIXTURE_RE = re.compile(r'item_main_(\w+)\.html$')
+
+
+class FixtureSet:
+    """저장된 item/main.naver 페이지와 ETF 목록 응답
+
+    fixture가 없는 종목코드를 요청하면 첫 번째 페이지의 코드만 바꿔서 만든다.
+    """
+
+    def __init__(self, fixture_dir=FIXTURE_DIR):
+        self.pages = {}
+        for path in sorted(glob.glob(os.path.join(fixture_dir, 'item_main_*.html'))):
+            with open(path, 'rb') as f:
+                self.pages[_FIXTURE_RE.search(path).group(1)] = f.read()
+        if not self.pages:
+            raise FileNotFoundError(f"fixture 페이지가 없습니다: {fixture_dir}")
+        self.template_code, self.template = next(iter(self.pages.items()))
+        list_path = os.path.join(fixture_dir, 'etf_item_list.json')
+        self.etf_list = None
+        if os.path.exists(list_path):
+            with open(list_path, 'rb') as f:
+                self.etf_list = f.read()
+        self._lock = threading.Lock()
+
+    def page(self, code):
+        with self._lock:
+            page = self.pages.get(code)
+            if page is None:
+                page = self.template.replace(self.template_code.encode(), code.encode())
+                self.pages[code] = page
+            return page
+
+
+class SiseDaySet:
+    """item/sise_day.naver 일별 시세 페이지 (종목코드마다 정해진 가짜 가격, 한 페이지 10일)
+
+    end 날짜부터 거꾸로 평일 days일치가 있다. end를 바꾸면 새 거래일이 생긴 것처럼 동작한다.
+    """
+
+    ROWS_PER_PAGE = 10
+
+    def __init__(self, end=None, days=2500):
+        self.end = end or datetime.date.today()
+        self.days = days
+
+    def trading_days(self):
+        days = []
+        day = self.end
+        while len(days) < self.days:
+            if day.weekday() < 5:
+                days.append(day)
+            day -= datetime.timedelta(days=1)
+        return days  # 최신 날짜가 먼저
+
+    @staticmethod
+    def close(code, day):
+        seed = int(hashlib.md5(code.encode()).hexdigest()[:6], 16)
+        n = day.toordinal()
+        return 10000 + seed % 20000 + int(2000 * math.sin(n / 37.0)) + (n - 730000) // 3
+
+    def page(self, code, page):
+        days = self.trading_days()
+        last_page = max(1, math.ceil(len(days) / self.ROWS_PER_PAGE))
+        rows = days[(page - 1) * self.ROWS_PER_PAGE:page * self.ROWS_PER_PAGE]
+        parts = ['<html><head><meta http-equiv="Content-Type" content="text/html; charset=euc-kr"></head><body>',
+                 '<table cellspacing="0" class="type2">',
+                 '<tr><th>날짜</th><th>종가</th><th>전일비</th><th>시가</th><th>고가</th><th>저가</th><th>거래량</th></tr>',
+                 '<tr><td colspan="7" height="8"></td></tr>']
+        for day in rows:
+            close = self.close(code, day)
+            diff = close - self.close(code, day - datetime.timedelta(days=1))
+            open_ = close - diff // 2
+            parts.append(
+                '<tr onmouseover="mouseOver(this)" onmouseout="mouseOut(this)">'
+                f'<td align="center"><span class="tah p10 gray03">{day:%Y.%m.%d}</span></td>'
+                f'<td class="num"><span class="tah p11">{close:,}</span></td>'
+                '<td class="num"><em class="bu_p bu_pup"><span class="blind">상승</span></em>'
+                f'<span class="tah p11 red02">\n\t\t\t\t{abs(diff):,}\n\t\t\t\t</span></td>'
+                f'<td class="num"><span class="tah p11">{open_:,}</span></td>'
+                f'<td class="num"><span class="tah p11">{max(open_, close) + 50:,}</span></td>'
+                f'<td class="num"><span class="tah p11">{min(open_, close) - 50:,}</span></td>'
+                f'<td class="num"><span class="tah p11">{100000 + day.toordinal() % 977 * 131:,}</span></td></tr>')
+        parts.append('</table><table summary="페이지 네비게이션 리스트" class="Nnavi" align="center"><tr>')
+        first = (page - 1) // 10 * 10 + 1
+        for n in range(first, min(first + 10, last_page + 1)):
+            parts.append(f'<td><a href="/item/sise_day.naver?code={code}&amp;page={n}">{n}</a></td>')
+        if page < last_page:
+            parts.append(f'<td class="pgRR"><a href="/item/sise_day.naver?code={code}&amp;page={last_page}">맨뒤</a></td>')
+        parts.append('</tr></table></body></html>')
+        return ''.join(parts).encode('cp949')
+
+
+class MockNaverHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    fixtures = None
+    sise_day = None
+    latency = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        parts = urlsplit(self.path)
+        if parts.path == '/item/main.naver':
+            code = parse_qs(parts.query).get('code', [''])[0]
+            if not code:
+                return self._send(404, b'', 'text/plain')
+            return self._send(200, self.fixtures.page(code), 'text/html;charset=EUC-KR')
+        if parts.path == '/item/sise_day.naver':
+            query = parse_qs(parts.query)
+            code = query.get('code', [''])[0]
+            if not code:
+                return self._send(404, b'', 'text/plain')
+            page = int(query.get('page', ['1'])[0])
+            return self._send(200, self.sise_day.page(code, page), 'text/html;charset=EUC-KR')
+        if parts.path.startswith('/api/sise/etfItemList') and self.fixtures.etf_list is not None:
+            return self._send(200, self.fixtures.etf_list, 'application/json;charset=EUC-KR')
+        return self._send(404, b'not found', 'text/plain')
+
+    def _send(self, status, body, content_type):
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if 'gzip' in (self.headers.get('Accept-Encoding') or '') and body:
+            body = gzip.compress(body, compresslevel=5)
+            encoding = 'gzip'
+        else:
+            encoding = None
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if status == 200:
+            self.send_header('ETag', etag)
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MockNaverServer:
+    """finance.naver.com 대신 쓰는 로컬 HTTP 서버 (벤치마크/테스트용)
+
+        with MockNaverServer() as server:
+            url = server.item_url('360750')
+    """
+
+    def __init__(self, fixture_dir=FIXTURE_DIR, latency=0.0, port=0, sise_end=None, sise_days=2500):
+        self.sise_day = SiseDaySet(sise_end, sise_days)
+        handler = type('Handler', (MockNaverHandler,), {
+            'fixtures': FixtureSet(fixture_dir), 'sise_day': self.sise_day, 'latency': latency})
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def item_url(self, code):
+        return f"{self.base_url}/item/main.naver?code={code}"
+
+    @property
+    def sise_day_url(self):
+        return f"{self.base_url}/item/sise_day.naver?code={{code}}&page={{page}}"
+
+    @property
+    def etf_list_url(self):
+        return f"{self.base_url}/api/sise/etfItemList.nhn?etfType=0"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="fixture를 내려주는 로컬 네이버 금융 대역 서버")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="응답마다 추가할 지연(초)")
+    parser.add_argument('--fixtures', default=FIXTURE_DIR)
+    args = parser.parse_args()
+
+    server = MockNaverServer(args.fixtures, args.latency, args.port)
+    print(f"{server.base_url}/item/main.naver?code=360750")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
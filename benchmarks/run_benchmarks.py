@@ -0,0 +1,346 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, SCRIPT_DIR)
+
+from bench_parser import FIXTURE_DIR, bench_backend, bench_pool_scaling, load_pages  # noqa: E402
+from bench_startup import bench_startup  # noqa: E402
+from make_fixtures import synthetic_records  # noqa: E402
+from mock_server import MockNaverServer  # noqa: E402
+
+# 오프라인에서 돌아가는 벤치마크 모음. 결과는 JSON으로 저장해서 커밋 간에 비교한다.
+#
+#   python benchmarks/run_benchmarks.py -o bench.json
+#   python benchmarks/run_benchmarks.py --compare bench.json
+
+
+def measure(func, repeat=5, setup=None):
+    """func를 repeat번 실행한 시간(초)의 최소/중앙값"""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {'min': round(min(times), 6), 'median': round(statistics.median(times), 6), 'repeat': repeat}
+
+
+def bench_parse(min_time):
+    from etf_parser import DEFAULT_BACKEND, available_backends
+    pages = load_pages(FIXTURE_DIR)
+    results = []
+    for name in available_backends():
+        result = bench_backend(name, pages, min_time)
+        results.append({'name': f'parse.{name}', 'default': name == DEFAULT_BACKEND,
+                        'pages_per_sec': result['pages_per_sec'], 'ms_per_page': result['ms_per_page']})
+    return results
+
+
+def bench_parse_pool(sizes, min_pages):
+    results = bench_pool_scaling(load_pages(FIXTURE_DIR), sizes, min_pages)
+    return [{'name': 'parse_pool', 'rows': result['workers'], **result} for result in results]
+
+
+def bench_refresh(sizes, workers, latency):
+    import etf_core
+    from etf_cache import ETFCache, set_default_cache
+    from naver_client import NaverClient, set_default_client
+
+    results = []
+    with MockNaverServer(latency=latency) as server:
+        for size in sizes:
+            urls = [server.item_url(f'{100000 + i:06d}') for i in range(size)]
+            for label, warm in (('cold', False), ('conditional', True)):
+                client = NaverClient(pool_size=workers, rate=1e9, burst=1e9)
+                set_default_client(client)
+                if warm:
+                    # 한 번 받아 두고 캐시만 비운 상태: 조건부 GET(304)이 쓰인다
+                    set_default_cache(ETFCache(path=None))
+                    etf_core.refresh(urls, workers, bulk=False)
+                set_default_cache(ETFCache(path=None))
+                start = time.perf_counter()
+                records, errors = etf_core.refresh(urls, workers, bulk=False)
+                elapsed = time.perf_counter() - start
+                results.append({
+                    'name': f'refresh.{label}', 'rows': size, 'workers': workers,
+                    'latency': latency, 'seconds': round(elapsed, 4),
+                    'rows_per_sec': round(size / elapsed, 1), 'errors': len(errors),
+                    'http': client.stats.as_dict(),
+                })
+                client.close()
+    set_default_client(None)
+    set_default_cache(None)
+    return results
+
+
+def bench_replay(sizes, workers, tmp_dir):
+    """대역 서버 응답을 녹화해 두고 녹화 파일만으로 전체 갱신 (네트워크/속도 제한 없음)"""
+    import etf_replay
+    from naver_client import NaverClient
+
+    results = []
+    for size in sizes:
+        path = os.path.join(tmp_dir, f'replay_{size}.ketf')
+        with MockNaverServer() as server:
+            urls = [server.item_url(f'{100000 + i:06d}') for i in range(size)]
+            etf_replay.record(path, urls, workers, bulk=False,
+                              client=NaverClient(pool_size=workers, rate=1e9, burst=1e9))
+        runs, errors = etf_replay.replay(path, workers, repeat=3, bulk=False)
+        best = min(runs, key=lambda run: run['seconds'])
+        results.append({'name': 'replay.refresh', 'rows': size, 'workers': workers,
+                        'archive_bytes': os.path.getsize(path), 'errors': len(errors), **best})
+    return results
+
+
+def bench_json(sizes, tmp_dir):
+    import etf_core
+    from etf_db import ETFDatabase
+
+    results = []
+    for size in sizes:
+        records = synthetic_records(size)
+        path = os.path.join(tmp_dir, f'stock_{size}.json')
+        save = measure(lambda: etf_core.save_records(records, path))
+        load = measure(lambda: etf_core.load_records(path))
+        results.append({'name': 'json.save', 'rows': size, **save})
+        results.append({'name': 'json.load', 'rows': size, **load})
+
+        db_path = os.path.join(tmp_dir, f'stock_{size}.db')
+        db = ETFDatabase(db_path)
+        results.append({'name': 'db.upsert_all', 'rows': size, **measure(lambda: db.upsert(records))})
+        results.append({'name': 'db.upsert_one', 'rows': size, **measure(lambda: db.upsert(records[:1]))})
+        results.append({'name': 'db.records', 'rows': size, **measure(db.records)})
+        db.close()
+    return results
+
+
+# 검색창에 한 글자씩 입력하는 순서 (글자마다 결과를 다시 계산한다)
+KEYSTROKES = ['T', 'TI', 'TIG', 'TIGE', 'TIGER', 'TIGER ', 'TIGER 미', 'TIGER 미국', 'ㅁ', 'ㅁㄱ', '1000']
+
+
+def bench_search(sizes):
+    from etf_search import SearchIndex
+    from etf_table import ColumnStore
+
+    results = []
+    for size in sizes:
+        store = ColumnStore.from_records(synthetic_records(size))
+        results.append({'name': 'search.build_index', 'rows': size,
+                        **measure(lambda: SearchIndex(store).build(), repeat=3)})
+        index = SearchIndex(store)
+        index.build()  # 화면에서는 시작할 때 미리 만든다 (키 입력 시간에 넣지 않음)
+        worst = 0.0
+        for text in KEYSTROKES:
+            for column in (None, '1년 수익률'):
+                start = time.perf_counter()
+                index.view(text, column, descending=True)
+                worst = max(worst, time.perf_counter() - start)
+        results.append({'name': 'search.keystroke_worst', 'rows': size, 'seconds': round(worst, 6)})
+        results.append({'name': 'search.sort_numeric', 'rows': size,
+                        **measure(lambda: (index._orders.clear(), index.order('시가총액')))})
+    return results
+
+
+def bench_alerts(sizes, rule_count=50):
+    """규칙 알림: 갱신 묶음에서 바뀐 행 비율(1%, 100%)별 평가 시간 (규칙 rule_count개)"""
+    from etf_alerts import AlertEngine, compile_rule
+
+    fields = ['시가총액', '펀드보수', '6개월 수익률', '1년 수익률']
+    templates = ["{field} >= {n}", "{field} change% <= -{n}", "{field} change >= {n}", "{field} changed"]
+    rules = [compile_rule(templates[i // len(fields) % len(templates)].format(field=fields[i % len(fields)], n=i % 20))
+             for i in range(rule_count)]
+    results = []
+    for size in sizes:
+        base = synthetic_records(size)
+        for fraction in (0.01, 1.0):
+            count = max(1, int(size * fraction))
+
+            def changed_batch(step):
+                batch = []
+                for record in base[:count]:
+                    record = dict(record)
+                    record['1년 수익률'] = f"{step % 40 - 10:.2f}%"
+                    batch.append(record)
+                return batch
+
+            engine = AlertEngine(rules, log_path=None)
+            engine.seed(base)
+            batches = [changed_batch(step) for step in range(5)]
+            steps = iter(batches)
+            results.append({'name': 'alerts.evaluate', 'rows': size, 'changed': count, 'rules': rule_count,
+                            **measure(lambda: engine.evaluate(next(steps)), repeat=len(batches))})
+    return results
+
+
+def bench_qt(sizes, tmp_dir):
+    """Qt offscreen 플랫폼에서 load_data_from_json / save_data_to_json / 테이블 채우기"""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    try:
+        from PyQt6.QtWidgets import QApplication
+    except ImportError as e:
+        return [{'name': 'qt', 'skipped': str(e)}]
+
+    import main
+    app = QApplication.instance() or QApplication([])
+    results = []
+    for size in sizes:
+        records = synthetic_records(size)
+        main.JSON_FILE_PATH = os.path.join(tmp_dir, f'qt_{size}.json')
+        main.DB_FILE_PATH = os.path.join(tmp_dir, f'qt_{size}.db')
+        main.SNAPSHOT_FILE_PATH = os.path.join(tmp_dir, f'qt_{size}.snapshot')
+        main.WARM_REFRESH = False
+        with open(main.JSON_FILE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False)
+
+        viewer = main.ETFDataViewer()
+        viewer.show()
+        app.processEvents()
+
+        def populate():
+            viewer.model.set_records(records)
+            viewer.table.viewport().repaint()
+            app.processEvents()
+
+        results.append({'name': 'qt.load_data_from_json', 'rows': size,
+                        **measure(viewer.load_data_from_json)})
+        results.append({'name': 'qt.save_data_to_json', 'rows': size,
+                        **measure(lambda: viewer.save_data_to_json(records))})
+        results.append({'name': 'qt.populate_table', 'rows': size, **measure(populate)})
+
+        # 갱신 결과 반영: 전체 종목이 돌아오고 그중 10%만 시가총액이 바뀐 경우
+        refreshed = [dict(record) for record in records]
+        rounds = iter(range(1, 10 ** 6))
+
+        def change_some():
+            n = next(rounds)
+            for record in refreshed[::10]:
+                record['시가총액'] = f'{n:,}'
+
+        def apply_refresh():
+            viewer.model.upsert_records(refreshed, insert=False)
+            viewer.table.viewport().repaint()
+            app.processEvents()
+
+        results.append({'name': 'qt.apply_refresh', 'rows': size, 'changed': len(refreshed[::10]),
+                        **measure(apply_refresh, setup=change_some)})
+
+        def type_query():
+            for text in KEYSTROKES:
+                viewer.search_input.setText(text)
+                viewer.table.viewport().repaint()
+                app.processEvents()
+            viewer.search_input.clear()
+
+        results.append({'name': 'qt.search_keystrokes', 'rows': size,
+                        'keystrokes': len(KEYSTROKES), **measure(type_query, repeat=3)})
+        viewer.close()
+        app.processEvents()
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_key(result):
+    return (result['name'], result.get('rows'))
+
+
+def result_value(result):
+    for key in ('median', 'seconds', 'ms_per_page'):
+        if key in result:
+            return result[key]
+    return None
+
+
+def compare(report, baseline_path):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {result_key(r): r for r in json.load(f)['results']}
+    print(f"{'benchmark':<28}{'rows':>8}{'before':>12}{'after':>12}{'ratio':>8}", file=sys.stderr)
+    for result in report['results']:
+        before = baseline.get(result_key(result))
+        old, new = (result_value(before) if before else None), result_value(result)
+        if old and new:
+            print(f"{result['name']:<28}{result.get('rows') or '':>8}{old:>12.4f}{new:>12.4f}"
+                  f"{new / old:>8.2f}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="kor_etf 벤치마크 (오프라인)")
+    parser.add_argument('-o', '--output', help="결과 JSON 파일 (기본: 표준출력)")
+    parser.add_argument('--compare', help="이전 결과 JSON과 비교해서 출력")
+    parser.add_argument('--only', action='append',
+                        choices=['parse', 'parse_pool', 'refresh', 'replay', 'json', 'search', 'alerts', 'qt', 'startup'], help="일부만 실행")
+    parser.add_argument('--sizes', default='10,1000,10000', help="JSON/테이블 행 수")
+    parser.add_argument('--refresh-sizes', default='10,100', help="갱신 벤치마크 종목 수")
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.0, help="대역 서버 응답 지연(초)")
+    parser.add_argument('--parse-workers', help="파싱 프로세스 풀 벤치마크의 프로세스 수 (기본: 1,2,4,...코어 수)")
+    parser.add_argument('--pool-pages', type=int, default=2000, help="프로세스 수마다 파싱할 페이지 수")
+    parser.add_argument('--min-time', type=float, default=1.0, help="파서 벤치마크 최소 시간(초)")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    refresh_sizes = [int(size) for size in args.refresh_sizes.split(',')]
+    only = set(args.only or ['parse', 'parse_pool', 'refresh', 'replay', 'json', 'search', 'alerts', 'qt', 'startup'])
+    parse_workers = [int(n) for n in args.parse_workers.split(',')] if args.parse_workers else None
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if 'parse' in only:
+            results += bench_parse(args.min_time)
+        if 'parse_pool' in only:
+            results += bench_parse_pool(parse_workers, args.pool_pages)
+        if 'refresh' in only:
+            results += bench_refresh(refresh_sizes, args.workers, args.latency)
+        if 'replay' in only:
+            results += bench_replay(sizes, args.workers, tmp_dir)
+        if 'json' in only:
+            results += bench_json(sizes, tmp_dir)
+        if 'search' in only:
+            results += bench_search(sizes)
+        if 'alerts' in only:
+            results += bench_alerts(sizes)
+        if 'qt' in only:
+            results += bench_qt(sizes, tmp_dir)
+        if 'startup' in only:
+            results += bench_startup(sizes, tmp_dir)
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'results': results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,326 @@
+import argparse
+import json
+import math
+import operator
+import os
+import re
+import sys
+import threading
+import time
+
+from etf_parser import FIELDS
+from etf_search import NUMERIC_SORT_COLUMNS, numeric_key
+
+# 갱신된 값에 대한 규칙 알림 (보수 변경, 1년 수익률 20% 돌파, 시가총액 5% 넘게 감소 등).
+#
+# 규칙은 alerts.json에 적고 처음 한 번만 해석해 둔다. 갱신이 오면 값이 바뀐 행의
+# 바뀐 열에 걸린 규칙만 확인하므로 비용은 (바뀐 행 수)에 비례하고 전체 행 x 규칙 수와는 무관하다.
+#
+#   [
+#     {"rule": "펀드보수 changed"},
+#     {"rule": "1년 수익률 >= 20", "name": "1년 20% 돌파"},
+#     {"rule": "시가총액 change% <= -5", "cooldown": 3600},
+#     {"rule": "6개월 수익률 < 0", "codes": ["360750", "133690"]}
+#   ]
+#
+#   <열> changed            값이 바뀌면
+#   <열> <비교> <숫자>       조건을 만족하지 않다가 만족하게 되면 (넘어설 때 한 번)
+#   <열> change <비교> <숫자>   직전 값과의 차이 (수익률은 %p)
+#   <열> change% <비교> <숫자>  직전 값 대비 변화율(%)
+#
+#   python etf_alerts.py rules          # 규칙 파일 확인
+#   python etf_alerts.py log --tail 20  # 최근 알림
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ALERTS_PATH = os.environ.get('KOR_ETF_ALERTS', os.path.join(SCRIPT_DIR, 'alerts.json'))
+ALERT_LOG_PATH = os.environ.get('KOR_ETF_ALERT_LOG', os.path.join(SCRIPT_DIR, 'alerts.log'))
+
+# 같은 규칙/종목의 알림은 이 시간(초) 안에 다시 내지 않는다 (규칙마다 "cooldown"으로 바꿀 수 있음)
+DEFAULT_COOLDOWN = int(os.environ.get('KOR_ETF_ALERT_COOLDOWN', '3600'))
+# 같은 규칙/종목/값의 알림은 이 시간(초) 안에는 쿨다운이 지나도 다시 내지 않는다
+DEDUPE_SECONDS = 24 * 3600
+
+_COMPARE = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le,
+            '==': operator.eq, '!=': operator.ne}
+_RULE_RE = re.compile(
+    r'^\s*(?P<field>.+?)\s+(?:(?P<changed>changed)|(?:(?P<delta>change%?)\s*)?'
+    r'(?P<op>>=|<=|==|!=|>|<)\s*(?P<value>[-+]?\d+(?:\.\d+)?))\s*$')
+
+
+class RuleError(ValueError):
+    """규칙을 해석할 수 없다"""
+
+
+class Rule:
+    """한 번 해석해 둔 규칙. check(이전 값, 새 값)이 알림 문구나 None을 돌려준다"""
+
+    def __init__(self, text, name=None, codes=None, cooldown=DEFAULT_COOLDOWN):
+        match = _RULE_RE.match(text)
+        if not match:
+            raise RuleError(f"규칙을 해석할 수 없습니다: {text!r}")
+        self.text = text.strip()
+        self.name = name or self.text
+        self.field = match.group('field')
+        if self.field not in FIELDS:
+            raise RuleError(f"알 수 없는 열 {self.field!r} (가능한 열: {', '.join(FIELDS)})")
+        self.codes = frozenset(str(code) for code in codes) if codes else None
+        self.cooldown = float(cooldown)
+        if match.group('changed'):
+            self.check = self._changed
+            return
+        if self.field not in NUMERIC_SORT_COLUMNS:
+            raise RuleError(f"{self.field}은(는) 숫자 열이 아니라서 changed만 쓸 수 있습니다")
+        self.compare = _COMPARE[match.group('op')]
+        self.threshold = float(match.group('value'))
+        self.check = {None: self._cross, 'change': self._delta, 'change%': self._ratio}[match.group('delta')]
+
+    def __repr__(self):
+        return f"Rule({self.text!r})"
+
+    def _number(self, value):
+        return numeric_key(self.field, value)
+
+    def _changed(self, old, new):
+        return f"{self.field} {old} → {new}"
+
+    def _cross(self, old, new):
+        after = self._number(new)
+        if math.isnan(after) or not self.compare(after, self.threshold):
+            return None
+        before = self._number(old)
+        if not math.isnan(before) and self.compare(before, self.threshold):
+            return None  # 이미 넘어서 있었다
+        return f"{self.field} {old} → {new} ({self.text})"
+
+    def _delta(self, old, new):
+        before, after = self._number(old), self._number(new)
+        if math.isnan(before) or math.isnan(after) or not self.compare(after - before, self.threshold):
+            return None
+        return f"{self.field} {old} → {new} ({after - before:+.4g})"
+
+    def _ratio(self, old, new):
+        before, after = self._number(old), self._number(new)
+        if math.isnan(before) or math.isnan(after) or before == 0:
+            return None
+        change = (after - before) / abs(before) * 100
+        if not self.compare(change, self.threshold):
+            return None
+        return f"{self.field} {old} → {new} ({change:+.2f}%)"
+
+
+def compile_rule(spec):
+    """'1년 수익률 >= 20' 또는 {"rule": ..., "name", "codes", "cooldown"} -> Rule"""
+    if isinstance(spec, str):
+        return Rule(spec)
+    if not isinstance(spec, dict) or 'rule' not in spec:
+        raise RuleError(f"규칙에는 'rule'이 있어야 합니다: {spec!r}")
+    return Rule(spec['rule'], spec.get('name'), spec.get('codes'), spec.get('cooldown', DEFAULT_COOLDOWN))
+
+
+def load_rules(path=ALERTS_PATH):
+    """규칙 파일(JSON 목록)을 읽어 해석한다. 파일이 없으면 빈 목록"""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        specs = json.load(f)
+    if not isinstance(specs, list):
+        raise RuleError(f"{path}: 규칙 목록(JSON 배열)이어야 합니다")
+    return [compile_rule(spec) for spec in specs]
+
+
+class Alert:
+    """알림 하나"""
+
+    def __init__(self, rule, record, old, message, ts):
+        self.rule = rule
+        self.code = record.get('종목코드', '')
+        self.name = record.get('ETF이름', '')
+        self.field = rule.field
+        self.old = old
+        self.new = record.get(rule.field, '')
+        self.message = message
+        self.ts = ts
+
+    def __str__(self):
+        return f"[{self.rule.name}] {self.code} {self.name}: {self.message}"
+
+    def as_dict(self):
+        return {'ts': round(self.ts, 3), 'rule': self.rule.name, 'code': self.code, 'name': self.name,
+                'field': self.field, 'old': self.old, 'new': self.new, 'message': self.message}
+
+
+class AlertStats:
+    """평가한 행/규칙 수와 낸 알림 수"""
+
+    def __init__(self):
+        self.rows = 0
+        self.checks = 0
+        self.alerts = 0
+        self.cooldown = 0
+        self.duplicates = 0
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+class AlertEngine:
+    """바뀐 행만 받아 규칙을 확인하는 알림 엔진
+
+    종목마다 마지막으로 본 값을 들고 있다가, evaluate(records)로 들어온 행에서
+    값이 바뀐 열에 걸린 규칙만 확인한다. 처음 보는 종목은 기준값으로만 기록한다.
+    알림은 로그 파일에 한 줄(JSON)씩 남기고 notify(alerts)로 넘긴다. 여러 스레드에서 불러도 된다.
+    """
+
+    def __init__(self, rules=(), log_path=ALERT_LOG_PATH, notify=None, clock=time.time):
+        self.rules = list(rules)
+        self.log_path = log_path
+        self.notify = notify
+        self.clock = clock
+        self.last = {}    # 종목코드 -> 열 -> 마지막으로 본 값
+        self.fired = {}   # (규칙, 종목코드) -> (알림 시각, 그때 값)
+        self.stats = AlertStats()
+        self._lock = threading.Lock()
+        # 열 -> 모든 종목에 거는 규칙, (종목코드, 열) -> 그 종목에만 거는 규칙
+        self._by_field = {}
+        self._by_code = {}
+        for rule in self.rules:
+            if rule.codes is None:
+                self._by_field.setdefault(rule.field, []).append(rule)
+            else:
+                for code in rule.codes:
+                    self._by_code.setdefault((code, rule.field), []).append(rule)
+        self._fields = [field for field in FIELDS
+                        if field in self._by_field or any(key[1] == field for key in self._by_code)]
+
+    @classmethod
+    def from_file(cls, path=ALERTS_PATH, **kwargs):
+        """규칙 파일로 만든다. 규칙이 하나도 없으면 None"""
+        rules = load_rules(path)
+        return cls(rules, **kwargs) if rules else None
+
+    def __len__(self):
+        return len(self.rules)
+
+    def seed(self, records):
+        """알림 없이 기준값만 기록한다 (시작할 때 표에 있는 값)"""
+        with self._lock:
+            for record in records:
+                code = record.get('종목코드')
+                if code:
+                    self.last[code] = {field: record.get(field) for field in self._fields}
+
+    def forget(self, codes):
+        with self._lock:
+            for code in codes:
+                self.last.pop(code, None)
+
+    def evaluate(self, records):
+        """바뀐 행(레코드)들을 확인해서 새로 낸 알림 목록을 돌려준다"""
+        now = self.clock()
+        alerts = []
+        with self._lock:
+            for record in records:
+                code = record.get('종목코드')
+                if not code:
+                    continue
+                self.stats.rows += 1
+                last = self.last.get(code)
+                if last is None:
+                    self.last[code] = {field: record.get(field) for field in self._fields}
+                    continue
+                for field in self._fields:
+                    new = record.get(field)
+                    old = last.get(field)
+                    if new is None or new == old:
+                        continue
+                    last[field] = new
+                    if old is None:
+                        continue
+                    for rule in self._by_field.get(field, []) + self._by_code.get((code, field), []):
+                        self.stats.checks += 1
+                        message = rule.check(old, new)
+                        if message and self._admit(rule, code, new, now):
+                            alerts.append(Alert(rule, record, old, message, now))
+            self.stats.alerts += len(alerts)
+        if alerts:
+            self.log(alerts)
+            if self.notify is not None:
+                self.notify(alerts)
+        return alerts
+
+    def _admit(self, rule, code, value, now):
+        """쿨다운/중복이면 False. 낼 알림이면 기록해 두고 True"""
+        previous = self.fired.get((rule, code))
+        if previous is not None:
+            ts, fired_value = previous
+            if now - ts < rule.cooldown:
+                self.stats.cooldown += 1
+                return False
+            if fired_value == value and now - ts < DEDUPE_SECONDS:
+                self.stats.duplicates += 1
+                return False
+        self.fired[(rule, code)] = (now, value)
+        return True
+
+    def log(self, alerts):
+        if not self.log_path:
+            return
+        lines = ''.join(json.dumps(alert.as_dict(), ensure_ascii=False) + '\n' for alert in alerts)
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+
+
+def read_log(path=ALERT_LOG_PATH, tail=None):
+    """알림 로그 (오래된 것부터 dict 목록)"""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    if tail:
+        lines = lines[-tail:]
+    return [json.loads(line) for line in lines if line.strip()]
+
+
+def format_alerts(alerts, limit=5):
+    """알림 여러 개를 알림 창 한 번에 보여줄 문구로"""
+    lines = [str(alert) for alert in alerts[:limit]]
+    if len(alerts) > limit:
+        lines.append(f"... 외 {len(alerts) - limit}건")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="갱신 값 규칙 알림")
+    parser.add_argument('--rules', default=ALERTS_PATH, help="규칙 파일 (기본 alerts.json)")
+    parser.add_argument('--log', default=ALERT_LOG_PATH, help="알림 로그 (기본 alerts.log)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('rules', help="규칙 파일을 해석해서 보여준다")
+    p = commands.add_parser('log', help="최근 알림")
+    p.add_argument('--tail', type=int, default=20)
+    p.add_argument('--code', help="이 종목만")
+    args = parser.parse_args(argv)
+
+    if args.command == 'rules':
+        try:
+            rules = load_rules(args.rules)
+        except (OSError, ValueError) as e:
+            print(f"{args.rules}: {e}", file=sys.stderr)
+            return 1
+        if not rules:
+            print(f"규칙이 없습니다: {args.rules}", file=sys.stderr)
+        for rule in rules:
+            target = ', '.join(sorted(rule.codes)) if rule.codes else "전체"
+            print(f"{rule.name}\t{rule.text}\t{target}\t쿨다운 {rule.cooldown:g}초")
+        return 0
+
+    entries = read_log(args.log)
+    if args.code:
+        entries = [entry for entry in entries if entry['code'] == args.code]
+    for entry in entries[-args.tail:]:
+        when = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['ts']))
+        print(f"{when}\t[{entry['rule']}] {entry['code']} {entry['name']}: {entry['message']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
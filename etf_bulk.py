@@ -0,0 +1,130 @@
+import codecs
+import json
+import os
+import threading
+
+from naver_client import default_client
+from etf_cache import default_cache
+from etf_parser import detect_encoding
+
+# 상장된 모든 ETF의 코드/이름/현재가/NAV/시가총액/3개월 수익률을 한 번에 주는 목록 API
+ETF_LIST_URL = os.environ.get(
+    'KOR_ETF_LIST_URL',
+    "https://finance.naver.com/api/sise/etfItemList.nhn?etfType=0&targetColumn=market_sum&sortOrder=desc")
+
+# 목록 API로는 ETF이름/종목코드/시가총액만 채울 수 있고,
+# 나머지(자산운용사, 펀드보수, 6개월/1년 수익률)는 종목 페이지에서 받는다.
+
+# 이 개수 이상을 한꺼번에 갱신할 때만 목록 API를 먼저 부른다
+BULK_MIN_TARGETS = int(os.environ.get('KOR_ETF_BULK_MIN', '20'))
+
+_LIST_KEY = '"etfItemList"'
+
+
+def iter_etf_items(chunks, encoding='cp949'):
+    """목록 API 응답을 받는 대로 etfItemList 배열의 항목을 하나씩 돌려준다
+
+    전체 응답을 메모리에 모으지 않고, 완성된 항목만 json으로 해석한다.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)('replace')
+    json_decoder = json.JSONDecoder()
+    buffer = ''
+    in_list = False
+    for chunk in _with_end_marker(chunks):
+        buffer += decoder.decode(chunk or b'', final=chunk is None)
+        if not in_list:
+            start = buffer.find(_LIST_KEY)
+            bracket = buffer.find('[', start) if start >= 0 else -1
+            if bracket < 0:
+                # 키가 청크 경계에 걸쳐 있을 수 있으므로 끝부분만 남긴다
+                buffer = buffer[start:] if start >= 0 else buffer[-len(_LIST_KEY):]
+                continue
+            buffer = buffer[bracket + 1:]
+            in_list = True
+
+        while True:
+            buffer = buffer.lstrip(' \t\r\n,')
+            if buffer.startswith(']'):
+                return
+            try:
+                item, end = json_decoder.raw_decode(buffer)
+            except ValueError:
+                break  # 항목이 아직 다 도착하지 않았다
+            yield item
+            buffer = buffer[end:]
+
+
+def _with_end_marker(chunks):
+    yield from chunks
+    yield None  # 디코더에 끝을 알린다
+
+
+def bulk_record(item):
+    """목록 API 항목 하나를 get_etf_data 결과 형식의 일부 필드로 변환"""
+    from etf_normalize import format_market_cap
+
+    record = {
+        'ETF이름': str(item.get('itemname', '')).strip(),
+        '종목코드': str(item.get('itemcode', '')).strip(),
+    }
+    if item.get('marketSum') is not None:
+        record['시가총액'] = format_market_cap(item['marketSum'])  # 억원 단위
+    return record
+
+
+def load_universe(url=ETF_LIST_URL, client=None, chunk_size=16 * 1024):
+    """상장 ETF 전체를 한 번의 요청으로 받아 {종목코드: 일부 필드 dict} 반환"""
+    client = client or default_client()
+    universe = {}
+    with client.open_stream(url) as response:
+        encoding = detect_encoding(b'', response.headers.get('Content-Type'))
+        for item in iter_etf_items(response.iter_content(chunk_size), encoding):
+            record = bulk_record(item)
+            if record['종목코드']:
+                universe[record['종목코드']] = record
+    return universe
+
+
+def prime_cache(codes=None, url=ETF_LIST_URL, cache=None, client=None):
+    """목록 API 결과로 캐시의 시가총액/이름을 채운다 (codes가 주어지면 그 종목만)
+
+    캐시된 다른 필드가 아직 유효하면 이후 get_etf_data는 종목 페이지를 받지 않는다.
+    캐시가 오프라인 모드면 요청하지 않고 ConnectionError.
+    """
+    cache = cache if cache is not None else default_cache()
+    if cache.offline:
+        raise ConnectionError("오프라인 모드: 상장 ETF 목록을 받을 수 없습니다")
+    universe = load_universe(url, client)
+    wanted = universe.keys() if codes is None else [code for code in codes if code in universe]
+    for code in wanted:
+        cache.put(code, universe[code])
+    return universe
+
+
+class BulkPrimedFetch:
+    """처음 호출될 때 한 번만 목록 API로 캐시를 채우고, 그 다음 fetch(url)를 호출
+
+    여러 워커 스레드에서 동시에 불려도 목록 요청은 한 번만 보낸다.
+    목록을 받지 못하면 그냥 종목별 수집으로 진행한다.
+    """
+
+    def __init__(self, fetch, codes=None, url=ETF_LIST_URL):
+        self.fetch = fetch
+        self.codes = codes
+        self.url = url
+        self.universe = None
+        self.error = None
+        self._lock = threading.Lock()
+
+    def prime(self):
+        with self._lock:
+            if self.universe is None and self.error is None:
+                try:
+                    self.universe = prime_cache(self.codes, self.url)
+                except (OSError, ValueError) as e:
+                    self.error = e
+        return self.universe
+
+    def __call__(self, url):
+        self.prime()
+        return self.fetch(url)
@@ -0,0 +1,232 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_FILE_PATH = os.path.join(SCRIPT_DIR, 'etf_cache.json')
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+# 필드별 유효 시간(초). 시가총액은 장중에 계속 바뀌고, 보수/운용사는 거의 바뀌지 않는다.
+FIELD_TTL = {
+    '자산운용사': 30 * DAY,
+    'ETF이름': 7 * DAY,
+    '종목코드': 365 * DAY,
+    '시가총액': 10 * MINUTE,
+    '펀드보수': 7 * DAY,
+    '6개월 수익률': 30 * MINUTE,
+    '1년 수익률': 30 * MINUTE,
+}
+DEFAULT_TTL = 10 * MINUTE
+DEFAULT_MAX_ENTRIES = 2000
+
+_CODE_RE = re.compile(r'[?&]code=(\w+)')
+
+
+def code_from_url(url):
+    """종목 페이지 URL에서 종목코드를 꺼낸다 (없으면 None)"""
+    match = _CODE_RE.search(url)
+    return match.group(1) if match else None
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stale_served = 0   # 네트워크 오류/오프라인으로 오래된 값을 돌려준 횟수
+        self.evictions = 0
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    def summary(self):
+        return (f"캐시 적중 {self.hits}, 미적중 {self.misses}, "
+                f"오프라인 제공 {self.stale_served}")
+
+
+class ETFCache:
+    """종목코드별 get_etf_data 결과를 보관하는 메모리 + 디스크 캐시
+
+    필드마다 수집 시각을 기록해 두고 FIELD_TTL이 지나면 그 필드는 오래된
+    것으로 본다. 항목 수는 max_entries로 제한하고 가장 오래 안 쓴 것부터 버린다.
+    """
+
+    def __init__(self, path=CACHE_FILE_PATH, max_entries=DEFAULT_MAX_ENTRIES,
+                 ttl=None, offline=False):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = dict(FIELD_TTL if ttl is None else ttl)
+        self.offline = offline
+        self.stats = CacheStats()
+        self._entries = OrderedDict()  # code -> {'data': {...}, 'fetched': {field: ts}}
+        self._lock = threading.Lock()
+        self._dirty = False
+        if path:
+            self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, code):
+        return code in self._entries
+
+    def _stale(self, entry, now):
+        # TTL이 지난 필드와, 아직 한 번도 받지 않은 필드(일부만 채운 항목)
+        stale = [field for field in entry['data']
+                 if now - entry['fetched'].get(field, 0) >= self.ttl.get(field, DEFAULT_TTL)]
+        return stale + [field for field in self.ttl if field not in entry['data']]
+
+    def _ordered(self, data):
+        ordered = {field: data[field] for field in self.ttl if field in data}
+        ordered.update((field, value) for field, value in data.items() if field not in ordered)
+        return ordered
+
+    def stale_fields(self, code, now=None):
+        """TTL이 지난 필드 목록 (항목이 없으면 None)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(code)
+            return None if entry is None else self._stale(entry, now)
+
+    def fetched_at(self, code):
+        """항목에서 가장 오래된 필드를 받은 시각 (항목이 없으면 None)"""
+        with self._lock:
+            entry = self._entries.get(code)
+            if entry is None or not entry['fetched']:
+                return None
+            return min(entry['fetched'].values())
+
+    def get(self, code, now=None):
+        """모든 필드가 유효하면 결과 dict, 아니면 None"""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(code)
+            if entry is None or self._stale(entry, now):
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+            self._entries.move_to_end(code)
+            return self._ordered(entry['data'])
+
+    def get_stale(self, code):
+        """유효 시간과 관계없이 마지막으로 받은 값"""
+        with self._lock:
+            entry = self._entries.get(code)
+            if entry is None:
+                return None
+            self.stats.stale_served += 1
+            self._entries.move_to_end(code)
+            return self._ordered(entry['data'])
+
+    def put(self, code, data, now=None):
+        """data에 있는 필드만 갱신한다 (일부 필드만 넣어도 된다)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(code)
+            if entry is None:
+                entry = {'data': {}, 'fetched': {}}
+                self._entries[code] = entry
+            for field, value in data.items():
+                entry['data'][field] = value
+                entry['fetched'][field] = now
+            self._entries.move_to_end(code)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+            self._dirty = True
+
+    def invalidate(self, code=None):
+        with self._lock:
+            if code is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(code, None)
+            self._dirty = True
+
+    def fetch(self, code, loader, force=False):
+        """캐시에 유효한 값이 있으면 돌려주고, 없으면 loader()로 받아와 저장
+
+        force면 유효한 값이 있어도 새로 받는다. 오프라인 모드이거나
+        네트워크 오류가 나면 마지막으로 받은 값을 돌려준다.
+        """
+        if self.offline:
+            data = self.get_stale(code)
+            if data is None:
+                raise ConnectionError(f"오프라인 모드: {code} 캐시 없음")
+            return data
+
+        data = None if force else self.get(code)
+        if data is not None:
+            return data
+
+        try:
+            data = loader()
+        except OSError:
+            data = self.get_stale(code)
+            if data is None:
+                raise
+            return data
+        self.put(code, data)
+        return data
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return  # 깨진 캐시 파일은 무시하고 새로 만든다
+        # 손으로 고쳤거나 형식이 다른 파일도 시작을 막지 않게, 모양이 맞는 항목만 쓴다
+        entries = stored.get('entries') if isinstance(stored, dict) else None
+        if not isinstance(entries, list):
+            return
+        with self._lock:
+            self._entries = OrderedDict(
+                (item[0], item[1]) for item in entries
+                if isinstance(item, list) and len(item) == 2 and isinstance(item[1], dict)
+                and isinstance(item[1].get('data'), dict) and isinstance(item[1].get('fetched'), dict))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def save(self):
+        """변경이 있으면 임시 파일에 쓴 뒤 교체한다 (중간에 종료돼도 기존 파일 유지)"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = {'entries': [
+                (code, {'data': dict(entry['data']), 'fetched': dict(entry['fetched'])})
+                for code, entry in self._entries.items()]}
+            self._dirty = False
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def default_cache():
+    """프로그램 전체에서 공유하는 ETFCache (KOR_ETF_OFFLINE=1 이면 오프라인 모드)"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ETFCache(
+                offline=os.environ.get('KOR_ETF_OFFLINE') == '1')
+        return _default_cache
+
+
+def set_default_cache(cache):
+    """공유 ETFCache를 바꾼다 (벤치마크/재생 모드 등에서 사용)"""
+    global _default_cache
+    with _default_lock:
+        _default_cache = cache
@@ -0,0 +1,169 @@
+import argparse
+import multiprocessing
+import sys
+import time
+
+import etf_bulk
+import etf_core
+from etf_alerts import AlertEngine, ALERTS_PATH
+from etf_cache import default_cache
+from etf_db import DB_FILE_PATH, open_database
+from etf_metrics import default_metrics, PROFILE_PATH
+from etf_parser import FIELDS
+from naver_client import default_client, set_default_client
+from parse_pool import ParsePool
+from refresh_engine import DEFAULT_MAX_WORKERS
+
+# GUI 없이 저장소(stock.db, stock.json)를 갱신하는 명령행 도구 (PyQt6를 불러오지 않는다)
+#
+#   python etf_cli.py                  # 저장된 모든 종목 갱신
+#   python etf_cli.py 360750 133690    # 지정한 종목만 갱신/추가
+#   python etf_cli.py -f codes.txt     # 파일에 적힌 종목코드/URL 갱신/추가
+
+
+def read_targets(path):
+    if path == '-':
+        return etf_core.parse_targets(sys.stdin.read())
+    # 확장자에 따라 텍스트/CSV/Parquet/xlsx 파일을 조금씩 읽는다
+    from etf_export import iter_targets
+    return list(iter_targets(path))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="한국 주식(ETF) 데이터 일괄 갱신")
+    parser.add_argument('targets', nargs='*', help="종목코드 또는 종목 페이지 URL (생략하면 저장된 전체 종목)")
+    parser.add_argument('-f', '--file', help="종목코드/URL 목록 파일 (txt/csv/parquet/xlsx, '-'는 표준입력)")
+    parser.add_argument('--all-listed', action='store_true', help="상장된 ETF 전체를 목록 API에서 받아 갱신/추가")
+    parser.add_argument('--bulk', dest='bulk', action='store_true', default=None,
+                        help="종목 수와 관계없이 목록 API로 먼저 시가총액/이름을 받음")
+    parser.add_argument('--no-bulk', dest='bulk', action='store_false', help="목록 API를 사용하지 않음")
+    parser.add_argument('--db', default=DB_FILE_PATH, help="SQLite 저장소 경로")
+    parser.add_argument('--json', default=etf_core.JSON_FILE_PATH, help="호환용으로 내보낼 JSON 파일 경로")
+    parser.add_argument('--no-json', action='store_true', help="JSON 파일을 내보내지 않음")
+    parser.add_argument('--no-history', action='store_true', help="이력(history/)에 스냅샷을 남기지 않음")
+    parser.add_argument('--prices', action='store_true', help="갱신한 종목의 일별 시세(prices/)도 저장된 날짜 이후만 받음")
+    parser.add_argument('--alerts', nargs='?', const=ALERTS_PATH, metavar='RULES',
+                        help="갱신으로 바뀐 값에 규칙 알림 (기본 alerts.json, 알림은 alerts.log에도 남음)")
+    parser.add_argument('-j', '--workers', type=int, default=DEFAULT_MAX_WORKERS, help="동시 요청 수")
+    parser.add_argument('--parse-workers', type=int, default=None,
+                        help="페이지를 파싱할 프로세스 수 (0이면 수집 스레드에서, 생략하면 종목이 많을 때만 코어 수만큼)")
+    parser.add_argument('--offline', action='store_true', help="네트워크 없이 캐시된 값만 사용")
+    parser.add_argument('--record', metavar='ARCHIVE', help="받은 응답을 녹화 파일(.ketf)에 더한다")
+    parser.add_argument('--replay', metavar='ARCHIVE',
+                        help="네트워크 대신 녹화 파일(.ketf)에서 응답을 받는다 (캐시 파일은 쓰지 않음)")
+    parser.add_argument('--replay-latency', default='0', help="재생할 때 응답마다 기다릴 시간(초) 또는 recorded")
+    parser.add_argument('--metrics', help="단계별 소요 시간/카운터를 저장할 파일 (.json이면 JSON, 그 밖에는 Prometheus 텍스트)")
+    parser.add_argument('--profile', default=PROFILE_PATH, help="이번 갱신을 cProfile로 기록할 파일")
+    parser.add_argument('--dry-run', action='store_true', help="저장하지 않고 결과만 출력")
+    parser.add_argument('-q', '--quiet', action='store_true', help="진행 상황을 출력하지 않음")
+    args = parser.parse_args(argv)
+
+    if args.replay or args.record:
+        import etf_replay
+        from etf_cache import ETFCache, set_default_cache
+        if args.replay:
+            set_default_client(etf_replay.ReplayClient(args.replay, etf_replay.parse_latency(args.replay_latency)))
+        else:
+            set_default_client(etf_replay.RecordingClient(etf_replay.ArchiveWriter(args.record, append=True)))
+        set_default_cache(ETFCache(path=None))  # 캐시를 거치지 않고 모두 녹화/재생한다
+    if args.offline:
+        # 대상을 정하기 전에 켠다 (--all-listed도 목록을 받지 않게). 없으면 KOR_ETF_OFFLINE을 따른다
+        default_cache().offline = True
+
+    db = open_database(args.db, args.json)
+    try:
+        return _run(args, db)
+    finally:
+        db.close()
+        if args.replay or args.record:
+            default_client().close()  # 녹화 파일은 이때 색인을 쓴다
+
+
+def _run(args, db):
+    targets = list(args.targets)
+    bulk = args.bulk
+    if args.file:
+        targets += read_targets(args.file)
+    if args.all_listed:
+        bulk = False  # 목록을 방금 받아 캐시를 채웠으므로 refresh에서 다시 받지 않는다
+        try:
+            targets += list(etf_bulk.prime_cache())
+        except (OSError, ValueError) as e:
+            print(f"상장 ETF 목록을 받지 못했습니다: {e}", file=sys.stderr)
+            return 1
+    if not targets:
+        targets = db.codes()
+    if not targets:
+        print("갱신할 종목이 없습니다.", file=sys.stderr)
+        return 1
+
+    def log(message):
+        if not args.quiet:
+            print(message, file=sys.stderr)
+
+    def on_result(url, data):
+        log(f"  OK   {data['종목코드']} {data['ETF이름']}")
+
+    def on_error(url, error):
+        log(f"  FAIL {url}: {error}")
+
+    alerts = None
+    if args.alerts:
+        # 갱신 전 저장소 값을 기준으로 삼는다
+        try:
+            alerts = AlertEngine.from_file(args.alerts, notify=lambda items: print(
+                '\n'.join(f"  ALERT {alert}" for alert in items), file=sys.stderr))
+        except (OSError, ValueError) as e:
+            print(f"알림 규칙을 읽지 못했습니다: {e}", file=sys.stderr)
+            return 2
+        if alerts is None:
+            print(f"알림 규칙이 없습니다: {args.alerts}", file=sys.stderr)
+        else:
+            alerts.seed(db.records())
+
+    parse_pool = None
+    if args.parse_workers is not None:
+        parse_pool = ParsePool(args.parse_workers) if args.parse_workers > 0 else False
+
+    start = time.perf_counter()
+    try:
+        results, errors = etf_core.refresh(targets, args.workers, on_result=on_result, on_error=on_error,
+                                           bulk=bulk, profile=args.profile, parse_pool=parse_pool)
+    finally:
+        if parse_pool:
+            parse_pool.shutdown()
+    elapsed = time.perf_counter() - start
+    if alerts is not None:
+        alerts.evaluate(results)
+
+    if args.dry_run:
+        for data in results:
+            print('\t'.join(str(data[field]) for field in FIELDS))
+    elif results:
+        with default_metrics().timer('persist'):
+            db.upsert(results, fetched_at=default_cache().fetched_at)
+            if not args.no_json:
+                db.export_json(args.json)
+        if not args.no_history:
+            from etf_history import SnapshotStore
+            SnapshotStore().append(results)
+        if args.prices:
+            from etf_prices import PriceIngestor
+            added, price_errors = PriceIngestor(workers=args.workers).update(
+                [data['종목코드'] for data in results],
+                on_error=lambda code, error: log(f"  FAIL 일별 시세 {code}: {error}"))
+            log(f"일별 시세 {len(added)}종목 +{sum(added.values())}일, {len(price_errors)}종목 실패")
+
+    log(f"{len(results)}건 갱신, {len(errors)}건 실패 ({elapsed:.1f}초)")
+    log(default_client().stats.summary())
+    log(default_cache().stats.summary())
+    log(default_metrics().summary())
+    if args.metrics:
+        default_metrics().export(args.metrics, {'http': default_client().stats.as_dict(),
+                                                'cache': default_cache().stats.as_dict()})
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()  # 묶은 실행 파일에서 파싱 프로세스 풀용
+    sys.exit(main())
@@ -0,0 +1,179 @@
+import json
+import os
+import re
+
+from refresh_engine import RefreshEngine, DEFAULT_MAX_WORKERS
+from naver_client import default_client
+from etf_parser import parse_etf_page
+from etf_cache import default_cache, code_from_url
+from etf_bulk import BulkPrimedFetch, BULK_MIN_TARGETS
+from etf_metrics import default_metrics, RefreshProfiler
+from parse_pool import choose_parse_pool
+
+# GUI(PyQt6)와 무관한 수집/저장 기능 모음.
+# main.py(화면)와 etf_cli.py(명령행)가 함께 사용한다.
+
+# JSON 파일의 상대 경로 설정
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+JSON_FILE_PATH = os.path.join(SCRIPT_DIR, 'stock.json')
+
+# 네이버 종목 페이지 URL 형식
+ITEM_URL = "https://finance.naver.com/item/main.naver?code={code}"
+
+
+def item_url(code):
+    return ITEM_URL.format(code=code)
+
+
+def normalize_target(text):
+    """'360750' 같은 종목코드나 종목 페이지 URL을 받아 URL로 돌려준다"""
+    text = text.strip()
+    if text.startswith('http'):
+        return text
+    return item_url(text)
+
+
+# 종목코드: 숫자로 시작하는 6자리 (신규 코드는 '0080G0'처럼 영문이 섞인다)
+_CODE_RE = re.compile(r'^[0-9][0-9A-Z]{5}$')
+_SEPARATORS_RE = re.compile(r'[\s,;|]+')
+
+
+def parse_targets(text):
+    """붙여 넣은 종목코드/URL 목록(공백, 줄바꿈, 쉼표, CSV)에서 종목 페이지 URL 목록을 뽑는다
+
+    종목코드나 URL이 아닌 값(CSV 머리글, 종목명 등)과 '#' 뒤의 주석은 무시하고,
+    중복은 처음 나온 순서대로 한 번만 남긴다.
+    """
+    urls = []
+    seen = set()
+    for line in text.splitlines():
+        line = line.split('#', 1)[0] if not line.lstrip().startswith('http') else line
+        for token in _SEPARATORS_RE.split(line):
+            token = token.strip().strip('"\'')
+            if token.startswith('http'):
+                url = token
+            elif _CODE_RE.match(token.upper()):
+                url = item_url(token.upper())
+            else:
+                continue
+            key = code_from_url(url) or url
+            if key not in seen:
+                seen.add(key)
+                urls.append(url)
+    return urls
+
+
+def download_etf_data(url, parse_pool=None):
+    """종목 페이지를 받아 파싱한다. parse_pool이 있으면 파싱은 그 프로세스 풀에서"""
+    metrics = default_metrics()
+    code = code_from_url(url)
+    with metrics.timer('fetch', code):
+        response = default_client().get(url)
+    content_type = response.headers.get('Content-Type')
+    if parse_pool is not None:
+        return parse_pool.parse(response.content, content_type, code)
+    with metrics.timer('parse', code):
+        return parse_etf_page(response.content, content_type)
+
+
+def get_etf_data(url, force=False, parse_pool=None):
+    """종목 페이지 URL의 ETF 정보 (캐시를 거친다, force면 캐시를 무시하고 새로 받음)"""
+    code = code_from_url(url)
+    if code is None:
+        return download_etf_data(url, parse_pool)
+    return default_cache().fetch(code, lambda: download_etf_data(url, parse_pool), force=force)
+
+
+class PooledFetch:
+    """get_etf_data와 같지만 파싱은 ParsePool에서 한다 (RefreshEngine에 넘기는 fetch)
+
+    수집 스레드는 본문을 받아 풀에 넘기고 결과만 기다리므로 GIL을 거의 잡지 않는다.
+    """
+
+    def __init__(self, parse_pool, fetch=get_etf_data):
+        self.parse_pool = parse_pool
+        self.fetch = fetch
+
+    def __call__(self, url):
+        return self.fetch(url, parse_pool=self.parse_pool)
+
+
+def refresh_code(code):
+    """스케줄러용: 종목코드 하나를 캐시와 관계없이 새로 받는다"""
+    return get_etf_data(item_url(code), force=True)
+
+
+def load_records(path=JSON_FILE_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_records(records, path=JSON_FILE_PATH):
+    """임시 파일에 쓴 뒤 교체해서, 쓰는 도중에 종료돼도 기존 파일이 깨지지 않게 한다"""
+    with default_metrics().timer('persist'):
+        _write_records(records, path)
+
+
+def _write_records(records, path):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(records, f, ensure_ascii=False, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def refresh(targets, max_workers=DEFAULT_MAX_WORKERS, on_result=None,
+            on_error=None, on_progress=None, engine=None, bulk=None, profile=None,
+            parse_pool=None):
+    """종목코드/URL 목록을 병렬로 수집해서 (결과 목록, {대상: 오류}) 반환
+
+    결과 목록은 입력 순서를 따른다. bulk가 참이면(None이면 종목이 많을 때)
+    ETF 목록 API로 시가총액/이름을 먼저 한 번에 받아 캐시를 채운다.
+    parse_pool(ParsePool)을 주면 파싱은 그 프로세스 풀에서 한다. None이면 종목이
+    많을 때만 공유 풀을 쓰고, False면 수집 스레드에서 파싱한다.
+    profile에 파일 경로를 주면 이번 수집을 cProfile로 기록해 저장한다.
+    """
+    urls = [normalize_target(target) for target in targets]
+    fetch = get_etf_data
+    parse_pool = choose_parse_pool(len(urls), parse_pool)
+    if parse_pool is not None:
+        fetch = PooledFetch(parse_pool)
+    if bulk or (bulk is None and len(urls) >= BULK_MIN_TARGETS):
+        fetch = BulkPrimedFetch(fetch, [code_from_url(url) for url in urls])
+    profiler = RefreshProfiler(profile) if profile else None
+    if profiler:
+        fetch = profiler.wrap(fetch)
+    batch = default_metrics().begin_batch('refresh', len(urls))
+    results = {}
+    errors = {}
+
+    def handle_result(url, data):
+        results[url] = data
+        if on_result:
+            on_result(url, data)
+
+    def handle_error(url, error):
+        errors[url] = error
+        if on_error:
+            on_error(url, error)
+
+    own_engine = engine is None
+    if own_engine:
+        engine = RefreshEngine(max_workers)
+    try:
+        job = engine.submit(urls, fetch, on_result=handle_result,
+                            on_error=handle_error, on_progress=on_progress)
+        job.wait()
+    finally:
+        if own_engine:
+            engine.shutdown(wait=True)
+        default_cache().save()
+        default_metrics().end_batch(batch, len(results), len(errors))
+        if profiler:
+            profiler.dump()
+
+    return [results[url] for url in urls if url in results], errors
+
@@ -0,0 +1,202 @@
+import json
+import os
+import sqlite3
+import time
+
+from etf_core import save_records
+from etf_parser import FIELDS
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_FILE_PATH = os.path.join(SCRIPT_DIR, 'stock.db')
+
+# 화면/JSON 필드 이름 -> DB 열 이름
+COLUMN_MAP = {
+    '자산운용사': 'manager',
+    'ETF이름': 'name',
+    '종목코드': 'code',
+    '시가총액': 'market_cap',
+    '펀드보수': 'fee',
+    '6개월 수익률': 'return_6m',
+    '1년 수익률': 'return_1y',
+}
+_DB_COLUMNS = [COLUMN_MAP[field] for field in FIELDS]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS etf (
+    code        TEXT PRIMARY KEY,
+    position    INTEGER NOT NULL,
+    manager     TEXT NOT NULL DEFAULT '',
+    name        TEXT NOT NULL DEFAULT '',
+    market_cap  TEXT NOT NULL DEFAULT '',
+    fee         TEXT NOT NULL DEFAULT '',
+    return_6m   TEXT NOT NULL DEFAULT '',
+    return_1y   TEXT NOT NULL DEFAULT '',
+    updated_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS etf_position ON etf(position);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS holdings (
+    code        TEXT PRIMARY KEY,
+    amount      REAL,
+    weight      REAL,
+    updated_at  REAL NOT NULL
+);
+"""
+
+_UPSERT = (
+    f"INSERT INTO etf (position, updated_at, {', '.join(_DB_COLUMNS)}) "
+    f"VALUES (?, ?, {', '.join('?' for _ in _DB_COLUMNS)}) "
+    f"ON CONFLICT(code) DO UPDATE SET updated_at = excluded.updated_at, "
+    + ', '.join(f"{column} = excluded.{column}" for column in _DB_COLUMNS if column != 'code')
+)
+
+
+class ETFDatabase:
+    """stock.json 대신 사용하는 SQLite 저장소
+
+    WAL 모드로 열고 종목코드 기준 upsert만 하므로, 한 종목을 바꾸면
+    그 행만 기록된다. 여러 종목은 한 트랜잭션으로 묶어서 쓴다.
+    """
+
+    def __init__(self, path=DB_FILE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM etf").fetchone()[0]
+
+    def _next_position(self):
+        return self.conn.execute(
+            "SELECT COALESCE(MAX(position), -1) + 1 FROM etf").fetchone()[0]
+
+    def upsert(self, records, fetched_at=None):
+        """종목코드 기준으로 추가/갱신 (새 종목은 맨 뒤에 붙는다)
+
+        updated_at에는 쓴 시각이 아니라 값을 받은 시각을 남긴다. fetched_at(종목코드)가
+        그 시각을 돌려준다 (캐시/오프라인 값이면 예전 시각). 없거나 None이면 지금.
+        """
+        records = [record for record in records if record.get('종목코드')]
+        if not records:
+            return 0
+        now = time.time()
+        with self.conn:
+            position = self._next_position()
+            rows = []
+            for record in records:
+                ts = fetched_at(record['종목코드']) if fetched_at is not None else None
+                rows.append([position, now if ts is None else ts]
+                            + [str(record.get(field, "")) for field in FIELDS])
+                position += 1
+            self.conn.executemany(_UPSERT, rows)
+            self._bump_revision()
+        return len(rows)
+
+    def delete(self, codes):
+        with self.conn:
+            self.conn.executemany("DELETE FROM etf WHERE code = ?",
+                                  [(code,) for code in codes])
+            self._bump_revision()
+
+    def _bump_revision(self):
+        # 표가 바뀔 때마다 같은 트랜잭션 안에서 1씩 올린다 (CLI로 바꿔도 마찬가지)
+        self.conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('revision', '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1")
+
+    def revision(self):
+        """표 내용의 변경 번호. 시작 스냅샷이 최신인지 확인하는 데 쓴다"""
+        return int(self.get_meta('revision', 0))
+
+    def records(self):
+        cursor = self.conn.execute(
+            f"SELECT {', '.join(_DB_COLUMNS)} FROM etf ORDER BY position")
+        return [dict(zip(FIELDS, row)) for row in cursor]
+
+    def iter_records(self, chunk_size=1000):
+        """records()와 같은 순서로 chunk_size개씩 나눠서 읽는다 (전체를 메모리에 올리지 않음)"""
+        cursor = self.conn.execute(
+            f"SELECT {', '.join(_DB_COLUMNS)} FROM etf ORDER BY position")
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield [dict(zip(FIELDS, row)) for row in rows]
+
+    def to_dataframe(self):
+        from etf_normalize import to_dataframe
+        return to_dataframe(self.records())
+
+    def codes(self):
+        return [row[0] for row in self.conn.execute("SELECT code FROM etf ORDER BY position")]
+
+    def updated_at(self):
+        """종목코드별 마지막 갱신 시각 (epoch 초)"""
+        return dict(self.conn.execute("SELECT code, updated_at FROM etf"))
+
+    def holdings(self):
+        """종목코드 -> {'amount': 보유 금액(원), 'weight': 비중} (없는 값은 None)"""
+        return {code: {'amount': amount, 'weight': weight} for code, amount, weight
+                in self.conn.execute("SELECT code, amount, weight FROM holdings")}
+
+    def set_holding(self, code, amount=None, weight=None):
+        """보유 금액이나 비중을 기록한다. 둘 다 None이면 지운다"""
+        with self.conn:
+            if amount is None and weight is None:
+                self.conn.execute("DELETE FROM holdings WHERE code = ?", (code,))
+            else:
+                self.conn.execute(
+                    "INSERT INTO holdings (code, amount, weight, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(code) DO UPDATE SET amount = excluded.amount, "
+                    "weight = excluded.weight, updated_at = excluded.updated_at",
+                    (code, amount, weight, time.time()))
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return default if row is None else row[0]
+
+    def set_meta(self, key, value):
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (key, value))
+
+    def import_json(self, path, force=False):
+        """stock.json 내용을 한 번만 가져온다 (이미 가져왔으면 force일 때만)"""
+        if not force and self.get_meta('json_imported'):
+            return 0
+        if not os.path.exists(path):
+            return 0
+        with open(path, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        # stock.json에는 받은 시각이 없으므로 파일을 마지막으로 쓴 시각으로 둔다
+        mtime = os.path.getmtime(path)
+        count = self.upsert(records, fetched_at=lambda code: mtime)
+        self.set_meta('json_imported', str(time.time()))
+        return count
+
+    def export_json(self, path):
+        """호환성을 위해 현재 내용을 stock.json 형식으로 내보낸다"""
+        save_records(self.records(), path)
+
+
+def open_database(path=DB_FILE_PATH, json_path=None):
+    """DB를 열고, 처음 여는 경우 stock.json에서 옮겨 온다"""
+    db = ETFDatabase(path)
+    if json_path:
+        db.import_json(json_path)
+    return db
@@ -0,0 +1,311 @@
+import argparse
+import csv
+import os
+import sys
+
+from etf_cache import code_from_url
+from etf_core import parse_targets
+from etf_parser import FIELDS
+
+# 표/이력 데이터를 CSV, Parquet, Excel(xlsx)로 내보내고, 같은 형식의 파일에서
+# 종목 목록을 읽어 온다. 모두 chunk 단위로 쓰고 읽어서 데이터가 커도 메모리가 일정하다.
+# Parquet은 pyarrow, Excel은 openpyxl이 설치되어 있어야 한다.
+#
+#   python etf_export.py table watchlist.xlsx
+#   python etf_export.py history history.parquet --start 2024-10-01 --code 360750
+
+FORMATS = {
+    '.csv': 'csv', '.txt': 'csv', '.tsv': 'csv',
+    '.parquet': 'parquet', '.pq': 'parquet',
+    '.xlsx': 'xlsx',
+}
+DEFAULT_CHUNK_SIZE = 10_000
+
+# 종목코드 열로 인식하는 머리글
+CODE_HEADERS = ('종목코드', 'code', 'itemcode', 'ticker', 'symbol')
+
+# 한 시트에 넣을 수 있는 최대 행 수 (머리글 포함)
+XLSX_MAX_ROWS = 1_048_576
+
+
+def detect_format(path):
+    fmt = FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"지원하지 않는 파일 형식입니다: {path} (csv, parquet, xlsx)")
+    return fmt
+
+
+# -- 쓰기 ---------------------------------------------------------------------
+
+def _without_timezone(df):
+    """시간대가 있는 날짜 열을 현지(KST) 시각으로 바꾼다
+
+    엑셀은 시간대가 있는 날짜를 저장할 수 없고, CSV도 이쪽이 몇 배 빨리 써진다.
+    """
+    import pandas as pd
+    for name in df.columns:
+        if isinstance(df[name].dtype, pd.DatetimeTZDtype):
+            df = df.assign(**{name: df[name].dt.tz_localize(None)})
+    return df
+
+
+class _CSVWriter:
+    def __init__(self, path):
+        # utf-8-sig: 엑셀에서 열어도 한글이 깨지지 않는다
+        delimiter = '\t' if path.lower().endswith('.tsv') else ','
+        self.file = open(path, 'w', encoding='utf-8-sig', newline='')
+        self.delimiter = delimiter
+        self.header = True
+
+    def write(self, df):
+        _without_timezone(df).to_csv(self.file, header=self.header, index=False, sep=self.delimiter)
+        self.header = False
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetWriter:
+    def __init__(self, path):
+        import pyarrow  # noqa: F401  (없으면 여기서 ImportError)
+        self.path = path
+        self.writer = None
+        self.schema = None
+
+    def write(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self.writer is None:
+            self.schema = table.schema
+            self.writer = pq.ParquetWriter(self.path, self.schema)
+        else:
+            # 값이 모두 비어 있는 chunk는 타입이 null로 추론되므로 첫 chunk의 스키마에 맞춘다
+            table = table.cast(self.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            return
+        # 한 chunk도 쓰지 않았으면 빈 파일이라도 남긴다 (열 없는 빈 표)
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        pq.write_table(pa.table({}), self.path)
+
+
+class _XLSXWriter:
+    def __init__(self, path):
+        from openpyxl import Workbook
+        self.path = path
+        self.workbook = Workbook(write_only=True)  # 행을 바로바로 내보내는 모드
+        self.sheet = None
+        self.rows = 0
+        self.columns = None
+
+    def _new_sheet(self):
+        index = len(self.workbook.worksheets)
+        self.sheet = self.workbook.create_sheet(f"data{index + 1}" if index else "data")
+        self.sheet.append(self.columns)
+        self.rows = 1
+
+    def write(self, df):
+        if self.columns is None:
+            self.columns = [str(name) for name in df.columns]
+            self._new_sheet()
+        df = _without_timezone(df)
+        df = df.astype(object).where(df.notna(), None)
+        for row in df.itertuples(index=False, name=None):
+            if self.rows >= XLSX_MAX_ROWS:
+                self._new_sheet()
+            self.sheet.append(row)
+            self.rows += 1
+
+    def close(self):
+        if self.sheet is None:
+            self.workbook.create_sheet("data")
+        self.workbook.save(self.path)
+
+
+_WRITERS = {'csv': _CSVWriter, 'parquet': _ParquetWriter, 'xlsx': _XLSXWriter}
+
+
+def write_chunks(path, chunks, fmt=None, empty=None):
+    """DataFrame chunk들을 차례로 파일에 쓴다. 쓴 행 수를 반환
+
+    임시 파일에 쓴 뒤 교체하므로 중간에 실패해도 기존 파일은 그대로 남는다.
+    chunk가 하나도 없으면 empty()(열과 타입만 있는 빈 DataFrame)를 써서 머리글/스키마를 남긴다.
+    """
+    fmt = fmt or detect_format(path)
+    tmp_path = path + '.tmp'
+    writer = _WRITERS[fmt](tmp_path)
+    count = 0
+    try:
+        written = False
+        for df in chunks:
+            writer.write(df)
+            count += len(df)
+            written = True
+        if not written and empty is not None:
+            writer.write(empty())
+    except BaseException:
+        try:
+            writer.close()
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        raise
+    writer.close()
+    os.replace(tmp_path, path)
+    return count
+
+
+def _empty_records_frame(numeric):
+    return next(_record_frames([[]], numeric))
+
+
+def _record_frames(record_chunks, numeric):
+    import pandas as pd
+    for records in record_chunks:
+        if numeric:
+            from etf_normalize import to_dataframe
+            yield to_dataframe(records)
+        else:
+            yield pd.DataFrame(records, columns=FIELDS).fillna("")
+
+
+def _chunked(records, chunk_size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def export_records(path, records, numeric=False, chunk_size=DEFAULT_CHUNK_SIZE, fmt=None):
+    """레코드(dict) 목록이나 iterator를 내보낸다
+
+    numeric이면 etf_normalize.to_dataframe 형식(시가총액 억원, % 숫자)으로,
+    아니면 화면과 같은 문자열로 쓴다.
+    """
+    return write_chunks(path, _record_frames(_chunked(records, chunk_size), numeric), fmt,
+                        lambda: _empty_records_frame(numeric))
+
+
+def export_table(path, db, numeric=False, chunk_size=DEFAULT_CHUNK_SIZE, fmt=None):
+    """stock.db의 현재 표를 내보낸다"""
+    return write_chunks(path, _record_frames(db.iter_records(chunk_size), numeric), fmt,
+                        lambda: _empty_records_frame(numeric))
+
+
+def export_history(path, store, start=None, end=None, code=None,
+                   chunk_size=100_000, fmt=None):
+    """이력(history/) 스냅샷을 내보낸다. 시각/종목코드/숫자 열"""
+    return write_chunks(path, store.iter_chunks(start, end, code, chunk_size), fmt, store.empty_frame)
+
+
+# -- 읽기 (종목 목록 가져오기) --------------------------------------------------
+
+def _cell_text(value):
+    """엑셀/Parquet에서 숫자로 읽힌 종목코드(69500)는 앞의 0을 되살린다"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, int) and not isinstance(value, bool):
+        return f"{value:06d}"
+    return str(value)
+
+
+def _code_column(header):
+    lowered = [_cell_text(cell).strip().lower() for cell in header]
+    for name in CODE_HEADERS:
+        if name in lowered:
+            return lowered.index(name)
+    return None
+
+
+def _iter_rows(path, fmt, chunk_size):
+    """파일의 행을 셀 목록으로 하나씩 (첫 행은 머리글일 수 있음)"""
+    if fmt == 'csv':
+        delimiter = '\t' if path.lower().endswith('.tsv') else ','
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            yield from csv.reader(f, delimiter=delimiter)
+    elif fmt == 'parquet':
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(path)
+        names = parquet.schema_arrow.names
+        code = _code_column(names)
+        columns = [names[code]] if code is not None else None
+        yield [names[code]] if code is not None else names
+        for batch in parquet.iter_batches(batch_size=chunk_size, columns=columns):
+            yield from zip(*(column.to_pylist() for column in batch.columns))
+    else:
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            for sheet in workbook.worksheets:
+                yield from sheet.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+
+def iter_targets(path, chunk_size=DEFAULT_CHUNK_SIZE, fmt=None):
+    """CSV/Parquet/xlsx/텍스트 파일에서 종목 페이지 URL을 하나씩 읽는다
+
+    '종목코드'(또는 code/ticker) 머리글이 있으면 그 열만, 없으면 모든 셀에서
+    종목코드나 URL로 보이는 값을 찾는다. 중복은 한 번만 돌려준다.
+    """
+    fmt = fmt or detect_format(path)
+    seen = set()
+    code_column = None
+    for i, row in enumerate(_iter_rows(path, fmt, chunk_size)):
+        if i == 0:
+            code_column = _code_column(row)
+            if code_column is not None:
+                continue
+        if code_column is not None:
+            cells = [row[code_column]] if code_column < len(row) else []
+        else:
+            cells = row
+        for cell in cells:
+            for url in parse_targets(_cell_text(cell)):
+                key = code_from_url(url) or url
+                if key not in seen:
+                    seen.add(key)
+                    yield url
+
+
+def read_targets(path, fmt=None):
+    return list(iter_targets(path, fmt=fmt))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ETF 표/이력을 CSV, Parquet, Excel로 내보내기")
+    parser.add_argument('what', choices=['table', 'history'], help="table: 현재 표, history: 이력 스냅샷")
+    parser.add_argument('output', help="저장할 파일 (.csv, .parquet, .xlsx)")
+    parser.add_argument('--db', help="SQLite 저장소 경로 (table)")
+    parser.add_argument('--numeric', action='store_true', help="문자열 대신 숫자 열로 (table)")
+    parser.add_argument('--start', help="시작 날짜/시각 (history, 예: 2024-10-01)")
+    parser.add_argument('--end', help="끝 날짜/시각, 포함하지 않음 (history)")
+    parser.add_argument('--code', help="한 종목만 (history)")
+    parser.add_argument('--chunk-size', type=int, default=None, help="한 번에 읽고 쓰는 행 수")
+    args = parser.parse_args(argv)
+
+    if args.what == 'table':
+        from etf_db import DB_FILE_PATH, ETFDatabase
+        with ETFDatabase(args.db or DB_FILE_PATH) as db:
+            count = export_table(args.output, db, args.numeric, args.chunk_size or DEFAULT_CHUNK_SIZE)
+    else:
+        from etf_history import SnapshotStore
+        count = export_history(args.output, SnapshotStore(), args.start, args.end, args.code,
+                               args.chunk_size or 100_000)
+    print(f"{count}행을 저장했습니다: {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
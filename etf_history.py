@@ -0,0 +1,302 @@
+import contextlib
+import datetime
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from etf_normalize import (parse_market_cap, parse_percent,
+                           MARKET_CAP, FEE, RETURN_6M, RETURN_1Y)
+from etf_metrics import default_metrics
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+HISTORY_DIR = os.path.join(SCRIPT_DIR, 'history')
+
+# 열 이름 -> (파일 이름, dtype). 시가총액은 결측값(NaN)을 위해 float64로 저장한다.
+COLUMNS = {
+    'ts': ('ts.i8', np.dtype('<i8')),
+    'code': ('code.i4', np.dtype('<i4')),
+    MARKET_CAP: ('market_cap.f8', np.dtype('<f8')),
+    FEE: ('fee.f8', np.dtype('<f8')),
+    RETURN_6M: ('return_6m.f8', np.dtype('<f8')),
+    RETURN_1Y: ('return_1y.f8', np.dtype('<f8')),
+}
+CODES_FILE = 'codes.txt'
+LOCK_FILE = '.lock'
+
+
+def _partition_name(ts):
+    return time.strftime('%Y-%m', time.localtime(ts))
+
+
+def _month_range(start_ts, end_ts):
+    """start_ts ~ end_ts 구간에 걸치는 월 파티션 이름 목록"""
+    start = datetime.date.fromtimestamp(start_ts).replace(day=1)
+    end = datetime.date.fromtimestamp(end_ts)
+    months = []
+    while start <= end:
+        months.append(start.strftime('%Y-%m'))
+        start = (start + datetime.timedelta(days=32)).replace(day=1)
+    return months
+
+
+@contextlib.contextmanager
+def _file_lock(path):
+    """다른 프로세스와의 배타적 잠금 (GUI와 etf_cli가 같은 history/에 덧붙인다)"""
+    with open(path, 'a+b') as f:
+        if os.name == 'nt':
+            import msvcrt
+            while True:
+                try:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK은 10초 동안 못 잡으면 실패한다
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class SnapshotStore:
+    """갱신할 때마다 값을 시각과 함께 덧붙이는 이력 저장소
+
+    월별 디렉터리에 열마다 하나의 이진 파일(ts, code, 시가총액 ...)을 두고
+    뒤에 덧붙이기만 한다. 읽을 때는 numpy.memmap으로 열어서 필요한 구간만
+    디스크에서 읽어 들인다. 시각(ts)은 항상 증가하므로 날짜 조회는 이분 탐색이다.
+
+    여러 프로세스가 같은 디렉터리에 덧붙일 수 있다. 쓰는 동안은 파일 잠금을 잡고
+    codes.txt와 마지막 시각을 디스크에서 다시 읽어서 종목 번호와 시각 순서를 맞춘다.
+    """
+
+    def __init__(self, root=HISTORY_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self._last_ts = 0
+        os.makedirs(root, exist_ok=True)
+        self._codes = []
+        self._code_ids = {}
+        self._codes_size = 0
+        self._load_codes()
+
+    # -- 종목코드 사전 --------------------------------------------------------
+
+    def _load_codes(self, locked=False):
+        """다른 프로세스가 codes.txt에 더한 종목을 읽어 들인다 (번호 = 줄 번호)
+
+        끝에 줄바꿈 없이 끊긴 줄(쓰는 도중 종료)은 건너뛰고, 잠금을 잡고 있으면 잘라 낸다.
+        """
+        path = os.path.join(self.root, CODES_FILE)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size == self._codes_size:
+            return
+        with open(path, 'rb') as f:
+            data = f.read()
+        complete = data.rfind(b'\n') + 1
+        if locked and complete < len(data):
+            with open(path, 'r+b') as f:
+                f.truncate(complete)
+        self._codes = data[:complete].decode('utf-8').splitlines()
+        self._code_ids = {code: i for i, code in enumerate(self._codes)}
+        self._codes_size = complete
+
+    def _code_id(self, code):
+        # 파일 잠금을 잡은 상태에서 _load_codes(locked=True) 뒤에 부른다
+        code_id = self._code_ids.get(code)
+        if code_id is None:
+            code_id = len(self._codes)
+            line = (code + '\n').encode('utf-8')
+            with open(os.path.join(self.root, CODES_FILE), 'ab') as f:
+                f.write(line)
+            self._codes.append(code)
+            self._code_ids[code] = code_id
+            self._codes_size += len(line)
+        return code_id
+
+    def codes(self):
+        with self._lock:
+            self._load_codes()
+            return list(self._codes)
+
+    # -- 쓰기 -----------------------------------------------------------------
+
+    def partitions(self):
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.isdir(os.path.join(self.root, name)))
+
+    def _partition_rows(self, partition_dir):
+        """모든 열 파일에 온전히 기록된 행 수 (중간에 끊긴 쓰기는 무시)"""
+        rows = None
+        for filename, dtype in COLUMNS.values():
+            path = os.path.join(partition_dir, filename)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            count = size // dtype.itemsize
+            rows = count if rows is None else min(rows, count)
+        return rows or 0
+
+    def _repair(self, partition_dir):
+        # 열 길이가 서로 다르면(쓰는 도중 종료) 가장 짧은 길이에 맞춘다
+        rows = self._partition_rows(partition_dir)
+        for filename, dtype in COLUMNS.values():
+            path = os.path.join(partition_dir, filename)
+            if os.path.exists(path) and os.path.getsize(path) != rows * dtype.itemsize:
+                with open(path, 'r+b') as f:
+                    f.truncate(rows * dtype.itemsize)
+        return rows
+
+    def append(self, records, ts=None):
+        """get_etf_data 결과 레코드 목록을 하나의 스냅샷으로 덧붙인다"""
+        records = [record for record in records if record.get('종목코드')]
+        if not records:
+            return 0
+        with default_metrics().timer('normalize'):
+            frame = pd.DataFrame(records)
+            values = {
+                MARKET_CAP: parse_market_cap(frame['시가총액']).astype('float64').to_numpy(),
+                FEE: parse_percent(frame['펀드보수']).to_numpy(),
+                RETURN_6M: parse_percent(frame['6개월 수익률']).to_numpy(),
+                RETURN_1Y: parse_percent(frame['1년 수익률']).to_numpy(),
+            }
+
+        with self._lock, _file_lock(os.path.join(self.root, LOCK_FILE)), default_metrics().timer('persist'):
+            self._load_codes(locked=True)
+            # 시각이 거꾸로 가지 않도록 (다른 프로세스가 쓴 마지막 시각도 본다)
+            ts = int(time.time() if ts is None else ts)
+            partitions = self.partitions()
+            if partitions:
+                latest_dir = os.path.join(self.root, partitions[-1])
+                self._repair(latest_dir)
+                ts = max(ts, self._last_partition_ts(latest_dir))
+            ts = max(ts, self._last_ts)
+            partition_dir = os.path.join(self.root, _partition_name(ts))
+            os.makedirs(partition_dir, exist_ok=True)
+            self._repair(partition_dir)
+            self._last_ts = ts
+
+            values['ts'] = np.full(len(records), ts, dtype='<i8')
+            values['code'] = np.array([self._code_id(record['종목코드']) for record in records],
+                                      dtype='<i4')
+            for name, (filename, dtype) in COLUMNS.items():
+                with open(os.path.join(partition_dir, filename), 'ab') as f:
+                    f.write(np.ascontiguousarray(values[name], dtype=dtype).tobytes())
+        return len(records)
+
+    def _last_partition_ts(self, partition_dir):
+        ts = self._column(partition_dir, 'ts')
+        return int(ts[-1]) if len(ts) else 0
+
+    # -- 읽기 -----------------------------------------------------------------
+
+    def _column(self, partition_dir, name, rows=None):
+        filename, dtype = COLUMNS[name]
+        rows = self._partition_rows(partition_dir) if rows is None else rows
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(partition_dir, filename), dtype=dtype,
+                         mode='r', shape=(rows,))
+
+    def _iter_parts(self, start_ts=None, end_ts=None, code=None, chunk_size=None):
+        """조건에 맞는 행을 파티션별로(chunk_size가 있으면 그 크기로 나눠서) 열 dict로 돌려준다"""
+        partitions = self.partitions()
+        if start_ts is not None or end_ts is not None:
+            if not partitions:
+                return
+            first = start_ts if start_ts is not None else 0
+            last = end_ts if end_ts is not None else time.time()
+            wanted = set(_month_range(max(first, 0), last))
+            partitions = [name for name in partitions if name in wanted]
+
+        with self._lock:
+            self._load_codes()
+        code_id = None
+        if code is not None:
+            code_id = self._code_ids.get(code)
+            if code_id is None:
+                return
+
+        for name in partitions:
+            partition_dir = os.path.join(self.root, name)
+            rows = self._partition_rows(partition_dir)
+            if not rows:
+                continue
+            ts = self._column(partition_dir, 'ts', rows)
+            lo = 0 if start_ts is None else int(np.searchsorted(ts, start_ts, 'left'))
+            hi = rows if end_ts is None else int(np.searchsorted(ts, end_ts, 'left'))
+            step = chunk_size or max(hi - lo, 1)
+            for chunk_lo in range(lo, hi, step):
+                chunk_hi = min(chunk_lo + step, hi)
+                index = slice(chunk_lo, chunk_hi)
+                if code_id is not None:
+                    hits = np.flatnonzero(
+                        self._column(partition_dir, 'code', rows)[chunk_lo:chunk_hi] == code_id)
+                    if not len(hits):
+                        continue
+                    index = hits + chunk_lo
+                yield {name_: np.asarray(self._column(partition_dir, name_, rows)[index])
+                       for name_ in COLUMNS}
+
+    def _select(self, start_ts=None, end_ts=None, code=None):
+        return self._frame(list(self._iter_parts(start_ts, end_ts, code)))
+
+    def _frame(self, parts):
+        if not parts:
+            data = {name: np.empty(0, dtype=dtype) for name, (_, dtype) in COLUMNS.items()}
+        else:
+            data = {name: np.concatenate([part[name] for part in parts]) for name in COLUMNS}
+        codes = np.array(self._codes + [''], dtype=object)
+        df = pd.DataFrame({
+            '시각': pd.to_datetime(data['ts'], unit='s', utc=True).tz_convert('Asia/Seoul'),
+            '종목코드': pd.Series(codes[data['code']], dtype='string'),
+            MARKET_CAP: pd.array(data[MARKET_CAP], dtype='Float64').round().astype('Int64'),
+            FEE: data[FEE],
+            RETURN_6M: data[RETURN_6M],
+            RETURN_1Y: data[RETURN_1Y],
+        })
+        return df
+
+    def history(self, code, start=None, end=None):
+        """한 종목의 스냅샷 이력 (start/end는 datetime 또는 epoch 초)"""
+        return self._select(_to_ts(start), _to_ts(end), code)
+
+    def iter_chunks(self, start=None, end=None, code=None, chunk_size=100_000):
+        """history()와 같은 열의 DataFrame을 chunk_size 행씩 차례로 (내보내기용)"""
+        for part in self._iter_parts(_to_ts(start), _to_ts(end), code, chunk_size):
+            yield self._frame([part])
+
+    def empty_frame(self):
+        """history()와 같은 열의 빈 DataFrame (내보낼 행이 없을 때)"""
+        return self._frame([])
+
+    def on_date(self, date, last_only=True):
+        """해당 날짜의 전체 종목 스냅샷 (last_only면 종목별 마지막 값만)"""
+        if isinstance(date, str):
+            date = datetime.date.fromisoformat(date)
+        start = datetime.datetime.combine(date, datetime.time())
+        end = start + datetime.timedelta(days=1)
+        df = self._select(start.timestamp(), end.timestamp())
+        if last_only and len(df):
+            df = df.drop_duplicates('종목코드', keep='last').reset_index(drop=True)
+        return df
+
+
+def _to_ts(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, datetime.datetime):
+        return value.timestamp()
+    if isinstance(value, datetime.date):
+        return datetime.datetime.combine(value, datetime.time()).timestamp()
+    return datetime.datetime.fromisoformat(str(value)).timestamp()
@@ -0,0 +1,248 @@
+import bisect
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+
+# 갱신 단계별 소요 시간 측정 (느릴 때 어느 단계가 문제인지 보기 위함)
+#
+#   fetch      HTTP 요청 (DNS/연결/전송 포함)
+#   parse      종목 페이지 HTML 해석
+#   normalize  표시용 문자열 -> 숫자 변환 (이력 저장 시)
+#   apply      테이블(모델)에 반영
+#   persist    stock.db / stock.json / history 기록
+STAGES = ('fetch', 'parse', 'normalize', 'apply', 'persist')
+
+# 히스토그램 구간 상한(초)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 이 환경변수에 파일 경로를 주면 한 번의 갱신을 cProfile로 기록한다
+PROFILE_PATH = os.environ.get('KOR_ETF_PROFILE')
+
+METRIC_PREFIX = 'kor_etf'
+
+
+class Histogram:
+    """구간별 개수로 지연 시간 분포를 모은다 (값을 따로 저장하지 않음)"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 마지막 칸은 +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """구간 안에서 선형 보간한 q 분위수 (대략값)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, n in enumerate(self.counts):
+            upper = min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+            if n and seen + n >= rank:
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+            lower = upper
+        return self.max
+
+    def as_dict(self):
+        return {
+            'count': self.count, 'sum': round(self.sum, 6), 'max': round(self.max, 6),
+            'p50': round(self.quantile(0.5), 6), 'p95': round(self.quantile(0.95), 6),
+            'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], self.counts)),
+        }
+
+
+class Metrics:
+    """단계별 지연 히스토그램, 카운터, 종목별 마지막 소요 시간, 일괄 작업 기록
+
+    여러 워커 스레드에서 동시에 기록해도 된다.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, max_batches=50):
+        self.buckets = buckets
+        self.histograms = {}
+        self.counters = collections.Counter()
+        self.last = {}   # 종목코드 -> {단계: 초}
+        self.batches = collections.deque(maxlen=max_batches)
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds, code=None):
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            if code:
+                self.last.setdefault(code, {})[stage] = round(seconds, 6)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    @contextlib.contextmanager
+    def timer(self, stage, code=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, code)
+
+    def begin_batch(self, name, size):
+        """일괄 작업 시작. end_batch에 그대로 넘길 값을 돌려준다"""
+        with self._lock:
+            sums = {stage: h.sum for stage, h in self.histograms.items()}
+        return name, size, time.time(), time.perf_counter(), sums
+
+    def end_batch(self, token, completed=None, failed=0):
+        """작업 동안 단계별로 쓴 시간(워커 시간의 합)과 전체 경과 시간을 기록
+
+        자동 갱신처럼 동시에 도는 다른 작업의 시간도 함께 잡힐 수 있다.
+        """
+        name, size, started_at, start, sums = token
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            stages = {stage: round(h.sum - sums.get(stage, 0.0), 6)
+                      for stage, h in self.histograms.items()
+                      if h.sum - sums.get(stage, 0.0) > 0}
+            batch = {
+                'name': name, 'started_at': round(started_at, 3), 'size': size,
+                'completed': size if completed is None else completed, 'failed': failed,
+                'seconds': round(elapsed, 6), 'stages': stages,
+            }
+            self.batches.append(batch)
+            self.counters[f'batches_{name}'] += 1
+        self.observe(f'batch_{name}', elapsed)
+        return batch
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.last.clear()
+            self.batches.clear()
+
+    # -- 내보내기 ---------------------------------------------------------------
+
+    def as_dict(self, extra=None):
+        """JSON으로 내보낼 dict. extra={'http': {...}, 'cache': {...}} 같은 카운터 묶음을 덧붙인다"""
+        with self._lock:
+            return {
+                'timestamp': round(time.time(), 3),
+                'stages': {stage: h.as_dict() for stage, h in self.histograms.items()},
+                'counters': dict(self.counters),
+                'extra': {group: dict(values) for group, values in (extra or {}).items()},
+                'tickers': {code: dict(stages) for code, stages in self.last.items()},
+                'batches': list(self.batches),
+            }
+
+    def to_prometheus(self, extra=None):
+        """Prometheus 텍스트 형식"""
+        lines = []
+        name = f'{METRIC_PREFIX}_stage_seconds'
+        lines.append(f'# HELP {name} Time spent in each refresh stage.')
+        lines.append(f'# TYPE {name} histogram')
+        with self._lock:
+            for stage, h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, n in zip(list(h.buckets) + ['+Inf'], h.counts):
+                    cumulative += n
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {h.sum:.6f}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {h.count}')
+            counters = dict(self.counters)
+        for key, value in sorted(counters.items()):
+            lines.append(f'# TYPE {METRIC_PREFIX}_{key}_total counter')
+            lines.append(f'{METRIC_PREFIX}_{key}_total {value}')
+        for group, values in sorted((extra or {}).items()):
+            for key, value in sorted(values.items()):
+                if isinstance(value, (int, float)):
+                    lines.append(f'# TYPE {METRIC_PREFIX}_{group}_{key} gauge')
+                    lines.append(f'{METRIC_PREFIX}_{group}_{key} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path, extra=None):
+        """확장자가 .json이면 JSON, 그 밖에는 Prometheus 텍스트로 저장"""
+        if path.endswith('.json'):
+            text = json.dumps(self.as_dict(extra), ensure_ascii=False, indent=2)
+        else:
+            text = self.to_prometheus(extra)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def summary(self):
+        """상태 표시용 한 줄 요약 (단계별 중앙값/95% 값)"""
+        with self._lock:
+            parts = [f"{stage} p50 {h.quantile(0.5) * 1000:.1f}ms p95 {h.quantile(0.95) * 1000:.1f}ms"
+                     for stage, h in self.histograms.items() if stage in STAGES]
+        return ", ".join(parts)
+
+
+class RefreshProfiler:
+    """한 번의 갱신을 cProfile로 기록한다 (호출마다 따로 재서 합친다)
+
+    파이썬 3.12부터는 프로파일러를 여러 스레드에서 동시에 켤 수 없으므로
+    측정하는 동안은 호출을 하나씩 실행한다.
+
+        profiler = RefreshProfiler('refresh.prof')
+        fetch = profiler.wrap(get_etf_data)
+        ...
+        profiler.dump()
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.profiles = []
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+
+    def wrap(self, func):
+        import cProfile
+
+        def profiled(*args, **kwargs):
+            profile = cProfile.Profile()
+            try:
+                with self._run_lock:
+                    return profile.runcall(func, *args, **kwargs)
+            finally:
+                with self._lock:
+                    self.profiles.append(profile)
+        return profiled
+
+    def dump(self):
+        """합친 결과를 path에 저장 (python -m pstats path 로 확인)"""
+        with self._lock:
+            profiles, self.profiles = self.profiles, []
+        if not profiles:
+            return None
+        import pstats
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(self.path)
+        return self.path
+
+
+_default_metrics = None
+_default_lock = threading.Lock()
+
+
+def default_metrics():
+    """프로그램 전체에서 공유하는 Metrics"""
+    global _default_metrics
+    with _default_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics()
+        return _default_metrics
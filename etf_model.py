@@ -0,0 +1,323 @@
+import time
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QAbstractProxyModel, QModelIndex, QTimer
+from PyQt6.QtGui import QColor
+
+from etf_table import COLUMNS, CODE_COLUMN, ColumnStore
+from etf_search import SearchIndex, NUMERIC_SORT_COLUMNS, numeric_key
+
+_ALIGNMENT = {
+    'left': Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+    'center': Qt.AlignmentFlag.AlignCenter,
+    'right': Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter,
+}
+
+# 갱신으로 값이 바뀐 셀을 잠깐 칠하는 색 (상승 빨강, 하락 파랑, 숫자가 아닌 값은 노랑)
+HIGHLIGHT_SECONDS = 3.0
+HIGHLIGHT_COLORS = {1: QColor('#7a1f1f'), -1: QColor('#1f3f7a'), 0: QColor('#5a5a1f')}
+
+
+def change_direction(name, old, new):
+    """값이 오르면 1, 내리면 -1, 비교할 수 없으면 0"""
+    if name not in NUMERIC_SORT_COLUMNS:
+        return 0
+    before, after = numeric_key(name, old), numeric_key(name, new)
+    if before != before or after != after:  # NaN
+        return 0
+    return (after > before) - (after < before)
+
+
+class ETFTableModel(QAbstractTableModel):
+    """ColumnStore를 QTableView에 보여주는 모델
+
+    뷰가 화면에 보이는 셀만 data()로 요청하므로 셀마다 아이템을 만들지 않는다.
+    정렬 방식은 열 정의(COLUMNS)에서 가져온다.
+
+    갱신 결과는 현재 값과 비교해서 실제로 바뀐 셀만 고치고, 그 셀은
+    highlight_seconds 동안 오르내림에 따라 색을 칠한다.
+    """
+
+    def __init__(self, store=None, parent=None, highlight_seconds=HIGHLIGHT_SECONDS):
+        super().__init__(parent)
+        self.store = store if store is not None else ColumnStore()
+        self._alignments = [_ALIGNMENT[align] for _, align, _ in COLUMNS]
+        self.highlight_seconds = highlight_seconds
+        self._highlights = {}  # 종목코드 -> {열 번호: (색, 끝나는 시각)}
+        self._highlight_timer = QTimer(self)
+        self._highlight_timer.setInterval(250)
+        self._highlight_timer.timeout.connect(self._expire_highlights)
+        self._changed_rows = None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.store)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.store.columns)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.store.value(index.row(), index.column())
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return self._alignments[index.column()]
+        if role == Qt.ItemDataRole.BackgroundRole and self._highlights:
+            cells = self._highlights.get(self.store.value(index.row(), CODE_COLUMN))
+            if cells and index.column() in cells:
+                return cells[index.column()][0]
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.store.columns[section]
+        return str(section + 1)
+
+    def set_records(self, records):
+        self.beginResetModel()
+        self._highlights.clear()
+        self.store.clear()
+        self.store.extend(records)
+        self.endResetModel()
+
+    def append_record(self, record):
+        row = len(self.store)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.store.append(record)
+        self.endInsertRows()
+        return row
+
+    def _apply_record(self, row, record):
+        """바뀐 열만 고치고 그 셀을 칠해 둔다. 바뀐 열 번호 목록 반환"""
+        changed = self.store.replace(row, record)
+        if changed and self.highlight_seconds > 0:
+            until = time.monotonic() + self.highlight_seconds
+            cells = self._highlights.setdefault(self.store.value(row, CODE_COLUMN), {})
+            for col, old in changed:
+                name = self.store.columns[col]
+                direction = change_direction(name, old, self.store.value(row, col))
+                cells[col] = (HIGHLIGHT_COLORS[direction], until)
+            if not self._highlight_timer.isActive():
+                self._highlight_timer.start()
+        return [col for col, _ in changed]
+
+    def set_record(self, row, record):
+        changed = self._apply_record(row, record)
+        if changed:
+            self.dataChanged.emit(self.index(row, min(changed)),
+                                  self.index(row, max(changed)),
+                                  [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.BackgroundRole])
+        return changed
+
+    def upsert_records(self, records, insert=True):
+        """여러 레코드를 종목코드 기준으로 한 번에 반영 (있으면 갱신, 없으면 추가)
+
+        현재 값과 다른 셀만 고치고, 바뀐 행은 한 번의 dataChanged로, 새 행은
+        한 번의 행 추가로 알린다. insert가 False이면 표에 없는 종목은 버린다.
+        같은 묶음 안에 같은 종목이 여러 번 있으면 마지막 값이 남는다.
+        """
+        latest = {}
+        for record in records:
+            latest[str(record.get('종목코드', ''))] = record
+        new = [record for code, record in latest.items() if self.store.find(code) is None] if insert else []
+        changed_rows = []
+        changed_columns = set()
+        for code, record in latest.items():
+            row = self.store.find(code)
+            if row is None:
+                continue
+            changed = self._apply_record(row, record)
+            if changed:
+                changed_rows.append(row)
+                changed_columns.update(changed)
+        if changed_rows:
+            # 범위는 하나로 알리되, 실제로 바뀐 행은 changed_rows()로 알려 준다
+            self._changed_rows = sorted(changed_rows)
+            try:
+                self.dataChanged.emit(self.index(self._changed_rows[0], min(changed_columns)),
+                                      self.index(self._changed_rows[-1], max(changed_columns)),
+                                      [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.BackgroundRole])
+            finally:
+                self._changed_rows = None
+        if new:
+            first = len(self.store)
+            self.beginInsertRows(QModelIndex(), first, first + len(new) - 1)
+            self.store.extend(new)
+            self.endInsertRows()
+        return changed_rows, len(new)
+
+    def remove_rows(self, rows):
+        # 뒤에서부터 연속 구간 단위로 지운다
+        rows = sorted(set(rows), reverse=True)
+        while rows:
+            last = first = rows.pop(0)
+            while rows and rows[0] == first - 1:
+                first = rows.pop(0)
+            self.beginRemoveRows(QModelIndex(), first, last)
+            self.store.remove(first, last - first + 1)
+            self.endRemoveRows()
+
+    def records(self):
+        return self.store.records()
+
+    def changed_rows(self, first, last):
+        """dataChanged로 알린 first~last 중 실제로 값이 바뀐 행"""
+        if self._changed_rows is None:
+            return range(first, last + 1)
+        return self._changed_rows
+
+    def _expire_highlights(self):
+        now = time.monotonic()
+        rows = []
+        for code in list(self._highlights):
+            cells = self._highlights[code]
+            for col in [col for col, (_, until) in cells.items() if until <= now]:
+                del cells[col]
+            if not cells:
+                del self._highlights[code]
+                row = self.store.find(code)
+                if row is not None:
+                    rows.append(row)
+        if not self._highlights:
+            self._highlight_timer.stop()
+        if rows:
+            self.dataChanged.emit(self.index(min(rows), 0), self.index(max(rows), self.columnCount() - 1),
+                                  [Qt.ItemDataRole.BackgroundRole])
+
+
+class ETFSortFilterModel(QAbstractProxyModel):
+    """ETFTableModel 위에서 검색어 필터와 열 정렬을 적용하는 모델
+
+    QSortFilterProxyModel은 비교/필터마다 파이썬 호출이 일어나 행이 많으면
+    느리므로, 미리 만든 색인(etf_search.SearchIndex)으로 보이는 행 순서를
+    한 번에 계산한다. 뷰의 행 번호는 mapToSource로 원본 행 번호로 바꾼다.
+    """
+
+    def __init__(self, source, parent=None):
+        super().__init__(parent)
+        self.query = ''
+        self.sort_column = None
+        self.descending = False
+        self._rows = []       # 뷰 행 -> 원본 행
+        self._positions = []  # 원본 행 -> 뷰 행 (-1이면 숨김)
+        self.setSourceModel(source)
+
+    def setSourceModel(self, source):
+        super().setSourceModel(source)
+        self.search_index = SearchIndex(source.store)
+        self._recompute()
+        source.modelReset.connect(self._on_source_reset)
+        source.rowsInserted.connect(self._on_source_rows_inserted)
+        source.rowsRemoved.connect(self._on_source_reset)
+        source.dataChanged.connect(self._on_source_data_changed)
+
+    # -- 필터/정렬 ---------------------------------------------------------------
+
+    def _recompute(self):
+        column = None if self.sort_column is None else self.sourceModel().store.columns[self.sort_column]
+        self._rows = self.search_index.view(self.query, column, self.descending)
+        positions = [-1] * len(self.sourceModel().store)
+        for view_row, source_row in enumerate(self._rows):
+            positions[source_row] = view_row
+        self._positions = positions
+
+    def set_filter(self, text):
+        """검색어를 바꾼다 (입력할 때마다 호출)"""
+        if text == self.query:
+            return
+        self.beginResetModel()
+        self.query = text
+        self._recompute()
+        self.endResetModel()
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        old_rows = self._rows
+        persistent = self.persistentIndexList()
+        self.sort_column = None if column < 0 else column
+        self.descending = order == Qt.SortOrder.DescendingOrder
+        self._recompute()
+        # 선택 등은 원본 행 기준으로 새 위치로 옮긴다
+        self.changePersistentIndexList(persistent, [
+            self.index(self._positions[old_rows[index.row()]], index.column())
+            for index in persistent])
+        self.layoutChanged.emit()
+
+    def _on_source_reset(self, *args):
+        self.beginResetModel()
+        self.search_index.rebuild()
+        self._recompute()
+        self.endResetModel()
+        # 첫 검색이 느리지 않도록 이벤트 루프가 한가할 때 색인을 미리 만든다
+        QTimer.singleShot(0, self.search_index.build)
+
+    def _on_source_rows_inserted(self, parent, first, last):
+        self.beginResetModel()
+        self.search_index.add_rows(first, last)
+        self._recompute()
+        self.endResetModel()
+
+    def _on_source_data_changed(self, top_left, bottom_right, roles=()):
+        source_rows = range(top_left.row(), bottom_right.row() + 1)
+        if roles and Qt.ItemDataRole.DisplayRole not in roles:
+            # 색만 바뀐 경우: 색인/정렬은 그대로 두고 보이는 행만 다시 그린다
+            self._forward_data_changed(source_rows, top_left.column(), bottom_right.column(), roles)
+            return
+        source_rows = self.sourceModel().changed_rows(top_left.row(), bottom_right.row())
+        self.search_index.update_rows(source_rows)
+        old_rows = self._rows
+        if self.query or self.sort_column is not None:
+            column = None if self.sort_column is None else self.sourceModel().store.columns[self.sort_column]
+            new_rows = self.search_index.view(self.query, column, self.descending)
+            if new_rows != old_rows:
+                if len(new_rows) == len(old_rows) and set(new_rows) == set(old_rows):
+                    self.sort(-1 if self.sort_column is None else self.sort_column,
+                              Qt.SortOrder.DescendingOrder if self.descending else Qt.SortOrder.AscendingOrder)
+                else:
+                    self.beginResetModel()
+                    self._recompute()
+                    self.endResetModel()
+                return
+        self._forward_data_changed(source_rows, top_left.column(), bottom_right.column(), roles)
+
+    def _forward_data_changed(self, source_rows, first_column, last_column, roles):
+        view_rows = [self._positions[row] for row in source_rows if self._positions[row] >= 0]
+        if view_rows:
+            self.dataChanged.emit(self.index(min(view_rows), first_column),
+                                  self.index(max(view_rows), last_column), roles)
+
+    # -- QAbstractProxyModel ----------------------------------------------------
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.sourceModel().columnCount()
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not (0 <= row < len(self._rows)):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=None):
+        return QModelIndex()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(self._rows[proxy_index.row()], proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        view_row = self._positions[source_index.row()]
+        return QModelIndex() if view_row < 0 else self.createIndex(view_row, source_index.column())
+
+    def source_row(self, view_row):
+        return self._rows[view_row]
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Vertical and role == Qt.ItemDataRole.DisplayRole:
+            return str(section + 1)
+        return self.sourceModel().headerData(section, orientation, role)
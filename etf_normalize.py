@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+# 화면에 보이는 문자열("4조3,634", "0.070%", "+12.48%", "N/A")을
+# 분석용 숫자 열로 바꾸는 단계. 표시 형식은 format_display()에서만 다룬다.
+
+# 숫자 열 이름 (단위가 붙은 이름으로 원래 문자열 열과 구분한다)
+MARKET_CAP = '시가총액(억원)'
+FEE = '펀드보수(%)'
+RETURN_6M = '6개월 수익률(%)'
+RETURN_1Y = '1년 수익률(%)'
+
+NUMERIC_COLUMNS = {
+    '시가총액': MARKET_CAP,
+    '펀드보수': FEE,
+    '6개월 수익률': RETURN_6M,
+    '1년 수익률': RETURN_1Y,
+}
+TEXT_COLUMNS = ['자산운용사', 'ETF이름', '종목코드']
+
+_MARKET_CAP_RE = r'^\s*(?:(?P<jo>[\d,]+)\s*조)?\s*(?P<eok>[\d,]*)\s*$'
+
+
+def parse_market_cap(values):
+    """'4조3,634' -> 43634 (억원 단위 Int64, 해석할 수 없으면 <NA>)"""
+    values = pd.Series(values, dtype='string')
+    parts = values.str.extract(_MARKET_CAP_RE)
+    jo = pd.to_numeric(parts['jo'].str.replace(',', '', regex=False), errors='coerce')
+    eok = pd.to_numeric(parts['eok'].str.replace(',', '', regex=False)
+                        .replace('', pd.NA), errors='coerce')
+    total = jo.fillna(0) * 10000 + eok.fillna(0)
+    total[jo.isna() & eok.isna()] = np.nan
+    return total.round().astype('Int64')
+
+
+def parse_percent(values):
+    """'+12.48%' -> 12.48, 'N/A' -> NaN (float64)"""
+    values = pd.Series(values, dtype='string')
+    cleaned = values.str.replace(r'[%,\s]', '', regex=True)
+    return pd.to_numeric(cleaned, errors='coerce').astype('float64')
+
+
+def to_dataframe(records):
+    """수집한 레코드 목록(또는 열 이름 -> 값 목록 dict)을 타입이 있는 DataFrame으로 변환
+
+    자산운용사는 category, 시가총액은 억원 단위 Int64, 보수/수익률은 % 단위 float64.
+    """
+    raw = pd.DataFrame(records)
+    df = pd.DataFrame(index=raw.index)
+    for name in TEXT_COLUMNS:
+        column = raw[name] if name in raw else pd.Series("", index=raw.index)
+        df[name] = column.astype('string')
+    df['자산운용사'] = df['자산운용사'].astype('category')
+
+    empty = pd.Series(pd.NA, index=raw.index, dtype='string')
+    df[MARKET_CAP] = parse_market_cap(raw['시가총액'] if '시가총액' in raw else empty)
+    for source in ['펀드보수', '6개월 수익률', '1년 수익률']:
+        df[NUMERIC_COLUMNS[source]] = parse_percent(raw[source] if source in raw else empty)
+    return df
+
+
+def format_market_cap(value):
+    if pd.isna(value):
+        return "N/A"
+    value = int(value)
+    jo, eok = divmod(value, 10000)
+    if jo:
+        return f"{jo:,}조{eok:,}" if eok else f"{jo:,}조"
+    return f"{eok:,}"
+
+
+def format_percent(value, signed=False, decimals=2):
+    if pd.isna(value):
+        return "N/A"
+    return f"{value:+.{decimals}f}%" if signed else f"{value:.{decimals}f}%"
+
+
+def format_display(df):
+    """to_dataframe() 결과를 화면/JSON 표시용 문자열 레코드로 되돌린다"""
+    display = pd.DataFrame({
+        '자산운용사': df['자산운용사'].astype('string').fillna(""),
+        'ETF이름': df['ETF이름'].fillna(""),
+        '종목코드': df['종목코드'].fillna(""),
+        '시가총액': df[MARKET_CAP].map(format_market_cap),
+        '펀드보수': df[FEE].map(lambda v: format_percent(v, decimals=3)),
+        '6개월 수익률': df[RETURN_6M].map(lambda v: format_percent(v, signed=True)),
+        '1년 수익률': df[RETURN_1Y].map(lambda v: format_percent(v, signed=True)),
+    })
+    return display.astype(object).to_dict('records')
@@ -0,0 +1,325 @@
+import codecs
+import html
+import os
+import re
+
+# get_etf_data가 돌려주는 필드 순서 (테이블 열 순서와 같다)
+FIELDS = ['자산운용사', 'ETF이름', '종목코드', '시가총액', '펀드보수', '6개월 수익률', '1년 수익률']
+
+# 네이버 금융 종목 페이지는 EUC-KR이므로 상위 호환인 cp949로 디코딩한다
+DEFAULT_ENCODING = 'cp949'
+_ENCODING_ALIASES = {'euc-kr': 'cp949', 'euc_kr': 'cp949', 'ks_c_5601-1987': 'cp949'}
+
+_CHARSET_RE = re.compile(rb'charset\s*=\s*["\']?([\w-]+)', re.I)
+
+
+class ParseError(ValueError):
+    """페이지에서 필요한 요소를 찾지 못했을 때 발생"""
+
+
+def detect_encoding(content, content_type=None):
+    """Content-Type 헤더 → <meta charset> → 기본값(cp949) 순서로 인코딩 결정 (모르는 이름은 건너뜀)"""
+    candidates = []
+    if content_type:
+        match = _CHARSET_RE.search(content_type.encode('ascii', 'ignore'))
+        if match:
+            candidates.append(match.group(1))
+    match = _CHARSET_RE.search(content[:2048])
+    if match:
+        candidates.append(match.group(1))
+
+    for candidate in candidates:
+        name = candidate.decode('ascii').lower()
+        name = _ENCODING_ALIASES.get(name, name)
+        try:
+            codecs.lookup(name)
+        except LookupError:
+            continue
+        return name
+    return DEFAULT_ENCODING
+
+
+def _make_record(asset_manager, etf_name, code, market_cap, fee,
+                 six_month_return, one_year_return):
+    market_cap = market_cap.replace('\t', '').replace('\n', '')
+    return dict(zip(FIELDS, [asset_manager, etf_name, code, market_cap, fee,
+                             six_month_return, one_year_return]))
+
+
+# ---------------------------------------------------------------------------
+# bs4 (html.parser) - 기존 방식, 다른 백엔드가 없을 때의 대체 경로
+# ---------------------------------------------------------------------------
+
+def parse_bs4(content, encoding):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(content.decode(encoding, 'replace'), 'html.parser')
+    try:
+        etf_name = soup.select_one('div.wrap_company h2 a').text.strip()
+        code = soup.select_one('div.description span.code').text.strip()
+        market_cap = soup.select_one(
+            'div.first table em#_market_sum').text.strip()
+        fee = soup.select_one('table.tbl_type1 td em').text.strip()
+        asset_manager = soup.select('table.tbl_type1')[
+            1].select('td')[1].text.strip()
+        returns = soup.select('div#tab_con1 > div:last-child table tr')
+        six_month_return = returns[2].select_one('td em').text.strip()
+        one_year_return = returns[3].select_one('td em').text.strip()
+    except (AttributeError, IndexError) as e:
+        raise ParseError(f"ETF 정보를 찾을 수 없습니다: {e}") from e
+
+    return _make_record(asset_manager, etf_name, code, market_cap, fee,
+                        six_month_return, one_year_return)
+
+
+# ---------------------------------------------------------------------------
+# lxml - C 파서로 전체 문서를 읽고 XPath로 필요한 요소만 조회
+# ---------------------------------------------------------------------------
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+_XPATHS = {
+    'name': f"//div[{_has_class('wrap_company')}]//h2//a",
+    'code': f"//div[{_has_class('description')}]//span[{_has_class('code')}]",
+    'market_cap': f"//div[{_has_class('first')}]//table//em[@id='_market_sum']",
+    'fee': f"//table[{_has_class('tbl_type1')}]//td//em",
+    'tables': f"//table[{_has_class('tbl_type1')}]",
+    'returns': "//div[@id='tab_con1']/*[last()][self::div]//table//tr",
+}
+_compiled_xpaths = None
+
+
+def parse_lxml(content, encoding):
+    global _compiled_xpaths
+    import lxml.html
+    from lxml import etree
+
+    if _compiled_xpaths is None:
+        _compiled_xpaths = {key: etree.XPath(path)
+                            for key, path in _XPATHS.items()}
+    xp = _compiled_xpaths
+
+    parser = lxml.html.HTMLParser(encoding=encoding)
+    root = lxml.html.fromstring(content, parser=parser)
+    try:
+        etf_name = xp['name'](root)[0].text_content().strip()
+        code = xp['code'](root)[0].text_content().strip()
+        market_cap = xp['market_cap'](root)[0].text_content().strip()
+        fee = xp['fee'](root)[0].text_content().strip()
+        asset_manager = xp['tables'](root)[1].xpath(
+            './/td')[1].text_content().strip()
+        returns = xp['returns'](root)
+        six_month_return = returns[2].xpath(
+            './/td//em')[0].text_content().strip()
+        one_year_return = returns[3].xpath(
+            './/td//em')[0].text_content().strip()
+    except IndexError as e:
+        raise ParseError(f"ETF 정보를 찾을 수 없습니다: {e}") from e
+
+    return _make_record(asset_manager, etf_name, code, market_cap, fee,
+                        six_month_return, one_year_return)
+
+
+# ---------------------------------------------------------------------------
+# fragment - 필요한 조각(div.wrap_company, em#_market_sum, table.tbl_type1,
+# #tab_con1)만 정규식으로 잘라내고 나머지 문서는 파싱하지 않는다
+# ---------------------------------------------------------------------------
+
+_VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+              'link', 'meta', 'param', 'source', 'track', 'wbr'}
+_TAG_RE = re.compile(r'<(/?)([a-zA-Z][a-zA-Z0-9]*)\b[^>]*?(/?)>')
+_STRIP_RE = re.compile(r'<!--.*?-->|<[^>]*>', re.S)
+_tag_patterns = {}
+
+
+def _tag_re(tag):
+    pattern = _tag_patterns.get(tag)
+    if pattern is None:
+        pattern = re.compile(rf'<(/?){tag}\b[^>]*>', re.I)
+        _tag_patterns[tag] = pattern
+    return pattern
+
+
+def _open_re(tag, cls=None, id_=None):
+    if cls:
+        attr = rf'class="(?:[^"]*\s)?{cls}(?:\s[^"]*)?"'
+    elif id_:
+        attr = rf'id="{id_}"'
+    else:
+        return re.compile(rf'<{tag}\b[^>]*>', re.I)
+    return re.compile(rf'<{tag}\b[^>]*\b{attr}[^>]*>', re.I)
+
+
+def _element(text, open_re, tag, pos=0):
+    """open_re로 시작하는 요소를 닫는 태그까지 잘라서 (조각, 끝 위치) 반환"""
+    match = open_re.search(text, pos)
+    if match is None:
+        return None, -1
+    depth = 0
+    for tag_match in _tag_re(tag).finditer(text, match.start()):
+        if tag_match.group(1):
+            depth -= 1
+            if depth == 0:
+                return text[match.start():tag_match.end()], tag_match.end()
+        else:
+            depth += 1
+    return text[match.start():], len(text)
+
+
+def _elements(text, open_re, tag):
+    result = []
+    pos = 0
+    while True:
+        fragment, pos = _element(text, open_re, tag, pos)
+        if fragment is None:
+            return result
+        result.append(fragment)
+
+
+def _last_child(fragment):
+    """fragment 바로 아래 자식 요소 중 마지막 것의 (태그명, 조각)"""
+    inner_start = fragment.index('>') + 1
+    depth = 0
+    last = None
+    start = None
+    for match in _TAG_RE.finditer(fragment, inner_start):
+        closing, tag, self_closing = match.groups()
+        tag = tag.lower()
+        if tag in _VOID_TAGS or self_closing:
+            if depth == 0:
+                last = (tag, match.start(), match.end())
+            continue
+        if closing:
+            depth -= 1
+            if depth == 0 and start is not None:
+                last = (tag, start, match.end())
+        else:
+            if depth == 0:
+                start = match.start()
+            depth += 1
+    if last is None:
+        return None, None
+    return last[0], fragment[last[1]:last[2]]
+
+
+def _text(fragment):
+    return html.unescape(_STRIP_RE.sub('', fragment)).strip()
+
+
+_WRAP_COMPANY = _open_re('div', cls='wrap_company')
+_DESCRIPTION = _open_re('div', cls='description')
+_SPAN_CODE = _open_re('span', cls='code')
+_DIV_FIRST = _open_re('div', cls='first')
+_MARKET_SUM = _open_re('em', id_='_market_sum')
+_TBL_TYPE1 = _open_re('table', cls='tbl_type1')
+_TAB_CON1 = _open_re('div', id_='tab_con1')
+_H2 = _open_re('h2')
+_A = _open_re('a')
+_TD = _open_re('td')
+_TR = _open_re('tr')
+_EM = _open_re('em')
+
+
+def _first_em_in_td(fragment):
+    for td in _elements(fragment, _TD, 'td'):
+        em, _ = _element(td, _EM, 'em')
+        if em is not None:
+            return _text(em)
+    raise ParseError("td em 요소를 찾을 수 없습니다")
+
+
+def _find(text, open_re, tag):
+    fragment, _ = _element(text, open_re, tag)
+    if fragment is None:
+        raise ParseError(f"ETF 정보를 찾을 수 없습니다: {open_re.pattern}")
+    return fragment
+
+
+def parse_fragment(content, encoding):
+    text = content.decode(encoding, 'replace')
+
+    company = _find(text, _WRAP_COMPANY, 'div')
+    etf_name = _text(_find(_find(company, _H2, 'h2'), _A, 'a'))
+    code = _text(_find(_find(text, _DESCRIPTION, 'div'), _SPAN_CODE, 'span'))
+
+    market_cap = _text(_find(_find(text, _DIV_FIRST, 'div'), _MARKET_SUM, 'em'))
+
+    tables = _elements(text, _TBL_TYPE1, 'table')
+    if len(tables) < 2:
+        raise ParseError("table.tbl_type1 요소가 부족합니다")
+    fee = None
+    for table in tables:
+        try:
+            fee = _first_em_in_td(table)
+            break
+        except ParseError:
+            continue
+    if fee is None:
+        raise ParseError("펀드보수를 찾을 수 없습니다")
+    manager_cells = _elements(tables[1], _TD, 'td')
+    if len(manager_cells) < 2:
+        raise ParseError("자산운용사를 찾을 수 없습니다")
+    asset_manager = _text(manager_cells[1])
+
+    tag, last_child = _last_child(_find(text, _TAB_CON1, 'div'))
+    rows = _elements(last_child, _TR, 'tr') if tag == 'div' else []
+    if len(rows) < 4:
+        raise ParseError("수익률 정보를 찾을 수 없습니다")
+    six_month_return = _first_em_in_td(rows[2])
+    one_year_return = _first_em_in_td(rows[3])
+
+    return _make_record(asset_manager, etf_name, code, market_cap, fee,
+                        six_month_return, one_year_return)
+
+
+# ---------------------------------------------------------------------------
+
+BACKENDS = {
+    'fragment': parse_fragment,
+    'lxml': parse_lxml,
+    'bs4': parse_bs4,
+}
+
+
+def available_backends():
+    names = ['fragment']
+    try:
+        import lxml.html  # noqa: F401
+        names.append('lxml')
+    except ImportError:
+        pass
+    try:
+        import bs4  # noqa: F401
+        names.append('bs4')
+    except ImportError:
+        pass
+    return names
+
+
+def check_backend(name):
+    """백엔드 이름을 확인해서 돌려준다. 모르는 이름이면 ValueError"""
+    if name not in BACKENDS:
+        raise ValueError(f"알 수 없는 파서 백엔드: {name!r} (가능한 값: {', '.join(BACKENDS)})")
+    return name
+
+
+# 환경변수 KOR_ETF_PARSER로 백엔드를 고를 수 있다 (fragment / lxml / bs4).
+# 잘못 적으면 페이지마다 실패하지 않고 불러올 때 바로 알린다
+DEFAULT_BACKEND = check_backend(os.environ.get('KOR_ETF_PARSER', 'fragment'))
+
+
+def parse_etf_page(content, content_type=None, backend=None):
+    """종목 페이지 본문(bytes)에서 ETF 정보를 추출해 dict로 반환
+
+    선택한 백엔드가 실패하면 기존 bs4 경로로 한 번 더 시도한다.
+    """
+    backend = check_backend(backend) if backend else DEFAULT_BACKEND
+    encoding = detect_encoding(content, content_type)
+    try:
+        return BACKENDS[backend](content, encoding)
+    except (ParseError, ImportError):
+        if backend == 'bs4':
+            raise
+        return parse_bs4(content, encoding)
@@ -0,0 +1,289 @@
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from etf_normalize import FEE, RETURN_6M, RETURN_1Y, to_dataframe, format_percent
+from etf_search import numeric_key
+
+# 보유 종목(금액 또는 비중)으로 포트폴리오의 가중 평균 보수/수익률과
+# 운용사별 비중을 계산한다. GUI와 무관하다.
+#
+#   python etf_portfolio.py                               # 요약 + 운용사별
+#   python etf_portfolio.py --set 360750 --amount 5000000
+#   python etf_portfolio.py --set 133690 --weight 30
+#   python etf_portfolio.py --remove 360750
+
+# 가중 평균을 내는 숫자 열과 원래 문자열 열
+METRICS = (FEE, RETURN_6M, RETURN_1Y)
+SOURCE_COLUMNS = {FEE: '펀드보수', RETURN_6M: '6개월 수익률', RETURN_1Y: '1년 수익률'}
+
+SIZE = '보유량'
+WEIGHT = '비중(%)'
+COUNT = '종목 수'
+
+# 합계 벡터의 칸: [보유량, 종목 수, 지표별 (보유량 x 값), 지표별 (값이 있는 보유량)]
+_SIZE, _COUNT = 0, 1
+_NUM = slice(2, 2 + len(METRICS))
+_DEN = slice(2 + len(METRICS), 2 + 2 * len(METRICS))
+_WIDTH = 2 + 2 * len(METRICS)
+
+
+def holding_size(holding):
+    """보유 금액이 있으면 금액, 없으면 비중. 둘 다 없으면 None"""
+    if not holding:
+        return None
+    for key in ('amount', 'weight'):
+        value = holding.get(key)
+        if value is not None and value == value:
+            return float(value)
+    return None
+
+
+def holding_unit(holding):
+    """holding_size가 쓰는 단위: 'amount', 'weight', 둘 다 없으면 None"""
+    if not holding:
+        return None
+    for key in ('amount', 'weight'):
+        value = holding.get(key)
+        if value is not None and value == value:
+            return key
+    return None
+
+
+def check_units(holdings):
+    """금액으로 준 종목과 비중으로 준 종목이 섞여 있으면 ValueError. 쓰는 단위를 돌려준다"""
+    by_unit = {}
+    for code, holding in holdings.items():
+        unit = holding_unit(holding)
+        if unit is not None:
+            by_unit.setdefault(unit, []).append(str(code))
+    if len(by_unit) > 1:
+        raise ValueError("보유량은 금액과 비중 중 한 가지로 맞춰야 합니다 "
+                         f"(금액: {', '.join(sorted(by_unit['amount']))} / "
+                         f"비중: {', '.join(sorted(by_unit['weight']))})")
+    return next(iter(by_unit), None)
+
+
+def contributions(sizes, values):
+    """행마다 합계 벡터에 더할 값 (N x _WIDTH). values는 N x len(METRICS), 없는 값은 NaN"""
+    sizes = np.asarray(sizes, dtype='float64')
+    values = np.asarray(values, dtype='float64').reshape(len(sizes), len(METRICS))
+    known = ~np.isnan(values)
+    out = np.zeros((len(sizes), _WIDTH))
+    out[:, _SIZE] = sizes
+    out[:, _COUNT] = 1.0
+    out[:, _NUM] = sizes[:, None] * np.where(known, values, 0.0)
+    out[:, _DEN] = sizes[:, None] * known
+    return out
+
+
+def _averages(totals):
+    """합계 벡터 -> 지표별 가중 평균 (값이 있는 보유량으로 나눈다)"""
+    num, den = totals[..., _NUM], totals[..., _DEN]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(den > 0, num / den, np.nan)
+
+
+class Portfolio:
+    """보유 종목의 가중 평균 보수/수익률과 운용사별 비중
+
+    보유량은 종목마다 금액(원) 또는 비중 중 하나로 준다. 금액이 있으면 금액을,
+    없으면 비중을 그 종목의 크기로 쓰므로 한 포트폴리오에서는 한 가지로 맞춘다
+    (섞여 있으면 만들 때나 set_holding에서 ValueError).
+    전체를 만들 때는 열 단위 NumPy/pandas 연산으로 합계를 구하고, 한 종목이
+    갱신되면 그 종목의 이전 기여분을 빼고 새 기여분을 더해서 합계만 고친다.
+    """
+
+    def __init__(self, records=(), holdings=None):
+        self.holdings = dict(holdings or {})
+        self.unit = check_units(self.holdings)
+        self.set_records(records)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, code):
+        return code in self._rows
+
+    # -- 전체 계산 -------------------------------------------------------------
+
+    def set_records(self, records):
+        """표 전체(레코드 목록)에서 보유 종목만 골라 다시 계산"""
+        held = [record for record in records
+                if holding_size(self.holdings.get(str(record.get('종목코드', '')))) is not None]
+        self._rows = {}         # 종목코드 -> (운용사, 이름, 지표 값 배열)
+        self._contrib = {}      # 종목코드 -> 합계 벡터에 더한 값
+        self._totals = np.zeros(_WIDTH)
+        self._managers = {}     # 운용사 -> 합계 벡터
+        if not held:
+            return
+        df = to_dataframe(held)
+        codes = df['종목코드'].astype(str).tolist()
+        managers = df['자산운용사'].astype(str).tolist()
+        names = df['ETF이름'].astype(str).tolist()
+        values = df[list(METRICS)].to_numpy(dtype='float64', na_value=np.nan)
+        sizes = np.array([holding_size(self.holdings[code]) for code in codes])
+        matrix = contributions(sizes, values)
+        self._totals = matrix.sum(axis=0)
+        grouped = pd.DataFrame(matrix).groupby(pd.Series(managers), sort=False).sum()
+        self._managers = {manager: row.to_numpy(dtype='float64', copy=True)
+                          for manager, row in grouped.iterrows()}
+        for i, code in enumerate(codes):
+            self._rows[code] = (managers[i], names[i], values[i])
+            self._contrib[code] = matrix[i]
+
+    # -- 한 종목씩 고치기 -------------------------------------------------------
+
+    def _apply(self, code, row):
+        """code의 이전 기여분을 빼고 row(없으면 제거)의 기여분을 더한다"""
+        old = self._contrib.pop(code, None)
+        if old is not None:
+            manager = self._rows.pop(code)[0]
+            self._totals -= old
+            self._managers[manager] -= old
+            if self._managers[manager][_COUNT] <= 0:
+                del self._managers[manager]
+        size = holding_size(self.holdings.get(code))
+        if row is None or size is None:
+            return
+        manager, name, values = row
+        new = contributions([size], [values])[0]
+        self._rows[code] = row
+        self._contrib[code] = new
+        self._totals += new
+        if manager in self._managers:
+            self._managers[manager] += new
+        else:
+            self._managers[manager] = new.copy()
+
+    def update_record(self, record):
+        """갱신된 종목 하나를 반영한다. 보유 종목이 아니면 False"""
+        code = str(record.get('종목코드', ''))
+        if code not in self._rows:
+            if holding_size(self.holdings.get(code)) is None:
+                return False
+        values = np.array([numeric_key(SOURCE_COLUMNS[metric], str(record.get(SOURCE_COLUMNS[metric]) or ""))
+                           for metric in METRICS])
+        self._apply(code, (str(record.get('자산운용사') or ""), str(record.get('ETF이름') or ""), values))
+        return True
+
+    def set_holding(self, code, amount=None, weight=None, record=None):
+        """보유 금액/비중을 바꾼다 (둘 다 None이면 뺀다). record가 없으면 이전 값을 쓴다
+
+        다른 종목과 단위가 달라지면 아무것도 바꾸지 않고 ValueError.
+        """
+        holdings = dict(self.holdings)
+        if amount is None and weight is None:
+            holdings.pop(code, None)
+        else:
+            holdings[code] = {'amount': amount, 'weight': weight}
+        self.unit = check_units(holdings)
+        self.holdings = holdings
+        if record is not None and code in self.holdings:
+            self.update_record(record)
+        else:
+            self._apply(code, self._rows.get(code))
+
+    def remove(self, code):
+        self.set_holding(code)
+
+    # -- 결과 -----------------------------------------------------------------
+
+    def summary(self):
+        """보유 종목 수, 보유량 합계, 지표별 가중 평균과 값이 있는 비율(%)"""
+        total = self._totals[_SIZE]
+        averages = _averages(self._totals)
+        result = {COUNT: int(round(self._totals[_COUNT])), SIZE: float(total)}
+        for i, metric in enumerate(METRICS):
+            result[metric] = float(averages[i])
+            result[f'{metric} 반영 비율'] = float(self._totals[_DEN][i] / total * 100) if total else np.nan
+        return result
+
+    def by_manager(self):
+        """운용사별 종목 수, 비중(%), 가중 평균 보수/수익률 (비중이 큰 순서)"""
+        columns = [COUNT, WEIGHT, *METRICS]
+        if not self._managers:
+            return pd.DataFrame(columns=columns)
+        names = list(self._managers)
+        totals = np.vstack([self._managers[name] for name in names])
+        total = self._totals[_SIZE]
+        df = pd.DataFrame(_averages(totals), index=pd.Index(names, name='자산운용사'), columns=list(METRICS))
+        df.insert(0, COUNT, np.rint(totals[:, _COUNT]).astype(int))
+        df.insert(1, WEIGHT, totals[:, _SIZE] / total * 100 if total else np.nan)
+        return df.sort_values(WEIGHT, ascending=False)
+
+    def to_dataframe(self):
+        """보유 종목별 보유량, 비중(%), 지표 값과 가중 평균에 대한 기여도"""
+        columns = ['자산운용사', 'ETF이름', SIZE, WEIGHT, *METRICS]
+        if not self._rows:
+            return pd.DataFrame(columns=columns)
+        codes = list(self._rows)
+        sizes = np.array([self._contrib[code][_SIZE] for code in codes])
+        values = np.vstack([self._rows[code][2] for code in codes])
+        total = self._totals[_SIZE]
+        df = pd.DataFrame(values, index=pd.Index(codes, name='종목코드'), columns=list(METRICS))
+        df.insert(0, '자산운용사', [self._rows[code][0] for code in codes])
+        df.insert(1, 'ETF이름', [self._rows[code][1] for code in codes])
+        df.insert(2, SIZE, sizes)
+        df.insert(3, WEIGHT, sizes / total * 100 if total else np.nan)
+        # 기여도: 그 종목이 가중 평균에 보탠 값 (값이 없는 종목은 0)
+        den = self._totals[_DEN]
+        for i, metric in enumerate(METRICS):
+            share = sizes / den[i] if den[i] else np.zeros(len(sizes))
+            df[f'{metric} 기여'] = np.where(np.isnan(values[:, i]), 0.0, share * np.nan_to_num(values[:, i]))
+        return df.sort_values(WEIGHT, ascending=False)
+
+
+def format_summary(portfolio):
+    """명령행/상태 표시용 한 줄 요약"""
+    s = portfolio.summary()
+    return (f"보유 {s[COUNT]}종목 | 가중 보수 {format_percent(s[FEE], decimals=3)} | "
+            f"6개월 {format_percent(s[RETURN_6M], signed=True)} | 1년 {format_percent(s[RETURN_1Y], signed=True)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="보유 ETF 포트폴리오 요약 (가중 보수/수익률, 운용사별 비중)")
+    parser.add_argument('--db', help="SQLite 저장소 경로")
+    parser.add_argument('--set', metavar='CODE', help="보유량을 기록할 종목코드")
+    parser.add_argument('--amount', type=float, help="보유 금액(원)")
+    parser.add_argument('--weight', type=float, help="비중 (금액 대신)")
+    parser.add_argument('--remove', metavar='CODE', help="보유 종목에서 뺀다")
+    parser.add_argument('--csv', help="종목별 결과를 CSV로 저장")
+    args = parser.parse_args(argv)
+
+    if args.set and args.amount is None and args.weight is None:
+        parser.error("--set에는 --amount나 --weight가 필요합니다")
+    from etf_db import DB_FILE_PATH, ETFDatabase
+    with ETFDatabase(args.db or DB_FILE_PATH) as db:
+        # 고친 뒤의 보유 목록이 한 단위로 맞는지 먼저 보고 저장한다
+        # (이미 섞여 있는 저장소도 --set/--remove로 맞추면 고쳐진다)
+        holdings = db.holdings()
+        if args.set:
+            holdings[args.set] = {'amount': args.amount, 'weight': args.weight}
+        if args.remove:
+            holdings.pop(args.remove, None)
+        try:
+            check_units(holdings)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.set:
+            db.set_holding(args.set, args.amount, args.weight)
+        if args.remove:
+            db.set_holding(args.remove)
+        portfolio = Portfolio(db.records(), holdings)
+
+    print(format_summary(portfolio))
+    with pd.option_context('display.width', 120, 'display.max_columns', None):
+        if len(portfolio):
+            print()
+            print(portfolio.by_manager().round(3).to_string())
+    if args.csv:
+        portfolio.to_dataframe().to_csv(args.csv, encoding='utf-8-sig')
+        print(f"저장했습니다: {args.csv}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
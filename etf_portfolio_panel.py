@@ -0,0 +1,218 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget,
+                             QTableWidgetItem, QHeaderView, QAbstractItemView, QFileDialog, QMessageBox)
+from PyQt6.QtCore import Qt, QTimer
+
+from etf_normalize import FEE, RETURN_6M, RETURN_1Y, format_percent
+from etf_portfolio import Portfolio, COUNT, WEIGHT, format_summary
+from etf_table import CODE_COLUMN
+
+# 보유 종목(금액/비중)을 입력하고 가중 보수/수익률, 운용사별 비중을 보는 창.
+# 표가 갱신되면 바뀐 보유 종목만 Portfolio에 반영하고 잠시 뒤 화면을 다시 그린다.
+
+_HOLDING_HEADERS = ['종목코드', 'ETF이름', '금액(원)', '비중', '실제 비중', '펀드보수', '6개월', '1년']
+_AMOUNT_COLUMN, _WEIGHT_COLUMN = 2, 3
+_MANAGER_HEADERS = ['자산운용사', COUNT, WEIGHT, '가중 보수', '6개월', '1년']
+
+
+def _number(text):
+    text = text.replace(',', '').strip()
+    return float(text) if text else None
+
+
+def _format_number(value):
+    if value is None or value != value:
+        return ""
+    return f"{value:,.0f}" if float(value).is_integer() else f"{value:,.4g}"
+
+
+def _item(text, editable=False, align=Qt.AlignmentFlag.AlignRight):
+    item = QTableWidgetItem(text)
+    item.setTextAlignment(align | Qt.AlignmentFlag.AlignVCenter)
+    if not editable:
+        item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+    return item
+
+
+class PortfolioPanel(QDialog):
+    def __init__(self, model, db, selected_codes=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("포트폴리오")
+        self.resize(760, 520)
+        self.model = model
+        self.db = db
+        self.selected_codes = selected_codes or (lambda: [])
+        self.portfolio = Portfolio(model.store.records(), db.holdings())
+        self._filling = False
+
+        layout = QVBoxLayout()
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+
+        self.holdings_table = QTableWidget(0, len(_HOLDING_HEADERS))
+        self.holdings_table.setHorizontalHeaderLabels(_HOLDING_HEADERS)
+        self.holdings_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+        self.holdings_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.holdings_table.itemChanged.connect(self.on_item_changed)
+        layout.addWidget(QLabel("보유 종목 (금액이나 비중 칸을 더블클릭해서 입력. 금액이 있으면 금액을 씁니다)"))
+        layout.addWidget(self.holdings_table, 3)
+
+        self.manager_table = QTableWidget(0, len(_MANAGER_HEADERS))
+        self.manager_table.setHorizontalHeaderLabels(_MANAGER_HEADERS)
+        self.manager_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.manager_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        layout.addWidget(QLabel("운용사별"))
+        layout.addWidget(self.manager_table, 2)
+
+        button_layout = QHBoxLayout()
+        add_button = QPushButton("선택한 종목 추가")
+        add_button.clicked.connect(self.add_selected)
+        remove_button = QPushButton("빼기")
+        remove_button.clicked.connect(self.remove_selected)
+        export_button = QPushButton("CSV 저장")
+        export_button.clicked.connect(self.export)
+        close_button = QPushButton("닫기")
+        close_button.clicked.connect(self.close)
+        for button in (add_button, remove_button, export_button, close_button):
+            button_layout.addWidget(button)
+        layout.addLayout(button_layout)
+        self.setLayout(layout)
+
+        # 갱신이 잇따라 도착해도 화면은 한 번만 다시 그린다
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(200)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+        model.dataChanged.connect(self.on_data_changed)
+        model.modelReset.connect(self.reload)
+        model.rowsInserted.connect(self.reload)
+        model.rowsRemoved.connect(self.reload)
+        self.refresh()
+
+    # -- 표 변경 반영 -----------------------------------------------------------
+
+    def on_data_changed(self, top_left, bottom_right, roles=()):
+        if roles and Qt.ItemDataRole.DisplayRole not in roles:
+            return
+        store = self.model.store
+        changed = False
+        for row in self.model.changed_rows(top_left.row(), bottom_right.row()):
+            if store.value(row, CODE_COLUMN) in self.portfolio.holdings:
+                changed |= self.portfolio.update_record(store.record(row))
+        if changed:
+            self.schedule_refresh()
+
+    def reload(self, *args):
+        self.portfolio.set_records(self.model.store.records())
+        self.schedule_refresh()
+
+    def schedule_refresh(self):
+        if self.isVisible() and not self.refresh_timer.isActive():
+            self.refresh_timer.start()
+
+    def showEvent(self, event):
+        self.refresh()
+        super().showEvent(event)
+
+    # -- 화면 -----------------------------------------------------------------
+
+    def refresh(self):
+        self.summary_label.setText(format_summary(self.portfolio))
+        self._filling = True
+        try:
+            self._fill_holdings()
+            self._fill_managers()
+        finally:
+            self._filling = False
+
+    def _fill_holdings(self):
+        rows = self.portfolio.to_dataframe()
+        codes = list(rows.index) + sorted(set(self.portfolio.holdings) - set(rows.index))
+        self.holdings_table.setRowCount(len(codes))
+        for i, code in enumerate(codes):
+            holding = self.portfolio.holdings.get(code, {})
+            in_table = code in rows.index
+            row = rows.loc[code] if in_table else None
+            self.holdings_table.setItem(i, 0, _item(code, align=Qt.AlignmentFlag.AlignCenter))
+            self.holdings_table.setItem(i, 1, _item(row['ETF이름'] if in_table else "(표에 없음)",
+                                                    align=Qt.AlignmentFlag.AlignLeft))
+            self.holdings_table.setItem(i, _AMOUNT_COLUMN, _item(_format_number(holding.get('amount')), True))
+            self.holdings_table.setItem(i, _WEIGHT_COLUMN, _item(_format_number(holding.get('weight')), True))
+            values = ([format_percent(row[WEIGHT]), format_percent(row[FEE], decimals=3),
+                       format_percent(row[RETURN_6M], signed=True), format_percent(row[RETURN_1Y], signed=True)]
+                      if in_table else ["", "", "", ""])
+            for col, text in enumerate(values, start=4):
+                self.holdings_table.setItem(i, col, _item(text))
+
+    def _fill_managers(self):
+        managers = self.portfolio.by_manager()
+        self.manager_table.setRowCount(len(managers))
+        for i, (name, row) in enumerate(managers.iterrows()):
+            values = [str(row[COUNT]), format_percent(row[WEIGHT]), format_percent(row[FEE], decimals=3),
+                      format_percent(row[RETURN_6M], signed=True), format_percent(row[RETURN_1Y], signed=True)]
+            self.manager_table.setItem(i, 0, _item(name, align=Qt.AlignmentFlag.AlignLeft))
+            for col, text in enumerate(values, start=1):
+                self.manager_table.setItem(i, col, _item(text))
+
+    # -- 편집 -----------------------------------------------------------------
+
+    def _record(self, code):
+        row = self.model.store.find(code)
+        return None if row is None else self.model.store.record(row)
+
+    def set_holding(self, code, amount=None, weight=None):
+        # 단위가 섞이면 Portfolio가 거절하므로 저장소에는 그 다음에 쓴다
+        try:
+            self.portfolio.set_holding(code, amount, weight, self._record(code))
+        except ValueError as e:
+            QMessageBox.warning(self, "오류", str(e))
+            self.schedule_refresh()
+            return False
+        self.db.set_holding(code, amount, weight)
+        self.schedule_refresh()
+        return True
+
+    def on_item_changed(self, item):
+        if self._filling or item.column() not in (_AMOUNT_COLUMN, _WEIGHT_COLUMN):
+            return
+        code = self.holdings_table.item(item.row(), 0).text()
+        try:
+            amount = _number(self.holdings_table.item(item.row(), _AMOUNT_COLUMN).text())
+            weight = _number(self.holdings_table.item(item.row(), _WEIGHT_COLUMN).text())
+        except ValueError:
+            QMessageBox.warning(self, "오류", "숫자를 입력하세요.")
+            self.schedule_refresh()
+            return
+        if amount is None and weight is None:
+            # 칸을 비웠다고 빼지는 않는다 ('빼기' 버튼 사용). 포트폴리오 단위로 0을 넣는다
+            if self.portfolio.unit == 'amount':
+                amount = 0.0
+            else:
+                weight = 0.0
+        self.set_holding(code, amount, weight)
+
+    def add_selected(self):
+        # 금액으로 관리하는 포트폴리오면 금액 0, 아니면 비중 1로 넣고 바로 고칠 수 있게 한다
+        uses_amount = self.portfolio.unit == 'amount'
+        added = 0
+        for code in self.selected_codes():
+            if code not in self.portfolio.holdings:
+                if not self.set_holding(code, 0.0 if uses_amount else None, None if uses_amount else 1.0):
+                    self.refresh()
+                    return
+                added += 1
+        if not added:
+            QMessageBox.information(self, "알림", "메인 표에서 추가할 종목을 선택하세요.")
+        self.refresh()
+
+    def remove_selected(self):
+        rows = {index.row() for index in self.holdings_table.selectionModel().selectedRows()}
+        for code in [self.holdings_table.item(row, 0).text() for row in rows]:
+            self.set_holding(code)
+        self.refresh()
+
+    def export(self):
+        path, _ = QFileDialog.getSaveFileName(self, "포트폴리오 저장", "portfolio.csv", "CSV (*.csv)")
+        if path:
+            self.portfolio.to_dataframe().to_csv(path, encoding='utf-8-sig')
+            QMessageBox.information(self, "성공", f"저장했습니다.\n{path}")
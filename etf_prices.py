@@ -0,0 +1,453 @@
+import argparse
+import datetime
+import math
+import os
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+import pandas as pd
+
+from etf_metrics import default_metrics
+from etf_parser import ParseError, detect_encoding
+from etf_scheduler import KST, KRX_HOLIDAYS
+from naver_client import default_client
+from refresh_engine import DEFAULT_MAX_WORKERS
+
+# 일별 시세(OHLCV) 수집과 기간 수익률 계산.
+#
+# 네이버 일별 시세 페이지(item/sise_day.naver, 한 페이지 10거래일)를 여러 페이지 동시에 받고,
+# 이미 저장된 날짜에 닿으면 더 받지 않는다. 종목마다 prices/<종목코드>.ohlcv 에
+# 고정 크기 레코드(날짜, 시가, 고가, 저가, 종가, 거래량)를 날짜 순으로 덧붙이고
+# 읽을 때는 numpy.memmap 으로 연다. YTD, 3년 같은 수익률은 다시 받지 않고 여기서 계산한다.
+#
+#   python etf_prices.py update                  # stock.db의 모든 종목
+#   python etf_prices.py update 360750 --years 10
+#   python etf_prices.py returns --periods 1M,YTD,1Y,3Y,2020-03-20
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PRICES_DIR = os.path.join(SCRIPT_DIR, 'prices')
+
+SISE_DAY_URL = os.environ.get(
+    'KOR_ETF_SISE_DAY_URL', "https://finance.naver.com/item/sise_day.naver?code={code}&page={page}")
+ROWS_PER_PAGE = 10
+
+# 처음 받는 종목은 이만큼(년) 거슬러 올라가 받는다
+DEFAULT_YEARS = int(os.environ.get('KOR_ETF_PRICE_YEARS', '5'))
+
+# 날짜는 yyyymmdd 정수, 가격은 원 단위 정수
+DTYPE = np.dtype([('date', '<i4'), ('open', '<i4'), ('high', '<i4'), ('low', '<i4'),
+                  ('close', '<i4'), ('volume', '<i8')])
+
+DEFAULT_PERIODS = ('1M', '3M', '6M', 'YTD', '1Y', '3Y')
+
+
+def sise_day_url(code, page):
+    return SISE_DAY_URL.format(code=code, page=page)
+
+
+def date_int(day):
+    return day.year * 10000 + day.month * 100 + day.day
+
+
+def int_date(value):
+    value = int(value)
+    return datetime.date(value // 10000, value // 100 % 100, value % 100)
+
+
+def today_kst():
+    return datetime.datetime.now(KST).date()
+
+
+# -- 페이지 해석 -----------------------------------------------------------------
+
+_ROW_RE = re.compile(r'<tr[^>]*>(.*?)</tr>', re.S | re.I)
+_CELL_RE = re.compile(r'<td[^>]*>(.*?)</td>', re.S | re.I)
+_TAG_RE = re.compile(r'<[^>]+>')
+_DATE_RE = re.compile(r'^(\d{4})\.(\d{2})\.(\d{2})$')
+_PAGE_RE = re.compile(r'sise_day\.naver\?[^"\']*?page=(\d+)', re.I)
+_LAST_PAGE_RE = re.compile(r'class="pgRR"[^>]*>\s*<a[^>]*page=(\d+)', re.I)
+
+
+def _number(text):
+    text = text.replace(',', '').strip()
+    return int(text) if text else 0
+
+
+def parse_sise_day(content, content_type=None):
+    """일별 시세 페이지 -> (DTYPE 배열 (최신 날짜가 먼저), 마지막 페이지 번호 또는 None)
+
+    표의 열: 날짜, 종가, 전일비, 시가, 고가, 저가, 거래량 (전일비는 쓰지 않는다)
+    """
+    text = content.decode(detect_encoding(content, content_type), 'replace')
+    rows = []
+    for row in _ROW_RE.findall(text):
+        cells = [_TAG_RE.sub('', cell).strip() for cell in _CELL_RE.findall(row)]
+        if len(cells) < 7:
+            continue
+        match = _DATE_RE.match(cells[0])
+        if not match:
+            continue
+        year, month, day = (int(part) for part in match.groups())
+        try:
+            close, open_, high, low, volume = (_number(cells[i]) for i in (1, 3, 4, 5, 6))
+        except ValueError as e:
+            raise ParseError(f"일별 시세를 읽지 못했습니다: {cells}") from e
+        rows.append((year * 10000 + month * 100 + day, open_, high, low, close, volume))
+    if not rows and 'type2' not in text:
+        raise ParseError("일별 시세 표를 찾을 수 없습니다")
+
+    match = _LAST_PAGE_RE.search(text)
+    if match:
+        last_page = int(match.group(1))
+    else:
+        pages = [int(page) for page in _PAGE_RE.findall(text)]
+        last_page = max(pages) if pages else None
+    return np.array(rows, dtype=DTYPE), last_page
+
+
+# -- 저장소 ---------------------------------------------------------------------
+
+class PriceStore:
+    """종목마다 날짜 순 OHLCV 레코드를 이진 파일 하나에 모은다
+
+    새 날짜는 파일 뒤에 덧붙이고, 마지막 날짜(장중에 받은 값일 수 있음)부터는 덮어쓴다.
+    더 오래된 날짜가 들어오면 파일을 다시 쓴다(임시 파일 후 교체).
+    """
+
+    def __init__(self, root=PRICES_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, code):
+        return os.path.join(self.root, f'{code}.ohlcv')
+
+    def codes(self):
+        return sorted(name[:-len('.ohlcv')] for name in os.listdir(self.root) if name.endswith('.ohlcv'))
+
+    def _rows(self, code):
+        path = self.path(code)
+        return os.path.getsize(path) // DTYPE.itemsize if os.path.exists(path) else 0
+
+    def load(self, code):
+        """날짜 순 DTYPE 배열 (memmap, 읽기 전용). 없으면 빈 배열"""
+        rows = self._rows(code)
+        if not rows:
+            return np.empty(0, dtype=DTYPE)
+        # 쓰는 도중 끊겨 남은 조각(레코드 크기의 나머지)은 무시한다
+        return np.memmap(self.path(code), dtype=DTYPE, mode='r', shape=(rows,))
+
+    def latest_date(self, code):
+        prices = self.load(code)
+        return int(prices['date'][-1]) if len(prices) else None
+
+    def first_date(self, code):
+        prices = self.load(code)
+        return int(prices['date'][0]) if len(prices) else None
+
+    def merge(self, code, rows):
+        """rows(DTYPE, 순서 무관)를 합친다. 같은 날짜는 rows 값으로 바뀐다. 새로 생긴 날짜 수를 반환"""
+        rows = np.sort(np.asarray(rows, dtype=DTYPE), kind='stable', order='date')
+        if not len(rows):
+            return 0
+        rows = rows[np.unique(rows['date'], return_index=True)[1]]  # 같은 날짜는 처음 것만
+        with self._lock, default_metrics().timer('persist', code):
+            existing = np.array(self.load(code))
+            path = self.path(code)
+            cut = int(np.searchsorted(existing['date'], rows['date'][0], 'left'))
+            tail = existing['date'][cut:]
+            if cut > 0 or not len(existing):
+                if np.isin(tail, rows['date']).all():
+                    # 흔한 경우: 마지막 날짜부터 뒤만 바뀜 -> 잘라 내고 덧붙인다
+                    with open(path, 'ab') as f:
+                        f.truncate(cut * DTYPE.itemsize)
+                        f.write(rows.tobytes())
+                    return len(rows) - len(tail)
+            keep = existing[~np.isin(existing['date'], rows['date'])]
+            merged = np.sort(np.concatenate([keep, rows]), order='date')
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(merged.tobytes())
+            os.replace(tmp_path, path)
+            return len(merged) - len(existing)
+
+    def frame(self, code, start=None, end=None):
+        """DataFrame (index: 날짜, 열: open/high/low/close/volume)"""
+        prices = self.load(code)
+        lo = 0 if start is None else int(np.searchsorted(prices['date'], date_int(start), 'left'))
+        hi = len(prices) if end is None else int(np.searchsorted(prices['date'], date_int(end), 'right'))
+        prices = np.array(prices[lo:hi])
+        df = pd.DataFrame({name: prices[name] for name in DTYPE.names[1:]},
+                          index=pd.to_datetime(prices['date'].astype(str), format='%Y%m%d'))
+        df.index.name = 'date'
+        return df
+
+
+# -- 수집 -----------------------------------------------------------------------
+
+def _busday_count(start, end, holidays=KRX_HOLIDAYS):
+    return int(np.busday_count(start, end, holidays=sorted(holidays)))
+
+
+class _Pagination:
+    """한 종목의 페이지 수집 상태
+
+    floor: 이 날짜에 닿으면(그 날짜를 포함한 페이지까지 받으면) 그만 받는다.
+    """
+
+    def __init__(self, code, floor, keep_from):
+        self.code = code
+        self.floor = floor
+        self.keep_from = keep_from
+        self.pages = {}
+        self.requested = 0      # 지금까지 요청한 가장 뒤 페이지
+        self.outstanding = set()
+        self.last_page = None
+        self.stop_page = None
+        self.error = None
+
+    def add(self, page, rows, last_page):
+        self.pages[page] = rows
+        if last_page:
+            self.last_page = max(self.last_page or 0, last_page)
+        if (not len(rows) or page >= (self.last_page or page)
+                or int(rows['date'].min()) <= self.floor):
+            self.stop_page = page if self.stop_page is None else min(self.stop_page, page)
+
+    @property
+    def complete(self):
+        return self.stop_page is not None and all(page in self.pages for page in range(1, self.stop_page + 1))
+
+    def next_pages(self, window):
+        """다음에 요청할 페이지들. 첫 페이지를 받은 뒤에는 floor까지 필요한 페이지 수를 어림한다"""
+        count = window
+        if self.requested == 1 and 1 in self.pages and len(self.pages[1]):
+            newest = int_date(self.pages[1]['date'].max())
+            count = math.ceil((_busday_count(int_date(self.floor), newest) + 1) / ROWS_PER_PAGE) - 1
+            count = max(1, count)
+        first = self.requested + 1
+        last = first + count - 1
+        if self.last_page:
+            last = min(last, self.last_page)
+        return list(range(first, last + 1))
+
+    def rows(self):
+        rows = np.concatenate([self.pages[page] for page in range(1, self.stop_page + 1)])
+        return rows[rows['date'] >= self.keep_from]
+
+
+class PriceIngestor:
+    """여러 종목의 일별 시세 페이지를 하나의 스레드 풀에서 동시에 받는다
+
+    종목마다 첫 페이지를 받은 뒤, 저장된 마지막 날짜(처음이면 years년 전)까지 필요한
+    페이지 수를 어림해서 한꺼번에 요청하고, 그 날짜가 나온 페이지에서 멈춘다.
+    요청 속도는 공유 NaverClient의 속도 제한을 따른다.
+    """
+
+    def __init__(self, store=None, workers=DEFAULT_MAX_WORKERS, years=DEFAULT_YEARS, client=None):
+        self.store = store if store is not None else PriceStore()
+        self.workers = max(1, int(workers))
+        self.years = years
+        self.client = client
+
+    def _fetch_page(self, code, page):
+        metrics = default_metrics()
+        with metrics.timer('fetch', code):
+            response = (self.client or default_client()).get(sise_day_url(code, page))
+        with metrics.timer('parse', code):
+            return parse_sise_day(response.content, response.headers.get('Content-Type'))
+
+    def _state(self, code, today):
+        latest = self.store.latest_date(code)
+        if latest is not None:
+            # 마지막 날짜는 장중 값이었을 수 있으므로 그 날짜부터 다시 받는다
+            return _Pagination(code, latest, latest)
+        try:
+            since = today.replace(year=today.year - self.years)
+        except ValueError:  # 2월 29일
+            since = today.replace(year=today.year - self.years, day=28)
+        return _Pagination(code, date_int(since), 0)
+
+    def update(self, codes, on_result=None, on_error=None, today=None):
+        """codes의 새 시세를 받아 저장한다. ({종목코드: 새 날짜 수}, {종목코드: 오류}) 반환
+
+        on_result(code, added) / on_error(code, error)는 이 메서드를 부른 스레드에서 호출된다.
+        """
+        today = today or today_kst()
+        codes = list(dict.fromkeys(codes))
+        batch = default_metrics().begin_batch('prices', len(codes))
+        results, errors = {}, {}
+        pending = {}
+
+        with ThreadPoolExecutor(self.workers, thread_name_prefix='etf-prices') as executor:
+            def submit(state, pages):
+                for page in pages:
+                    future = executor.submit(self._fetch_page, state.code, page)
+                    pending[future] = (state, page)
+                    state.outstanding.add(future)
+                    state.requested = max(state.requested, page)
+
+            def finish(state):
+                for future in state.outstanding:
+                    future.cancel()  # 멈춘 페이지 뒤로 미리 요청한 페이지
+                    pending.pop(future, None)
+                state.outstanding.clear()
+                if state.error is not None:
+                    errors[state.code] = state.error
+                    if on_error:
+                        on_error(state.code, state.error)
+                    return
+                added = self.store.merge(state.code, state.rows())
+                results[state.code] = added
+                if on_result:
+                    on_result(state.code, added)
+
+            for code in codes:
+                submit(self._state(code, today), [1])
+
+            while pending:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future not in pending:
+                        continue
+                    state, page = pending.pop(future)
+                    state.outstanding.discard(future)
+                    try:
+                        rows, last_page = future.result()
+                    except (OSError, ValueError, LookupError) as e:
+                        state.error = e
+                        finish(state)
+                        continue
+                    state.add(page, rows, last_page)
+                    if state.complete:
+                        finish(state)
+                    elif not state.outstanding:
+                        submit(state, state.next_pages(self.workers))
+        default_metrics().end_batch(batch, len(results), len(errors))
+        return results, errors
+
+
+# -- 기간 수익률 ----------------------------------------------------------------
+
+_PERIOD_RE = re.compile(r'^(\d+)([DWMY])$')
+
+
+def period_start(end, period):
+    """end(date) 기준 period('1M', '3Y', 'YTD', '2024-01-02')의 기준 날짜
+
+    그 날짜나 그 전의 마지막 거래일 종가가 기준 가격이 된다.
+    """
+    period = period.strip().upper()
+    if period == 'YTD':
+        return datetime.date(end.year - 1, 12, 31)
+    match = _PERIOD_RE.match(period)
+    if not match:
+        return datetime.date.fromisoformat(period)
+    n, unit = int(match.group(1)), match.group(2)
+    if unit == 'D':
+        return end - datetime.timedelta(days=n)
+    if unit == 'W':
+        return end - datetime.timedelta(weeks=n)
+    months = n * (12 if unit == 'Y' else 1)
+    year, month = divmod(end.year * 12 + end.month - 1 - months, 12)
+    month += 1
+    last_day = (datetime.date(year + month // 12, month % 12 + 1, 1) - datetime.timedelta(days=1)).day
+    return datetime.date(year, month, min(end.day, last_day))
+
+
+def period_return(prices, period, end=None):
+    """prices(날짜 순 DTYPE 배열)의 기간 수익률(%). 기간만큼 시세가 없으면 NaN"""
+    dates = prices['date']
+    if not len(dates):
+        return math.nan
+    end_index = len(dates) - 1 if end is None else int(np.searchsorted(dates, date_int(end), 'right')) - 1
+    if end_index < 0:
+        return math.nan
+    base = date_int(period_start(int_date(dates[end_index]), period))
+    base_index = int(np.searchsorted(dates, base, 'right')) - 1
+    if base_index < 0 or base_index >= end_index:
+        return math.nan
+    base_close = prices['close'][base_index]
+    if not base_close:
+        return math.nan
+    return float(prices['close'][end_index] / base_close * 100 - 100)
+
+
+def returns(store, codes=None, periods=DEFAULT_PERIODS, end=None):
+    """종목별 기간 수익률(%) DataFrame (index: 종목코드, 열: 기준일 + 기간)"""
+    codes = store.codes() if codes is None else list(codes)
+    rows = []
+    for code in codes:
+        prices = store.load(code)
+        dates = prices['date']
+        end_index = len(dates) - 1 if end is None else int(np.searchsorted(dates, date_int(end), 'right')) - 1
+        row = {'기준일': int_date(dates[end_index]) if end_index >= 0 else None}
+        row.update((period, period_return(prices, period, end)) for period in periods)
+        rows.append(row)
+    return pd.DataFrame(rows, index=pd.Index(codes, name='종목코드'), columns=['기준일', *periods])
+
+
+# -- 명령행 ---------------------------------------------------------------------
+
+def _codes(args):
+    if args.codes:
+        return list(args.codes)
+    from etf_db import DB_FILE_PATH, ETFDatabase
+    with ETFDatabase(args.db or DB_FILE_PATH) as db:
+        return db.codes()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="일별 시세(OHLCV) 수집과 기간 수익률")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('update', help="일별 시세를 받아 prices/에 저장 (저장된 날짜까지만)")
+    p.add_argument('codes', nargs='*', help="종목코드 (생략하면 stock.db의 전체 종목)")
+    p.add_argument('--db', help="SQLite 저장소 경로")
+    p.add_argument('--years', type=int, default=DEFAULT_YEARS, help="처음 받는 종목은 몇 년치를 받을지")
+    p.add_argument('-j', '--workers', type=int, default=DEFAULT_MAX_WORKERS, help="동시 요청 수")
+    p.add_argument('-q', '--quiet', action='store_true')
+
+    p = commands.add_parser('returns', help="저장된 시세로 기간 수익률 계산")
+    p.add_argument('codes', nargs='*', help="종목코드 (생략하면 prices/의 전체 종목)")
+    p.add_argument('--periods', default=','.join(DEFAULT_PERIODS),
+                   help="기간 목록 (1M, 3M, 6M, YTD, 1Y, 3Y, 10D, 2W 또는 2024-01-02 같은 기준 날짜)")
+    p.add_argument('--end', help="이 날짜 기준 (기본: 마지막 거래일)")
+    p.add_argument('--csv', help="CSV로 저장")
+
+    p = commands.add_parser('show', help="한 종목의 저장된 시세")
+    p.add_argument('code')
+    p.add_argument('--tail', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    store = PriceStore()
+    if args.command == 'update':
+        log = (lambda message: None) if args.quiet else (lambda message: print(message, file=sys.stderr))
+        results, errors = PriceIngestor(store, args.workers, args.years).update(
+            _codes(args),
+            on_result=lambda code, added: log(f"  OK   {code} +{added}일 (마지막 {store.latest_date(code)})"),
+            on_error=lambda code, error: log(f"  FAIL {code}: {error}"))
+        log(f"{len(results)}종목 갱신, {len(errors)}종목 실패")
+        log(default_metrics().summary())
+        return 1 if errors else 0
+
+    if args.command == 'returns':
+        periods = [period.strip() for period in args.periods.split(',') if period.strip()]
+        end = datetime.date.fromisoformat(args.end) if args.end else None
+        df = returns(store, args.codes or None, periods, end)
+        with pd.option_context('display.width', 120, 'display.max_columns', None):
+            print(df.round(2).to_string())
+        if args.csv:
+            df.to_csv(args.csv, encoding='utf-8-sig')
+        return 0
+
+    with pd.option_context('display.width', 120):
+        print(store.frame(args.code).tail(args.tail).to_string())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
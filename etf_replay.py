@@ -0,0 +1,457 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+from naver_client import FetchStats
+
+# 녹화/재생 모드: 네이버 응답 원본을 압축 파일 하나(.ketf)에 모아 두고,
+# 나중에 네트워크 없이 그 파일에서 같은 응답을 돌려준다.
+# 파서 버그를 그대로 재현하거나, 전체 갱신을 오프라인에서 빠르게 돌려 볼 때 쓴다.
+#
+#   python etf_replay.py record sample.ketf 360750 133690 -f codes.txt
+#   python etf_replay.py replay sample.ketf --latency 0.05 -j 64
+#   python etf_replay.py show sample.ketf 360750 --raw > page.html
+#   KOR_ETF_REPLAY=sample.ketf python main.py
+#
+# 파일 구성: MAGIC | 본문(zlib)... | 색인(zlib JSON) | 꼬리(색인 위치, 크기, MAGIC)
+# 본문은 응답마다 따로 압축하므로 색인만 읽고 필요한 응답 하나만 풀 수 있다.
+
+MAGIC = b'KETFREC1'
+_FOOTER = struct.Struct('<QQ8s')
+ARCHIVE_VERSION = 1
+
+# 기록해 두는 응답 헤더 (파싱/조건부 GET에 쓰는 것만)
+KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+# 환경변수로 공유 클라이언트를 녹화/재생 모드로 만든다 (naver_client.default_client)
+RECORD_PATH = os.environ.get('KOR_ETF_RECORD')
+REPLAY_PATH = os.environ.get('KOR_ETF_REPLAY')
+# 재생할 때 응답마다 기다릴 시간(초). 'recorded'면 녹화할 때 걸린 시간만큼
+REPLAY_LATENCY = os.environ.get('KOR_ETF_REPLAY_LATENCY', '0')
+
+
+class ReplayMiss(LookupError):
+    """녹화 파일에 없는 URL을 요청함"""
+
+
+def archive_key(url):
+    """호스트를 뺀 경로 + 정렬한 쿼리 (로컬 대역 서버 주소로 녹화해도 재생된다)"""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return parts.path + ('?' + query if query else '')
+
+
+def parse_latency(value):
+    if value in (None, ''):
+        return 0.0
+    if value == 'recorded':
+        return value
+    return float(value)
+
+
+class _Headers(dict):
+    """대소문자를 가리지 않는 응답 헤더"""
+
+    def __init__(self, headers=()):
+        super().__init__((key.lower(), value) for key, value in dict(headers).items())
+
+    def __getitem__(self, key):
+        return super().__getitem__(key.lower())
+
+    def __contains__(self, key):
+        return super().__contains__(key.lower())
+
+    def get(self, key, default=None):
+        return super().get(key.lower(), default)
+
+
+class ReplayResponse:
+    """requests.Response 중 이 프로그램이 쓰는 부분만 흉내 낸 응답"""
+
+    def __init__(self, url, status_code, headers, content):
+        self.url = url
+        self.status_code = status_code
+        self.headers = _Headers(headers)
+        self.content = content
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        from etf_parser import detect_encoding
+        return self.content.decode(detect_encoding(self.content, self.headers.get('Content-Type')), 'replace')
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise OSError(f"{self.status_code} (녹화된 응답): {self.url}")
+
+    def iter_content(self, chunk_size=1):
+        size = chunk_size or len(self.content) or 1
+        for start in range(0, len(self.content), size):
+            yield self.content[start:start + size]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# -- 파일 쓰기/읽기 --------------------------------------------------------------
+
+class ArchiveWriter:
+    """응답을 하나씩 압축해서 붙여 쓰고 close()에서 색인을 쓴다
+
+    임시 파일에 쓴 뒤 교체하므로 녹화가 중간에 실패해도 기존 파일은 그대로다.
+    append면 기존 파일의 응답을 먼저 옮겨 온다 (같은 URL은 새 응답이 이긴다).
+    여러 스레드에서 동시에 add를 불러도 된다.
+    """
+
+    def __init__(self, path, append=False, level=6):
+        self.path = path
+        self.level = level
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._tmp_path = path + '.tmp'
+        self._file = open(self._tmp_path, 'wb')
+        self._file.write(MAGIC)
+        if append and os.path.exists(path):
+            with Archive(path) as old:
+                for key, entry in old.entries.items():
+                    self._write(key, dict(entry), old.raw(entry))
+
+    def _write(self, key, entry, compressed):
+        entry['offset'] = self._file.tell()
+        entry['size'] = len(compressed)
+        self._file.write(compressed)
+        self.entries[key] = entry
+
+    def add(self, url, status_code, headers, content, elapsed=0.0):
+        compressed = zlib.compress(content, self.level)
+        entry = {
+            'url': url, 'status': status_code, 'length': len(content),
+            'headers': {name: headers[name] for name in KEPT_HEADERS if headers.get(name)},
+            'elapsed': round(elapsed, 6), 'recorded_at': round(time.time(), 3),
+        }
+        with self._lock:
+            self._write(archive_key(url), entry, compressed)
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            index = zlib.compress(json.dumps(
+                {'version': ARCHIVE_VERSION, 'entries': self.entries}, ensure_ascii=False).encode('utf-8'))
+            offset = self._file.tell()
+            self._file.write(index)
+            self._file.write(_FOOTER.pack(offset, len(index), MAGIC))
+            self._file.close()
+            self._file = None
+            os.replace(self._tmp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Archive:
+    """녹화 파일을 mmap으로 열어 응답을 하나씩 꺼낸다 (여러 스레드에서 읽어도 된다)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(self._map) < len(MAGIC) + _FOOTER.size or self._map[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"녹화 파일이 아닙니다: {path}")
+            offset, size, magic = _FOOTER.unpack(self._map[-_FOOTER.size:])
+            if magic != MAGIC:
+                raise ValueError(f"녹화 파일이 완전하지 않습니다: {path}")
+            index = json.loads(zlib.decompress(self._map[offset:offset + size]))
+        except BaseException:
+            self.close()
+            raise
+        if index.get('version') != ARCHIVE_VERSION:
+            self.close()
+            raise ValueError(f"지원하지 않는 녹화 파일 버전입니다: {index.get('version')}")
+        self.entries = index['entries']
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, url):
+        return archive_key(url) in self.entries
+
+    def entry(self, url):
+        return self.entries.get(archive_key(url))
+
+    def raw(self, entry):
+        return self._map[entry['offset']:entry['offset'] + entry['size']]
+
+    def content(self, entry):
+        return zlib.decompress(self.raw(entry))
+
+    def response(self, url):
+        entry = self.entry(url)
+        if entry is None:
+            raise ReplayMiss(f"녹화 파일에 없는 주소입니다: {url}")
+        return ReplayResponse(url, entry['status'], entry['headers'], self.content(entry))
+
+    def codes(self):
+        """녹화된 종목 페이지의 종목코드 (녹화한 순서)"""
+        from etf_cache import code_from_url
+        entries = sorted(self.entries.values(), key=lambda entry: entry['offset'])
+        return [code for code in (code_from_url(entry['url']) for entry in entries) if code]
+
+    def close(self):
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# -- 클라이언트 -----------------------------------------------------------------
+
+class ReplayClient:
+    """NaverClient 대신 녹화 파일에서 응답을 돌려주는 클라이언트
+
+    latency(초)를 주면 응답마다 그만큼 기다리고, 'recorded'면 녹화할 때 걸린 시간만큼 기다린다.
+    """
+
+    def __init__(self, archive, latency=0.0):
+        self.archive = archive if isinstance(archive, Archive) else Archive(archive)
+        self.latency = latency
+        self.stats = FetchStats()
+        self._lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        entry = self.archive.entry(url)
+        if entry is None:
+            with self._lock:
+                self.stats.failures += 1
+            raise ReplayMiss(f"녹화 파일에 없는 주소입니다: {url}")
+        response = ReplayResponse(url, entry['status'], entry['headers'], self.archive.content(entry))
+        delay = entry['elapsed'] if self.latency == 'recorded' else self.latency
+        if delay:
+            time.sleep(delay)
+        with self._lock:
+            self.stats.requests += 1
+            self.stats.bytes_received += entry['size']
+            self.stats.bytes_decoded += len(response.content)
+        response.raise_for_status()
+        return response
+
+    def open_stream(self, url, **kwargs):
+        return self.get(url)
+
+    def breaker_states(self):
+        return {}
+
+    def close(self):
+        self.archive.close()
+
+
+def _elapsed(response):
+    """서버 응답에 걸린 시간 (속도 제한으로 기다린 시간은 빼고)"""
+    elapsed = getattr(response, 'elapsed', None)
+    return elapsed.total_seconds() if elapsed is not None else 0.0
+
+
+class RecordingClient:
+    """실제 클라이언트로 받은 응답을 ArchiveWriter에 기록하면서 그대로 돌려준다"""
+
+    def __init__(self, writer, client=None):
+        if client is None:
+            from naver_client import NaverClient
+            client = NaverClient()
+        self.writer = writer
+        self.client = client
+
+    def get(self, url, **kwargs):
+        response = self.client.get(url, **kwargs)
+        self.writer.add(url, response.status_code, response.headers, response.content, _elapsed(response))
+        return response
+
+    def open_stream(self, url, **kwargs):
+        # 목록 API처럼 조금씩 읽는 요청도 본문 전체를 받아 기록한다
+        with self.client.open_stream(url, **kwargs) as response:
+            content = response.content
+        self.writer.add(url, response.status_code, response.headers, content, _elapsed(response))
+        return ReplayResponse(url, response.status_code, response.headers, content)
+
+    def __getattr__(self, name):
+        # stats, breaker_states 등은 실제 클라이언트 것을 쓴다
+        return getattr(self.client, name)
+
+    def close(self):
+        self.writer.close()
+        self.client.close()
+
+
+def client_from_env():
+    """KOR_ETF_REPLAY / KOR_ETF_RECORD가 있으면 그에 맞는 클라이언트, 없으면 None"""
+    if REPLAY_PATH:
+        return ReplayClient(REPLAY_PATH, parse_latency(REPLAY_LATENCY))
+    if RECORD_PATH:
+        import atexit
+        writer = ArchiveWriter(RECORD_PATH, append=True)
+        atexit.register(writer.close)  # 프로그램이 끝날 때 색인을 쓴다
+        return RecordingClient(writer)
+    return None
+
+
+# -- 명령행 ---------------------------------------------------------------------
+
+def record(path, targets, workers, append=False, bulk=None, log=None, client=None):
+    """targets를 실제로 받아 path에 녹화한다. (결과 목록, 오류) 반환
+
+    client(NaverClient)를 주지 않으면 기본 설정(속도 제한 포함)으로 받는다.
+    """
+    import etf_core
+    from etf_cache import ETFCache, set_default_cache
+    from naver_client import set_default_client
+
+    writer = ArchiveWriter(path, append)
+    client = RecordingClient(writer, client)
+    set_default_client(client)
+    set_default_cache(ETFCache(path=None))  # 캐시에 있어도 모두 새로 받는다
+    try:
+        results, errors = etf_core.refresh(targets, workers, bulk=bulk, parse_pool=False,
+                                           on_result=log and (lambda url, data: log(f"  OK   {url}")),
+                                           on_error=log and (lambda url, error: log(f"  FAIL {url}: {error}")))
+    finally:
+        client.close()
+        set_default_client(None)
+        set_default_cache(None)
+    return results, errors
+
+
+def replay(path, workers, latency=0.0, repeat=1, codes=None, bulk=None):
+    """녹화 파일로 전체 갱신을 repeat번 돌려 처리량을 잰다"""
+    import etf_core
+    from etf_cache import ETFCache, set_default_cache
+    from naver_client import set_default_client
+
+    client = ReplayClient(path, latency)
+    set_default_client(client)
+    targets = codes or client.archive.codes()
+    runs = []
+    try:
+        for _ in range(repeat):
+            set_default_cache(ETFCache(path=None))
+            start = time.perf_counter()
+            results, errors = etf_core.refresh(targets, workers, bulk=bulk)
+            elapsed = time.perf_counter() - start
+            runs.append({'rows': len(results), 'errors': len(errors), 'seconds': round(elapsed, 4),
+                         'requests_per_sec': round(len(targets) / elapsed, 1)})
+    finally:
+        client.close()
+        set_default_client(None)
+        set_default_cache(None)
+    return runs, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="네이버 응답 녹화/재생 (.ketf)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('record', help="종목 페이지를 받아 녹화 파일에 저장")
+    p.add_argument('archive', help="녹화 파일 (.ketf)")
+    p.add_argument('targets', nargs='*', help="종목코드 또는 종목 페이지 URL")
+    p.add_argument('-f', '--file', help="종목코드/URL 목록 파일 (txt/csv/parquet/xlsx)")
+    p.add_argument('--all-listed', action='store_true', help="상장 ETF 전체")
+    p.add_argument('--db', help="이 저장소(stock.db)의 종목 전체")
+    p.add_argument('--append', action='store_true', help="기존 녹화 파일에 더한다")
+    p.add_argument('--no-bulk', dest='bulk', action='store_false', default=None, help="목록 API를 녹화하지 않음")
+    p.add_argument('-j', '--workers', type=int, default=8)
+    p.add_argument('-q', '--quiet', action='store_true')
+
+    p = commands.add_parser('replay', help="녹화 파일로 전체 갱신을 돌려 처리량 측정")
+    p.add_argument('archive')
+    p.add_argument('codes', nargs='*', help="일부 종목만 (생략하면 녹화된 전체)")
+    p.add_argument('--latency', default='0', help="응답마다 기다릴 시간(초) 또는 recorded")
+    p.add_argument('--repeat', type=int, default=3)
+    p.add_argument('--no-bulk', dest='bulk', action='store_false', default=None)
+    p.add_argument('-j', '--workers', type=int, default=32)
+
+    p = commands.add_parser('show', help="녹화된 응답 목록, 또는 한 종목의 파싱 결과/원본")
+    p.add_argument('archive')
+    p.add_argument('target', nargs='?', help="종목코드 또는 URL")
+    p.add_argument('--raw', action='store_true', help="파싱하지 않고 원본 본문을 출력")
+    p.add_argument('--backend', help="파서 백엔드 (fragment / lxml / bs4)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        import etf_core
+        targets = list(args.targets)
+        if args.file:
+            from etf_export import iter_targets
+            targets += list(iter_targets(args.file))
+        if args.db:
+            from etf_db import ETFDatabase
+            with ETFDatabase(args.db) as db:
+                targets += db.codes()
+        if args.all_listed:
+            import etf_bulk
+            targets += list(etf_bulk.prime_cache())
+        if not targets:
+            parser.error("녹화할 종목이 없습니다")
+        log = None if args.quiet else (lambda message: print(message, file=sys.stderr))
+        results, errors = record(args.archive, etf_core.parse_targets('\n'.join(targets)),
+                                 args.workers, args.append, args.bulk, log)
+        with Archive(args.archive) as archive:
+            size = os.path.getsize(args.archive)
+            print(f"{len(results)}건 녹화, {len(errors)}건 실패: {args.archive} "
+                  f"(응답 {len(archive)}개, {size / 1024:.0f}KB)", file=sys.stderr)
+        return 1 if errors else 0
+
+    if args.command == 'replay':
+        runs, errors = replay(args.archive, args.workers, parse_latency(args.latency), args.repeat,
+                              args.codes or None, args.bulk)
+        print(json.dumps(runs, ensure_ascii=False, indent=2))
+        for url, error in list(errors.items())[:10]:
+            print(f"  FAIL {url}: {error}", file=sys.stderr)
+        return 1 if errors else 0
+
+    with Archive(args.archive) as archive:
+        if not args.target:
+            for key, entry in sorted(archive.entries.items(), key=lambda item: item[1]['offset']):
+                print(f"{entry['status']}\t{entry['length']:>8}\t{entry['size']:>7}\t{entry['elapsed']:.3f}s\t{key}")
+            return 0
+        import etf_core
+        url = etf_core.normalize_target(args.target)
+        response = archive.response(url)
+        if args.raw:
+            sys.stdout.buffer.write(response.content)
+            return 0
+        from etf_parser import parse_etf_page
+        data = parse_etf_page(response.content, response.headers.get('Content-Type'), args.backend)
+        print(json.dumps(data, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
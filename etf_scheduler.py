@@ -0,0 +1,262 @@
+import datetime
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+
+# 한국거래소(KRX) 정규장: 평일 09:00 ~ 15:30 (KST, 서머타임 없음)
+KST = datetime.timezone(datetime.timedelta(hours=9), 'KST')
+MARKET_OPEN = datetime.time(9, 0)
+MARKET_CLOSE = datetime.time(15, 30)
+
+# 휴장일은 환경변수 KRX_HOLIDAYS="2024-10-01,2024-10-03" 형식으로 지정한다
+KRX_HOLIDAYS = {
+    datetime.date.fromisoformat(day.strip())
+    for day in os.environ.get('KRX_HOLIDAYS', '').split(',') if day.strip()
+}
+
+# 장중 갱신 주기(초)
+DEFAULT_INTERVAL = int(os.environ.get('KOR_ETF_REFRESH_INTERVAL', '300'))
+
+# 시가총액 상위 비율 -> 중요도 (나머지는 1.0). 중요도 2.0이면 주기가 절반이 된다
+IMPORTANCE_TIERS = ((0.1, 2.0), (0.3, 1.5))
+
+
+def is_trading_day(day, holidays=KRX_HOLIDAYS):
+    return day.weekday() < 5 and day not in holidays
+
+
+def is_market_open(ts=None, holidays=KRX_HOLIDAYS):
+    now = datetime.datetime.fromtimestamp(time.time() if ts is None else ts, KST)
+    return (is_trading_day(now.date(), holidays)
+            and MARKET_OPEN <= now.time() < MARKET_CLOSE)
+
+
+def market_close_ts(ts, holidays=KRX_HOLIDAYS):
+    """ts가 속한 날의 장 마감 시각 (epoch 초)"""
+    day = datetime.datetime.fromtimestamp(ts, KST).date()
+    return datetime.datetime.combine(day, MARKET_CLOSE, KST).timestamp()
+
+
+def next_market_open(ts=None, holidays=KRX_HOLIDAYS):
+    """ts 이후 처음 장이 열리는 시각 (epoch 초)"""
+    now = datetime.datetime.fromtimestamp(time.time() if ts is None else ts, KST)
+    day = now.date()
+    if now.time() >= MARKET_OPEN:
+        day += datetime.timedelta(days=1)
+    while not is_trading_day(day, holidays):
+        day += datetime.timedelta(days=1)
+    return datetime.datetime.combine(day, MARKET_OPEN, KST).timestamp()
+
+
+def last_market_close(ts=None, holidays=KRX_HOLIDAYS):
+    """ts 이전의 가장 최근 장 마감 시각 (epoch 초)"""
+    now = datetime.datetime.fromtimestamp(time.time() if ts is None else ts, KST)
+    day = now.date()
+    if not (is_trading_day(day, holidays) and now.time() >= MARKET_CLOSE):
+        day -= datetime.timedelta(days=1)
+    while not is_trading_day(day, holidays):
+        day -= datetime.timedelta(days=1)
+    return datetime.datetime.combine(day, MARKET_CLOSE, KST).timestamp()
+
+
+def stale_codes(codes, last_refreshed, max_age=DEFAULT_INTERVAL, now=None, holidays=KRX_HOLIDAYS):
+    """다시 받아야 할 종목 (codes 순서 유지)
+
+    갱신한 지 max_age가 지났고, 장중이거나 마지막 갱신이 가장 최근 종가
+    반영(마감 1분 뒤) 전이면 오래된 것으로 본다. 한 번도 갱신하지 않은 종목도 포함.
+    """
+    now = time.time() if now is None else now
+    market_open = is_market_open(now, holidays)
+    closed_at = None if market_open else last_market_close(now, holidays) + 60
+    stale = []
+    for code in codes:
+        ts = last_refreshed.get(code)
+        if ts is None or (now - ts >= max_age and (market_open or ts < closed_at)):
+            stale.append(code)
+    return stale
+
+
+def market_cap_importance(market_caps, held=()):
+    """종목코드 -> 시가총액(모르면 NaN)으로 스케줄러 중요도를 정한다
+
+    시가총액 상위 10%는 2.0, 30%까지는 1.5, 나머지와 시가총액을 모르는 종목은 1.0이고
+    held(보유 종목)는 가장 높은 단계로 올린다. 단계로 나누므로 시가총액이 조금
+    바뀌어서는 중요도(와 다음 갱신 시각)가 바뀌지 않는다.
+    """
+    known = sorted(((cap, code) for code, cap in market_caps.items() if cap == cap), reverse=True)
+    importance = {code: 1.0 for code in market_caps}
+    for rank, (_, code) in enumerate(known):
+        for share, value in IMPORTANCE_TIERS:
+            if rank < share * len(known):
+                importance[code] = value
+                break
+    for code in held:
+        if code in importance:
+            importance[code] = IMPORTANCE_TIERS[0][1]
+    return importance
+
+
+class RefreshScheduler:
+    """오래된 종목부터 조금씩 백그라운드에서 갱신하는 스케줄러
+
+    종목마다 다음 갱신 시각을 우선순위 큐(heap)에 넣어 두고, 시각이 된
+    종목만 엔진에 넘긴다. 중요도가 높을수록 주기가 짧아지고, 주기에는
+    jitter를 섞어 한꺼번에 몰리지 않게 한다. 장이 닫혀 있으면 다음 개장
+    시각까지 미루고, 장 마감 직후에 종가 반영을 위해 한 번 더 갱신한다.
+    """
+
+    def __init__(self, engine, fetch, on_result=None, on_error=None,
+                 interval=DEFAULT_INTERVAL, jitter=0.2, max_in_flight=4,
+                 holidays=KRX_HOLIDAYS, clock=time.time):
+        self.engine = engine
+        self.fetch = fetch
+        self.on_result = on_result
+        self.on_error = on_error
+        self.interval = interval
+        self.jitter = jitter
+        self.max_in_flight = max_in_flight
+        self.holidays = holidays
+        self.clock = clock
+        self._heap = []
+        self._entries = {}   # code -> (due, importance, seq)
+        self._refreshed = {}  # code -> set_codes/add로 받은 마지막 갱신 시각
+        self._in_flight = set()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    # -- 종목 관리 -------------------------------------------------------------
+
+    def set_codes(self, codes, importance=None, last_refreshed=None):
+        """감시할 종목 목록을 바꾼다 (목록에 없는 종목은 빠진다)
+
+        갱신 시각과 중요도가 지난번과 같은 종목은 그대로 두고, 바뀐 종목만 다시 잡는다.
+        """
+        importance = importance or {}
+        last_refreshed = last_refreshed or {}
+        codes = list(codes)
+        with self._lock:
+            for code in set(self._entries) - set(codes):
+                del self._entries[code]
+                self._refreshed.pop(code, None)
+            changed = [code for code in codes
+                       if code not in self._entries
+                       or self._refreshed.get(code) != last_refreshed.get(code)
+                       or self._entries[code][1] != importance.get(code, 1.0)]
+        for code in changed:
+            self.add(code, importance.get(code, 1.0), last_refreshed.get(code))
+
+    def add(self, code, importance=1.0, last_refreshed=None):
+        with self._lock:
+            if code in self._entries and last_refreshed is None:
+                due, _, _ = self._entries[code]
+            elif last_refreshed is None:
+                due = self.clock()  # 처음 보는 종목은 바로 갱신
+            else:
+                due = self._next_due(last_refreshed, importance)
+            self._push(code, due, importance)
+            self._refreshed[code] = last_refreshed
+        self._wakeup.set()
+
+    def remove(self, code):
+        with self._lock:
+            self._entries.pop(code, None)
+            self._refreshed.pop(code, None)
+
+    def _push(self, code, due, importance):
+        seq = next(self._seq)
+        self._entries[code] = (due, importance, seq)
+        # 같은 시각이면 중요도가 높은 종목이 먼저 나온다
+        heapq.heappush(self._heap, (due, -importance, seq, code))
+
+    def _next_due(self, now, importance):
+        interval = self.interval / max(importance, 0.01)
+        spread = random.uniform(-self.jitter, self.jitter) * interval
+        if is_market_open(now, self.holidays):
+            due = now + interval + spread
+            close = market_close_ts(now, self.holidays)
+            if due >= close:
+                # 마감 직후 한 번 더 받아 종가를 반영한다
+                due = close + 60 + random.uniform(0, self.interval)
+            return due
+        # 장이 닫혀 있으면 개장 직후 구간에 고르게 나눠서 갱신
+        return next_market_open(now, self.holidays) + random.uniform(0, self.interval)
+
+    def pending(self):
+        """(다음 갱신 시각, 종목코드) 목록을 시각 순으로"""
+        with self._lock:
+            return sorted((due, code) for code, (due, _, _) in self._entries.items())
+
+    # -- 실행 -----------------------------------------------------------------
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='etf-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stopped.is_set()
+
+    def _pop_due(self, now):
+        """갱신할 때가 된 종목들과, 다음에 깨어날 때까지 기다릴 시간"""
+        ready = []
+        with self._lock:
+            while self._heap and len(self._in_flight) + len(ready) < self.max_in_flight:
+                due, _, seq, code = self._heap[0]
+                entry = self._entries.get(code)
+                if entry is None or entry[2] != seq:
+                    heapq.heappop(self._heap)   # 지워졌거나 다시 잡힌 항목
+                    continue
+                if due > now:
+                    break
+                heapq.heappop(self._heap)
+                if code in self._in_flight:
+                    continue
+                self._in_flight.add(code)
+                ready.append(code)
+            if len(self._in_flight) + len(ready) >= self.max_in_flight or not self._heap:
+                wait = None  # 작업이 끝나거나 종목이 추가되면 깨어난다
+            else:
+                wait = max(0.0, self._heap[0][0] - now)
+        return ready, wait
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.clear()
+            ready, wait = self._pop_due(self.clock())
+            if ready:
+                self.engine.submit(ready, self.fetch,
+                                   on_result=self._handle_result,
+                                   on_error=self._handle_error)
+            self._wakeup.wait(60.0 if wait is None else min(wait, 60.0))
+
+    def _done(self, code):
+        with self._lock:
+            self._in_flight.discard(code)
+            entry = self._entries.get(code)
+            if entry is not None:
+                _, importance, _ = entry
+                self._push(code, self._next_due(self.clock(), importance), importance)
+        self._wakeup.set()
+
+    def _handle_result(self, code, data):
+        self._done(code)
+        if self.on_result:
+            self.on_result(code, data)
+
+    def _handle_error(self, code, error):
+        self._done(code)
+        if self.on_error:
+            self.on_error(code, error)
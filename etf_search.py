@@ -0,0 +1,277 @@
+import bisect
+import math
+import re
+
+from etf_table import COLUMN_NAMES
+
+# 테이블 정렬/검색용 색인 (GUI와 무관)
+#
+# 시가총액/보수/수익률은 문자열이라 그대로 정렬하면 "9,000"이 "10,000"보다 뒤로 간다.
+# 그래서 행마다 숫자 정렬 키를 미리 만들어 두고, 이름/운용사/종목코드의 단어를
+# 정렬된 목록에 넣어 접두어(및 초성) 검색을 이분 탐색으로 처리한다.
+
+SEARCH_COLUMNS = ('ETF이름', '자산운용사', '종목코드')
+NUMERIC_SORT_COLUMNS = {'시가총액', '펀드보수', '6개월 수익률', '1년 수익률'}
+
+# 한글 음절의 초성 (유니코드 순서)
+CHOSEONG = 'ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ'
+_CHOSEONG_SET = set(CHOSEONG)
+_HANGUL_START, _HANGUL_END = 0xAC00, 0xD7A3
+# 음절 11172자 -> 초성 변환표 (str.translate로 한 번에 바꾼다). 시작 시간을 줄이려고 처음 쓸 때 만든다
+_choseong_table = None
+
+# 공백으로 나눈 단어 안에서 한글/영문/숫자가 바뀌는 곳도 단어 시작으로 본다
+# ("미국S&P500" -> "미국s&p500", "s&p500", "500")
+_RUN_RE = re.compile(r'[가-힣ㄱ-ㅎ]+|[a-z]+|\d+')
+_MARKET_CAP_RE = re.compile(r'^\s*(?:([\d,]+)\s*조)?\s*([\d,]*)\s*$')
+_PERCENT_CLEAN_RE = re.compile(r'[%,\s]')
+
+
+def choseong(text):
+    """'미국나스닥' -> 'ㅁㄱㄴㅅㄷ' (한글 음절이 아닌 글자는 그대로)"""
+    global _choseong_table
+    if _choseong_table is None:
+        _choseong_table = {code: CHOSEONG[(code - _HANGUL_START) // 588]
+                           for code in range(_HANGUL_START, _HANGUL_END + 1)}
+    return text.translate(_choseong_table)
+
+
+def numeric_key(name, value):
+    """정렬용 숫자. 해석할 수 없으면(N/A 등) NaN
+
+    etf_normalize.parse_market_cap / parse_percent와 같은 규칙을 한 값에 적용한다.
+    """
+    if name == '시가총액':
+        match = _MARKET_CAP_RE.match(value)
+        if not match or not (match.group(1) or match.group(2)):
+            return math.nan
+        jo = int(match.group(1).replace(',', '') or 0) if match.group(1) else 0
+        eok = int(match.group(2).replace(',', '') or 0) if match.group(2) else 0
+        return float(jo * 10000 + eok)
+    try:
+        return float(_PERCENT_CLEAN_RE.sub('', value))
+    except ValueError:
+        return math.nan
+
+
+def _words(text):
+    """검색 대상 문자열에서 접두어로 찾을 수 있는 단어들"""
+    words = set()
+    for part in text.lower().split():
+        words.add(part)
+        for match in _RUN_RE.finditer(part):
+            words.add(part[match.start():])
+    return words
+
+
+def _is_choseong_only(token):
+    return all(ch in _CHOSEONG_SET for ch in token)
+
+
+def _char_match(query, word, word_cho):
+    """글자마다 같거나, 질의 글자가 초성이면 단어 글자의 초성과 같아야 한다 ("미ㄱ" -> "미국")"""
+    if len(query) > len(word):
+        return False
+    for q, w, c in zip(query, word, word_cho):
+        if q != w and not (q in _CHOSEONG_SET and q == c):
+            return False
+    return True
+
+
+class SearchIndex:
+    """ColumnStore 위의 정렬 키 + 접두어/초성 검색 색인
+
+    단어마다 그 단어가 나오는 행 집합(posting)을 두고, 서로 다른 단어만
+    정렬해 둔다. 행 번호는 ColumnStore의 행 번호이다. 행이 바뀌면
+    update_rows, 끝에 추가되면 add_rows, 삭제되거나 전체가 바뀌면 rebuild를 부른다.
+    색인은 처음 검색/정렬할 때 만든다 (데이터를 불러올 때 시간이 들지 않게).
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.rebuild()
+
+    def rebuild(self):
+        self._built = False
+
+    def build(self):
+        """색인이 아직 없으면 만든다 (한가할 때 미리 불러 둘 수 있다)"""
+        if not self._built:
+            self._build()
+
+    def _build(self):
+        self._built = True
+        self._row_words = []    # 행 -> 단어 집합
+        self._postings = {}     # 단어 -> 행 집합
+        self._keys = {name: [] for name in COLUMN_NAMES}
+        self._orders = {}       # 열 이름 -> (값 있는 행의 오름차순, 값 없는 행)
+        cache = {}
+        for row in range(len(self.store)):
+            words = self._index_words(row, cache)
+            self._row_words.append(words)
+            for word in words:
+                rows = self._postings.get(word)
+                if rows is None:
+                    self._postings[word] = {row}
+                else:
+                    rows.add(row)
+            self._append_keys(row)
+        # 정렬된 단어 목록과 (초성, 단어) 목록
+        self._word_keys = sorted(self._postings)
+        cho = sorted((choseong(word), word) for word in self._word_keys)
+        self._cho_keys = [key for key, _ in cho]
+        self._cho_words = [word for _, word in cho]
+
+    def _index_words(self, row, cache=None):
+        words = set()
+        for name in SEARCH_COLUMNS:
+            text = self.store.column(name)[row]
+            found = cache.get(text) if cache is not None else None
+            if found is None:
+                found = _words(text)
+                if cache is not None:
+                    cache[text] = found
+            words |= found
+        return words
+
+    def _append_keys(self, row):
+        for name in COLUMN_NAMES:
+            self._keys[name].append(self._key(name, self.store.column(name)[row]))
+
+    def _key(self, name, value):
+        if name in NUMERIC_SORT_COLUMNS:
+            return numeric_key(name, value)
+        return value.lower()
+
+    def _insert_words(self, row, words):
+        for word in words:
+            rows = self._postings.get(word)
+            if rows is not None:
+                rows.add(row)
+                continue
+            self._postings[word] = {row}
+            bisect.insort(self._word_keys, word)
+            key = choseong(word)
+            i = self._cho_position(key, word)
+            self._cho_keys.insert(i, key)
+            self._cho_words.insert(i, word)
+
+    def _remove_words(self, row, words):
+        for word in words:
+            rows = self._postings[word]
+            rows.discard(row)
+            if rows:
+                continue
+            del self._postings[word]
+            del self._word_keys[bisect.bisect_left(self._word_keys, word)]
+            i = self._cho_position(choseong(word), word)
+            del self._cho_keys[i], self._cho_words[i]
+
+    def _cho_position(self, key, word):
+        """(초성, 단어) 순서로 정렬된 목록에서 들어갈 위치"""
+        lo = bisect.bisect_left(self._cho_keys, key)
+        hi = bisect.bisect_right(self._cho_keys, key, lo)
+        return bisect.bisect_left(self._cho_words, word, lo, hi)
+
+    def add_rows(self, first, last):
+        """저장소 끝에 추가된 행들을 색인에 넣는다 (중간에 끼워 넣었으면 다시 만든다)"""
+        if not self._built:
+            return
+        if first != len(self._row_words):
+            self.rebuild()
+            return
+        for row in range(first, last + 1):
+            words = self._index_words(row)
+            self._row_words.append(words)
+            self._append_keys(row)
+            self._insert_words(row, words)
+        self._orders.clear()
+
+    def update_rows(self, rows):
+        """값이 바뀐 행의 정렬 키와 검색 단어를 다시 계산"""
+        if not self._built:
+            return
+        for row in rows:
+            for name in COLUMN_NAMES:
+                self._keys[name][row] = self._key(name, self.store.column(name)[row])
+            words = self._index_words(row)
+            old = self._row_words[row]
+            if words != old:
+                self._remove_words(row, old - words)
+                self._insert_words(row, words - old)
+                self._row_words[row] = words
+        self._orders.clear()
+
+    # -- 정렬 -----------------------------------------------------------------
+
+    def order(self, name, descending=False):
+        """열 기준으로 정렬한 행 번호 목록. 값이 없는 행(N/A)은 항상 맨 뒤"""
+        self.build()
+        cached = self._orders.get(name)
+        if cached is None:
+            keys = self._keys[name]
+            if name in NUMERIC_SORT_COLUMNS:
+                present = [row for row, key in enumerate(keys) if key == key]  # NaN 제외
+                missing = [row for row, key in enumerate(keys) if key != key]
+            else:
+                present = [row for row, key in enumerate(keys) if key]
+                missing = [row for row, key in enumerate(keys) if not key]
+            present.sort(key=keys.__getitem__)
+            cached = self._orders[name] = (present, missing)
+        present, missing = cached
+        return (present[::-1] if descending else present) + missing
+
+    # -- 검색 -----------------------------------------------------------------
+
+    def _prefix_range(self, keys, prefix):
+        lo = bisect.bisect_left(keys, prefix)
+        return lo, bisect.bisect_left(keys, prefix + '\uffff', lo)
+
+    def _rows_of(self, words):
+        rows = set()
+        for word in words:
+            rows |= self._postings[word]
+        return rows
+
+    def _token_rows(self, token):
+        if _is_choseong_only(token):
+            lo, hi = self._prefix_range(self._cho_keys, token)
+            return self._rows_of(self._cho_words[lo:hi])
+        if not any(ch in _CHOSEONG_SET for ch in token):
+            lo, hi = self._prefix_range(self._word_keys, token)
+            return self._rows_of(self._word_keys[lo:hi])
+        # "미ㄱ"처럼 섞여 있으면 초성 색인으로 후보를 좁힌 뒤 글자 단위로 확인
+        lo, hi = self._prefix_range(self._cho_keys, choseong(token))
+        return self._rows_of(word for key, word in zip(self._cho_keys[lo:hi], self._cho_words[lo:hi])
+                             if _char_match(token, word, key))
+
+    def search(self, query):
+        """공백으로 나눈 모든 단어가 이름/운용사/종목코드 중 어딘가의 접두어인 행 집합
+
+        빈 질의는 None(전체)을 돌려준다.
+        """
+        tokens = query.lower().split()
+        if not tokens:
+            return None
+        self.build()
+        # 결과가 적을 것 같은 긴 단어부터 교집합을 만든다
+        rows = None
+        for token in sorted(set(tokens), key=len, reverse=True):
+            matched = self._token_rows(token)
+            rows = matched if rows is None else rows & matched
+            if not rows:
+                break
+        return rows
+
+    def view(self, query='', sort_column=None, descending=False):
+        """검색 + 정렬을 적용한 행 번호 목록"""
+        matched = self.search(query)
+        if sort_column is None:
+            rows = range(len(self.store))
+        else:
+            rows = self.order(sort_column, descending)
+        if matched is None:
+            return list(rows)
+        if sort_column is None:
+            return sorted(matched)
+        return [row for row in rows if row in matched]
@@ -0,0 +1,491 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from urllib.parse import urlsplit, parse_qsl
+
+# 여러 자리에서 뷰어를 켜도 네이버 수집은 한 곳에서만 하도록 하는 로컬 데이터 서비스.
+#
+# 서비스가 수집/캐시/저장(service.db)을 맡고, 뷰어는 얇은 클라이언트로 붙어서
+# 종목 데이터를 HTTP/JSON으로 받고 갱신 결과는 SSE(server-sent events)로 밀려온다.
+# 같은 종목을 동시에 요청하면 네이버에는 한 번만 요청하고 결과를 나눠 준다.
+#
+#   python etf_service.py --host 0.0.0.0 --port 8770
+#   KOR_ETF_SERVICE_URL=http://192.168.0.10:8770 python main.py
+#
+#   GET  /etf/{code}[?force=1]   종목 하나 (서비스 캐시를 거친다)
+#   GET  /records                서비스가 가진 종목 전체 {"revision", "records"}
+#   POST /refresh                {"codes": [...], "force": false, "wait": false}
+#   GET  /events                 SSE. 값이 바뀐 종목마다 'record' 이벤트
+#   GET  /status                 연결 수, 합친 요청 수, 수집/캐시 지표
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVICE_DB_PATH = os.path.join(SCRIPT_DIR, 'service.db')
+
+DEFAULT_HOST = os.environ.get('KOR_ETF_SERVICE_HOST', '127.0.0.1')
+DEFAULT_PORT = int(os.environ.get('KOR_ETF_SERVICE_PORT', '8770'))
+# 뷰어가 붙을 서비스 주소 (없으면 뷰어가 직접 수집한다)
+SERVICE_URL = os.environ.get('KOR_ETF_SERVICE_URL')
+
+DEFAULT_WORKERS = 8
+HEARTBEAT = 15          # SSE 연결 유지용 주석을 보내는 간격(초)
+EVENT_QUEUE_SIZE = 1000  # 클라이언트가 이만큼 밀리면 끊는다 (다시 붙으면서 /records로 따라잡음)
+PERSIST_DELAY = 0.5      # 결과를 모아서 한 트랜잭션으로 저장하는 간격(초)
+AUTO_CHECK = 30          # 자동 갱신이 오래된 종목을 확인하는 간격(초)
+
+_REASONS = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found',
+            405: 'Method Not Allowed', 502: 'Bad Gateway'}
+
+
+class ServiceStats:
+    """서비스 카운터 (요청, 실제 수집, 합쳐진 요청, 보낸 이벤트)"""
+
+    def __init__(self):
+        self.requests = 0
+        self.upstream = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.events = 0
+        self.dropped_clients = 0
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+class DataService:
+    """수집/캐시/저장을 맡는 asyncio 서비스
+
+    DB와 구독자 목록은 이벤트 루프 스레드에서만 다루고, 페이지 수집/파싱은
+    스레드 풀에서 etf_core.get_etf_data로 한다 (캐시, 요청 제한, 재시도 그대로).
+    """
+
+    def __init__(self, db_path=SERVICE_DB_PATH, workers=DEFAULT_WORKERS, interval=None):
+        self.db_path = db_path
+        self.workers = workers
+        self.interval = interval  # None이면 자동 갱신 안 함
+        self.loop = None
+        self.db = None
+        self.executor = None
+        self.tasks = set()
+        self.records = {}      # 종목코드 -> 마지막으로 보낸 값
+        self.inflight = {}     # 종목코드 -> 진행 중인 수집 Task
+        self.subscribers = set()
+        self.pending = []
+        self.persist_handle = None
+        self.stats = ServiceStats()
+        self.started_at = time.time()
+
+    async def start(self):
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        from etf_db import ETFDatabase
+        self.loop = asyncio.get_running_loop()
+        self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix='etf-service')
+        self.db = ETFDatabase(self.db_path)
+        self.records = {record['종목코드']: record for record in self.db.records()}
+        if self.interval:
+            self.background(self.auto_refresh())
+
+    def background(self, coro):
+        # 돌려줄 곳 없이 도는 작업은 끝날 때까지 참조를 잡아 둔다
+        import asyncio
+        task = asyncio.ensure_future(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def close(self):
+        from etf_cache import default_cache
+        for task in list(self.tasks):
+            task.cancel()
+        for queue in list(self.subscribers):
+            self.disconnect(queue)
+        self.persist()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        default_cache().save()
+        self.db.close()
+
+    # -- 수집 (같은 종목은 합친다) ------------------------------------------------
+
+    async def get(self, code, force=False):
+        """종목 하나. 같은 종목을 받는 중이면 새로 요청하지 않고 그 결과를 같이 기다린다"""
+        import asyncio
+        self.stats.requests += 1
+        task = self.inflight.get(code)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(code, force))
+            self.inflight[code] = task
+            task.add_done_callback(lambda task, code=code: self._fetched(code, task))
+        else:
+            self.stats.coalesced += 1
+        # 기다리던 클라이언트가 끊겨도 수집은 끝까지 해서 다른 클라이언트에게 준다
+        return await asyncio.shield(task)
+
+    def _fetched(self, code, task):
+        self.inflight.pop(code, None)
+        if not task.cancelled():
+            task.exception()  # 기다리던 쪽이 모두 끊겼어도 '처리하지 않은 예외' 경고를 남기지 않게
+
+    async def _fetch(self, code, force):
+        import etf_core
+        self.stats.upstream += 1
+        try:
+            data = await self.loop.run_in_executor(
+                self.executor, lambda: etf_core.get_etf_data(etf_core.item_url(code), force=force))
+        except Exception:
+            self.stats.errors += 1
+            raise
+        self.store(data)
+        return data
+
+    async def refresh(self, codes, force=False):
+        """여러 종목을 받는다. (결과 목록, {종목코드: 오류})"""
+        import asyncio
+        outcomes = await asyncio.gather(*(self.get(code, force) for code in codes),
+                                        return_exceptions=True)
+        results, errors = [], {}
+        for code, outcome in zip(codes, outcomes):
+            if isinstance(outcome, Exception):
+                errors[code] = str(outcome)
+            else:
+                results.append(outcome)
+        return results, errors
+
+    async def auto_refresh(self):
+        """장중에는 주기보다 오래된 종목을, 장이 닫히면 종가 반영 전에 받은 종목만 다시 받는다"""
+        import asyncio
+        from etf_scheduler import stale_codes
+        while True:
+            await asyncio.sleep(AUTO_CHECK)
+            self.persist()
+            codes = stale_codes(list(self.records), self.db.updated_at(), self.interval)
+            if codes:
+                await self.refresh(codes, force=True)
+
+    # -- 저장 / 알림 ------------------------------------------------------------
+
+    def store(self, data):
+        """결과를 저장 대기열에 넣고, 값이 바뀐 종목이면 구독자에게 보낸다"""
+        code = data.get('종목코드')
+        if not code:
+            return
+        self.pending.append(data)
+        if self.persist_handle is None:
+            self.persist_handle = self.loop.call_later(PERSIST_DELAY, self.persist)
+        if self.records.get(code) != data:
+            self.records[code] = data
+            self.publish('record', data)
+
+    def persist(self):
+        from etf_cache import default_cache
+        self.persist_handle = None
+        pending, self.pending = self.pending, []
+        if pending:
+            self.db.upsert(pending, fetched_at=default_cache().fetched_at)
+
+    def publish(self, event, data):
+        message = f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode('utf-8')
+        for queue in list(self.subscribers):
+            if queue.full():
+                # 너무 밀린 클라이언트는 끊는다. 다시 붙을 때 /records로 따라잡는다
+                self.stats.dropped_clients += 1
+                self.disconnect(queue)
+            else:
+                queue.put_nowait(message)
+                self.stats.events += 1
+
+    def disconnect(self, queue):
+        """구독자 하나를 끊는다 (None을 받으면 stream_events가 끝난다)"""
+        self.subscribers.discard(queue)
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    def status(self):
+        from naver_client import default_client
+        from etf_cache import default_cache
+        from etf_metrics import default_metrics
+        return {
+            'uptime': round(time.time() - self.started_at, 1),
+            'records': len(self.records),
+            'clients': len(self.subscribers),
+            'inflight': len(self.inflight),
+            'service': self.stats.as_dict(),
+            'metrics': default_metrics().as_dict({'http': default_client().stats.as_dict(),
+                                                  'cache': default_cache().stats.as_dict()}),
+        }
+
+    # -- HTTP ------------------------------------------------------------------
+
+    async def handle(self, reader, writer):
+        """연결 하나 (keep-alive로 여러 요청을 받는다)"""
+        import asyncio
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, _ = line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length') or 0)
+                body = await reader.readexactly(length) if length else b''
+                url = urlsplit(target)
+                if url.path == '/events' and method == 'GET':
+                    await self.stream_events(writer)
+                    break
+                status, payload = await self.route(method, url.path, dict(parse_qsl(url.query)), body)
+                content = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(content)}\r\n\r\n".encode('latin-1') + content)
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, query, body):
+        from etf_core import _CODE_RE
+        parts = [part for part in path.split('/') if part]
+        if parts[:1] == ['etf'] and len(parts) == 2 and method == 'GET':
+            # 종목코드가 아닌 값으로 네이버에 요청하거나 공유 캐시에 남기지 않는다
+            if not _CODE_RE.match(parts[1]):
+                return 400, {'error': f"종목코드가 아닙니다: {parts[1]}"}
+            try:
+                return 200, await self.get(parts[1], query.get('force') in ('1', 'true'))
+            except Exception as e:
+                return 502, {'error': str(e), 'code': parts[1]}
+        if parts == ['records'] and method == 'GET':
+            return 200, {'revision': self.db.revision(), 'records': list(self.records.values())}
+        if parts == ['refresh'] and method == 'POST':
+            try:
+                request = json.loads(body or b'{}')
+                codes = [str(code) for code in request.get('codes') or list(self.records)]
+            except (ValueError, AttributeError, TypeError) as e:
+                return 400, {'error': str(e)}
+            invalid = [code for code in codes if not _CODE_RE.match(code)]
+            if invalid:
+                return 400, {'error': f"종목코드가 아닙니다: {', '.join(invalid[:10])}"}
+            force = bool(request.get('force'))
+            if request.get('wait'):
+                results, errors = await self.refresh(codes, force)
+                return 200, {'results': results, 'errors': errors}
+            self.background(self.refresh(codes, force))
+            return 202, {'accepted': len(codes)}
+        if parts == ['status'] and method == 'GET':
+            return 200, self.status()
+        if parts and parts[0] in ('etf', 'records', 'refresh', 'status'):
+            return 405, {'error': f"{method} {path}"}
+        return 404, {'error': f"{method} {path}"}
+
+    async def stream_events(self, writer):
+        """SSE: 처음에 'hello'(revision), 그 뒤로 값이 바뀐 종목마다 'record'
+
+        이벤트 하나를 chunk 하나로 보내서 클라이언트가 버퍼를 채울 때까지 기다리지 않게 한다.
+        """
+        import asyncio
+
+        def chunk(message):
+            return f"{len(message):x}\r\n".encode('latin-1') + message + b"\r\n"
+
+        queue = asyncio.Queue(EVENT_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        try:
+            hello = {'revision': self.db.revision(), 'records': len(self.records)}
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream; charset=utf-8\r\n"
+                         b"Cache-Control: no-cache\r\nTransfer-Encoding: chunked\r\n\r\n"
+                         + chunk(f"retry: 3000\n\nevent: hello\ndata: {json.dumps(hello)}\n\n".encode('utf-8')))
+            await writer.drain()
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), HEARTBEAT)
+                except asyncio.TimeoutError:
+                    message = b": ping\n\n"
+                if message is None:
+                    writer.write(b"0\r\n\r\n")
+                    break
+                writer.write(chunk(message))
+                await writer.drain()
+        finally:
+            self.subscribers.discard(queue)
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, db_path=SERVICE_DB_PATH,
+                workers=DEFAULT_WORKERS, interval=None, ready=None):
+    """서비스를 띄우고 끝날 때까지 돈다. ready(server)는 연결을 받을 준비가 되면 불린다"""
+    import asyncio
+    service = DataService(db_path, workers, interval)
+    await service.start()
+    server = await asyncio.start_server(service.handle, host, port)
+    try:
+        if ready is not None:
+            ready(server)
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+class ServiceError(OSError):
+    """서비스가 오류를 돌려줬거나 연결하지 못했다"""
+
+
+class ServiceClient:
+    """뷰어 쪽 얇은 클라이언트 (get_etf_data와 같은 모양으로 쓴다, 스레드 안전)"""
+
+    def __init__(self, url=SERVICE_URL, timeout=(3, 60)):
+        import requests
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        self._stream = None     # events()가 읽고 있는 응답 (close_events로 끊는다)
+
+    def _request(self, method, path, **kwargs):
+        import requests
+        try:
+            response = self.session.request(method, self.url + path, timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            raise ServiceError(f"데이터 서비스에 연결하지 못했습니다: {e}") from e
+        if response.status_code >= 400:
+            try:
+                message = response.json().get('error')
+            except ValueError:
+                message = response.text
+            raise ServiceError(f"{response.status_code} {message}")
+        return response.json()
+
+    def get_etf_data(self, url, force=False, parse_pool=None):
+        """종목 페이지 URL(또는 종목코드)의 ETF 정보. parse_pool은 무시 (파싱은 서비스가 한다)"""
+        from etf_cache import code_from_url
+        code = code_from_url(url) or url
+        return self._request('GET', f"/etf/{code}", params={'force': 1} if force else None)
+
+    def records(self):
+        return self._request('GET', '/records')['records']
+
+    def refresh(self, codes=None, force=False, wait=False):
+        return self._request('POST', '/refresh', json={'codes': codes, 'force': force, 'wait': wait})
+
+    def status(self):
+        return self._request('GET', '/status')
+
+    def events(self):
+        """SSE 이벤트를 (이름, data) 로 하나씩 돌려준다. 연결이 끊기면 ServiceError"""
+        import requests
+        try:
+            with self.session.get(self.url + '/events', stream=True, timeout=(self.timeout[0], HEARTBEAT * 3)) as response:
+                self._stream = response
+                response.raise_for_status()
+                event, data = 'message', []
+                for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                    if line is None:
+                        continue
+                    if not line:
+                        if data:
+                            yield event, json.loads('\n'.join(data))
+                        event, data = 'message', []
+                    elif line.startswith('event:'):
+                        event = line[6:].strip()
+                    elif line.startswith('data:'):
+                        data.append(line[5:].strip())
+        except requests.RequestException as e:
+            raise ServiceError(str(e)) from e
+        finally:
+            self._stream = None
+        raise ServiceError("서비스가 연결을 닫았습니다")
+
+    def close_events(self):
+        """읽고 있는 SSE 연결을 끊는다. 다른 스레드에서 불러도 events()가 바로 ServiceError로 끝난다"""
+        response = self._stream
+        # 읽는 중인 소켓을 close()만 하면 읽기가 끝날 때까지 막히므로 먼저 shutdown한다
+        # (urllib3 2.3 미만에는 없다. 그때는 읽기 제한 시간이 지나야 끝난다)
+        shutdown = getattr(getattr(response, 'raw', None), 'shutdown', None)
+        if shutdown is not None:
+            shutdown()
+            response.close()
+
+    def close(self):
+        self.session.close()
+
+
+class ServiceListener(threading.Thread):
+    """백그라운드에서 SSE를 받아 on_record(data)를 부른다 (끊기면 조금씩 늦춰 가며 다시 붙는다)
+
+    다시 붙을 때마다 /records로 그동안 바뀐 값을 따라잡는다. on_state(연결 여부, 메시지)는
+    연결 상태가 바뀔 때 불린다. 콜백은 이 스레드에서 불리므로 GUI는 시그널로 넘겨야 한다.
+    """
+
+    def __init__(self, client, on_record, on_state=None, max_backoff=30):
+        super().__init__(name='etf-service-listener', daemon=True)
+        self.client = client
+        self.on_record = on_record
+        self.on_state = on_state or (lambda connected, message: None)
+        self.max_backoff = max_backoff
+        self._stopping = threading.Event()
+
+    def stop(self, timeout=None):
+        """멈추라고 알리고 SSE 연결을 끊는다. timeout을 주면 그동안 스레드가 끝나기를 기다린다"""
+        self._stopping.set()
+        self.client.close_events()
+        if timeout is not None and self.is_alive():
+            self.join(timeout)
+
+    def run(self):
+        backoff = 1
+        while not self._stopping.is_set():
+            try:
+                for event, data in self.client.events():
+                    if self._stopping.is_set():
+                        return
+                    if event == 'hello':
+                        backoff = 1
+                        self.on_state(True, f"데이터 서비스 연결됨 ({data['records']}개 종목)")
+                        for record in self.client.records():
+                            self.on_record(record)
+                    elif event == 'record':
+                        self.on_record(data)
+            except (ServiceError, ValueError, KeyError) as e:
+                if self._stopping.is_set():
+                    return
+                self.on_state(False, f"데이터 서비스 연결 끊김, {backoff}초 뒤 다시 연결: {e}")
+            self._stopping.wait(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="여러 뷰어가 같이 쓰는 로컬 데이터 서비스")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="0.0.0.0이면 다른 자리에서도 접속 가능")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--db', default=SERVICE_DB_PATH, help="서비스 저장소 (기본 service.db)")
+    parser.add_argument('-j', '--workers', type=int, default=DEFAULT_WORKERS, help="동시에 수집할 종목 수")
+    parser.add_argument('--interval', type=int, default=None,
+                        help="이 간격(초)으로 서비스가 가진 종목을 자동 갱신 (장중만)")
+    args = parser.parse_args(argv)
+
+    import asyncio
+
+    def ready(server):
+        addresses = ', '.join(f"{sock.getsockname()[0]}:{sock.getsockname()[1]}" for sock in server.sockets)
+        print(f"데이터 서비스 시작: {addresses} (KOR_ETF_SERVICE_URL=http://{args.host}:{args.port})",
+              file=sys.stderr)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.db, args.workers, args.interval, ready))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QPlainTextEdit, QPushButton, QFileDialog, QMessageBox
+from PyQt6.QtCore import QTimer
+from PyQt6.QtGui import QFont
+
+from etf_metrics import STAGES
+
+# 단계별 소요 시간, HTTP/캐시 카운터, 최근 일괄 작업을 보여주는 상태 창
+
+
+def format_report(metrics, extra=None):
+    """Metrics.as_dict() 내용을 고정폭 글꼴용 표 형태의 문자열로"""
+    data = metrics.as_dict(extra)
+    lines = [f"{'단계':<14}{'횟수':>8}{'합계(s)':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'최대(ms)':>10}"]
+    stages = data['stages']
+    for stage in list(STAGES) + sorted(set(stages) - set(STAGES)):
+        h = stages.get(stage)
+        if h is None:
+            continue
+        lines.append(f"{stage:<14}{h['count']:>8}{h['sum']:>10.3f}{h['p50'] * 1000:>10.1f}"
+                     f"{h['p95'] * 1000:>10.1f}{h['max'] * 1000:>10.1f}")
+
+    for group, values in data['extra'].items():
+        lines.append("")
+        lines.append(f"[{group}]")
+        lines += [f"  {key}: {value}" for key, value in values.items()]
+
+    if data['batches']:
+        lines.append("")
+        lines.append("[최근 작업]")
+        for batch in reversed(data['batches'][-10:]):
+            stages = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in batch['stages'].items()
+                               if not stage.startswith('batch_'))
+            lines.append(f"  {batch['name']}: {batch['completed']}/{batch['size']}건 "
+                         f"(실패 {batch['failed']}) {batch['seconds']:.2f}s | {stages}")
+    return "\n".join(lines)
+
+
+class StatusPanel(QDialog):
+    def __init__(self, metrics, extra=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("갱신 상태")
+        self.resize(640, 420)
+        self.metrics = metrics
+        self.extra = extra or (lambda: None)
+
+        layout = QVBoxLayout()
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setFont(QFont("Courier New", 10))
+        layout.addWidget(self.text)
+
+        button_layout = QHBoxLayout()
+        export_button = QPushButton("내보내기")
+        export_button.clicked.connect(self.export)
+        close_button = QPushButton("닫기")
+        close_button.clicked.connect(self.close)
+        button_layout.addWidget(export_button)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+        self.setLayout(layout)
+
+        # 열려 있는 동안 1초마다 갱신
+        self.timer = QTimer(self)
+        self.timer.setInterval(1000)
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        self.refresh()
+        self.timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        self.text.setPlainText(format_report(self.metrics, self.extra()))
+
+    def export(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "지표 내보내기", "kor_etf_metrics.prom",
+            "Prometheus 텍스트 (*.prom *.txt);;JSON (*.json)")
+        if path:
+            self.metrics.export(path, self.extra())
+            QMessageBox.information(self, "성공", f"저장했습니다.\n{path}")
@@ -0,0 +1,177 @@
+import json
+import os
+import sys
+
+# 열 정의: (이름, 정렬, 고정 너비). 너비가 None이면 남는 공간을 채운다.
+COLUMNS = [
+    ('자산운용사', 'left', None),
+    ('ETF이름', 'left', None),
+    ('종목코드', 'center', 70),     # 6자리 정수 + 여유 공간
+    ('시가총액', 'right', 100),     # 10자리 정수 + 여유 공간
+    ('펀드보수', 'right', 100),
+    ('6개월 수익률', 'right', 100),
+    ('1년 수익률', 'right', 100),
+]
+COLUMN_NAMES = [name for name, _, _ in COLUMNS]
+CODE_COLUMN = COLUMN_NAMES.index('종목코드')
+
+# 시작할 때 DB를 읽기 전에 바로 그리는 표 스냅샷 (종료할 때 저장)
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SNAPSHOT_FILE_PATH = os.path.join(SCRIPT_DIR, 'stock.snapshot')
+SNAPSHOT_VERSION = 1
+
+# 값의 종류가 적은 열은 같은 문자열 객체를 공유해서 메모리를 줄인다
+_INTERNED = {'자산운용사', '펀드보수'}
+
+
+class ColumnStore:
+    """ETF 목록을 열 단위 리스트로 보관하는 저장소 (GUI와 무관)
+
+    행마다 dict나 위젯 아이템을 만들지 않고 열마다 하나의 리스트만 둔다.
+    종목코드 -> 행 번호 색인을 함께 유지해서 find/upsert가 O(1)이다.
+    """
+
+    def __init__(self, columns=COLUMN_NAMES):
+        self.columns = list(columns)
+        self._data = {name: [] for name in self.columns}
+        self._rows = {}  # 종목코드 -> 행 번호 (같은 코드가 여럿이면 첫 번째 행)
+
+    def __len__(self):
+        return len(self._data[self.columns[0]])
+
+    @classmethod
+    def from_records(cls, records, columns=COLUMN_NAMES):
+        store = cls(columns)
+        store.extend(records)
+        return store
+
+    @classmethod
+    def from_columns(cls, data, columns=COLUMN_NAMES):
+        """열 이름 -> 값 리스트에서 바로 만든다 (리스트를 복사하지 않음)"""
+        store = cls(columns)
+        store._data = {name: data[name] for name in store.columns}
+        store._reindex()
+        return store
+
+    def _value(self, name, record):
+        value = record.get(name, "")
+        value = "" if value is None else str(value)
+        return sys.intern(value) if name in _INTERNED else value
+
+    def value(self, row, col):
+        return self._data[self.columns[col]][row]
+
+    def column(self, name):
+        return self._data[name]
+
+    def record(self, row):
+        return {name: self._data[name][row] for name in self.columns}
+
+    def records(self):
+        """저장용 dict 목록 (열 순서 유지)"""
+        columns = [self._data[name] for name in self.columns]
+        return [dict(zip(self.columns, values)) for values in zip(*columns)]
+
+    def _reindex(self):
+        self._rows = {}
+        for row, code in enumerate(self._data['종목코드']):
+            self._rows.setdefault(code, row)
+
+    def append(self, record):
+        for name in self.columns:
+            self._data[name].append(self._value(name, record))
+        row = len(self) - 1
+        self._rows.setdefault(self._data['종목코드'][row], row)
+        return row
+
+    def extend(self, records):
+        first = len(self)
+        for name in self.columns:
+            self._data[name].extend(self._value(name, record) for record in records)
+        codes = self._data['종목코드']
+        for row in range(first, len(codes)):
+            self._rows.setdefault(codes[row], row)
+
+    def upsert(self, record):
+        """같은 종목코드의 행이 있으면 바꾸고 없으면 추가. (행 번호, 추가 여부, 바뀐 열) 반환"""
+        row = self.find(self._value('종목코드', record))
+        if row is None:
+            return self.append(record), True, list(range(len(self.columns)))
+        return row, False, self.set_record(row, record)
+
+    def set_record(self, row, record):
+        """record에 있는 열만 바꾸고 실제로 값이 바뀐 열 번호 목록을 반환"""
+        return [col for col, _ in self.replace(row, record)]
+
+    def replace(self, row, record):
+        """set_record와 같지만 바뀐 열마다 (열 번호, 이전 값)을 반환"""
+        changed = []
+        for col, name in enumerate(self.columns):
+            if name in record:
+                value = self._value(name, record)
+                column = self._data[name]
+                old = column[row]
+                if old != value:
+                    column[row] = value
+                    changed.append((col, old))
+        if any(self.columns[col] == '종목코드' for col, _ in changed):
+            self._reindex()
+        return changed
+
+    def remove(self, row, count=1):
+        for name in self.columns:
+            del self._data[name][row:row + count]
+        self._reindex()  # 뒤의 행 번호가 당겨진다
+
+    def clear(self):
+        for name in self.columns:
+            self._data[name].clear()
+        self._rows.clear()
+
+    def find(self, code):
+        return self._rows.get(code)
+
+    def codes(self):
+        return list(self._data['종목코드'])
+
+    def to_dataframe(self):
+        """숫자 열로 변환한 pandas DataFrame (etf_normalize.to_dataframe 참고)"""
+        from etf_normalize import to_dataframe
+        return to_dataframe(self._data)
+
+
+
+def save_snapshot(store, path=SNAPSHOT_FILE_PATH, revision=None):
+    """표를 열 단위 JSON으로 저장한다
+
+    revision은 그때의 stock.db 변경 번호로, 다음 실행 때 DB가 그 사이에
+    바뀌었는지 확인하는 데 쓴다. 행 dict 없이 열 리스트만 두어서 읽고 쓰기가 빠르다.
+    """
+    snapshot = {
+        'version': SNAPSHOT_VERSION,
+        'revision': revision,
+        'columns': list(store.columns),
+        'data': [store.column(name) for name in store.columns],
+    }
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path=SNAPSHOT_FILE_PATH, columns=COLUMN_NAMES):
+    """(ColumnStore, revision). 없거나 형식이 맞지 않으면 (None, None)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None, None
+    if (not isinstance(snapshot, dict) or snapshot.get('version') != SNAPSHOT_VERSION
+            or snapshot.get('columns') != list(columns)):
+        return None, None
+    data = dict(zip(columns, snapshot['data']))
+    if len({len(values) for values in data.values()}) > 1:
+        return None, None
+    for name in _INTERNED & set(columns):
+        data[name] = [sys.intern(value) for value in data[name]]
+    return ColumnStore.from_columns(data, columns), snapshot['revision']
@@ -3,15 +3,35 @@ import json
 import os
 import requests
 from bs4 import BeautifulSoup
-import pandas as pd
 from PyQt6.QtWidgets import QApplication, QMainWindow, QTableWidget, QTableWidgetItem, QVBoxLayout, QHBoxLayout, QWidget, QPushButton, QLineEdit, QHeaderView, QLabel, QMessageBox
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QObject, QTimer, pyqtSignal
 from PyQt6.QtGui import QFont, QIcon
 
 # JSON 파일의 상대 경로 설정
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 JSON_FILE_PATH = os.path.join(SCRIPT_DIR, 'stock.json')
 
+# 로컬 데이터 서비스(../etf_service.py) 주소. 있으면 네이버 대신 서비스에서 받는다
+SERVICE_URL = os.environ.get('KOR_ETF_SERVICE_URL')
+# 서비스 클라이언트/필드 목록은 저장소 루트의 모듈을 같이 쓴다
+ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+# 서비스가 밀어 준 결과가 잇따라 와도 stock.json은 이만큼(ms) 모아서 한 번 쓴다
+SAVE_DELAY = 1000
+
+
+class ServiceSignals(QObject):
+    # 서비스 수신 스레드 -> GUI 스레드
+    record = pyqtSignal(dict)
+
+
+def service_modules():
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+    import etf_service
+    from etf_parser import FIELDS
+    return etf_service, FIELDS
+
+
 class ETFDataViewer(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -72,8 +92,26 @@ class ETFDataViewer(QMainWindow):
         container.setLayout(main_layout)
         self.setCentralWidget(container)
 
+        self.code_rows = {}  # 종목코드 -> 행 번호
         self.load_data_from_json()
 
+        # 데이터 서비스에 붙으면 다른 자리에서 갱신한 값도 표에 바로 반영된다
+        self.service = None
+        self.service_listener = None
+        if SERVICE_URL:
+            etf_service, self.fields = service_modules()
+            self.service = etf_service.ServiceClient(SERVICE_URL)
+            self.save_timer = QTimer(self)
+            self.save_timer.setSingleShot(True)
+            self.save_timer.setInterval(SAVE_DELAY)
+            self.save_timer.timeout.connect(self.save_data_to_json)
+            self.service_signals = ServiceSignals()
+            self.service_signals.record.connect(self.on_service_record)
+            # SSE 연결은 요청용 세션과 따로 둔다
+            self.service_listener = etf_service.ServiceListener(
+                etf_service.ServiceClient(SERVICE_URL), on_record=self.service_signals.record.emit)
+            self.service_listener.start()
+
         # 아이콘 설정
         self.setWindowIcon(QIcon('MyIcon.icns'))
 
@@ -89,6 +127,8 @@ class ETFDataViewer(QMainWindow):
         QMessageBox.information(self, "성공", "데이터 가져오기에 성공했습니다.")
 
     def get_etf_data(self, url):
+        if SERVICE_URL:
+            return self.get_service_data(url)
         response = requests.get(url)
         soup = BeautifulSoup(response.text, 'html.parser')
 
@@ -118,6 +158,38 @@ class ETFDataViewer(QMainWindow):
 
         return data
 
+    def get_service_data(self, url):
+        # 종목코드만 넘기면 서비스가 캐시/수집을 맡는다 (여러 자리에서 같은 종목을 받아도 수집은 한 번)
+        data = self.service.get_etf_data(url.strip())
+        return {key: data.get(key, '') for key in self.fields}
+
+    def index_rows(self):
+        # 종목코드 열(3번째)로 행 번호를 찾아 둔다. 행을 넣거나 뺀 뒤에 다시 만든다
+        self.code_rows = {}
+        for row in range(self.table.rowCount()):
+            item = self.table.item(row, 2)
+            if item is not None:
+                self.code_rows[item.text()] = row
+
+    def on_service_record(self, data):
+        # 표에 있는 종목만 그 행을 고치고, 저장은 잠시 모았다가 한 번에 한다
+        row = self.code_rows.get(data.get('종목코드'))
+        if row is None:
+            return
+        for col, key in enumerate(self.fields):
+            if self.table.item(row, col) is not None:
+                self.table.item(row, col).setText(str(data.get(key, '')))
+        self.save_timer.start()
+
+    def closeEvent(self, event):
+        if self.service is not None:
+            self.service_listener.stop(timeout=2)
+            self.service.close()
+            if self.save_timer.isActive():
+                self.save_timer.stop()
+                self.save_data_to_json()
+        super().closeEvent(event)
+
     def add_data_to_table(self, data):
         if self.table.rowCount() == 0:
             self.table.setColumnCount(len(data))
@@ -134,6 +206,7 @@ class ETFDataViewer(QMainWindow):
                 item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
             self.table.setItem(row_position, col, item)
 
+        self.index_rows()
         self.adjust_table_size()
 
     def adjust_table_size(self):
@@ -183,6 +256,7 @@ class ETFDataViewer(QMainWindow):
                             item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
                         self.table.setItem(row_position, col, item)
 
+                self.index_rows()
                 self.adjust_table_size()
 
     def update_data(self):
@@ -204,6 +278,7 @@ class ETFDataViewer(QMainWindow):
         selected_rows = set(index.row() for index in self.table.selectedIndexes())
         for row in sorted(selected_rows, reverse=True):
             self.table.removeRow(row)
+        self.index_rows()
         self.save_data_to_json()
         QMessageBox.information(self, "성공", "삭제 완료했습니다.")
 
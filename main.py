@@ -1,16 +1,38 @@
-import sys
-import json
+import multiprocessing
 import os
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-from PyQt6.QtWidgets import QApplication, QMainWindow, QTableWidget, QTableWidgetItem, QVBoxLayout, QHBoxLayout, QWidget, QPushButton, QLineEdit, QHeaderView, QLabel, QMessageBox
-from PyQt6.QtCore import Qt, QRect
-from PyQt6.QtGui import QFont, QIcon, QPalette, QColor
-
-# JSON 파일의 상대 경로 설정
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-JSON_FILE_PATH = os.path.join(SCRIPT_DIR, 'stock.json')
+import sys
+from PyQt6.QtWidgets import QApplication, QMainWindow, QTableView, QVBoxLayout, QHBoxLayout, QWidget, QPushButton, QLineEdit, QHeaderView, QLabel, QMessageBox, QProgressBar, QCheckBox, QFileDialog
+from PyQt6.QtCore import Qt, QObject, QTimer, QEvent, pyqtSignal
+from PyQt6.QtGui import QFont, QIcon
+
+import etf_core
+from etf_core import JSON_FILE_PATH, ITEM_URL
+from refresh_engine import RefreshEngine, DEFAULT_MAX_WORKERS
+from naver_client import default_client
+from etf_cache import default_cache, code_from_url
+from etf_model import ETFTableModel, ETFSortFilterModel
+from etf_table import COLUMNS, CODE_COLUMN, SNAPSHOT_FILE_PATH, load_snapshot, save_snapshot
+from etf_db import DB_FILE_PATH, open_database
+from etf_scheduler import RefreshScheduler, DEFAULT_INTERVAL, stale_codes, market_cap_importance
+from etf_search import numeric_key
+from etf_bulk import BulkPrimedFetch, BULK_MIN_TARGETS
+from parse_pool import choose_parse_pool, set_default_parse_pool
+from etf_metrics import default_metrics, RefreshProfiler, PROFILE_PATH
+
+# 창을 띄운 뒤 오래된 종목을 백그라운드에서 한 번 갱신한다 (0이면 끔)
+WARM_REFRESH = os.environ.get('KOR_ETF_WARM_REFRESH', '1') != '0'
+
+# 로컬 데이터 서비스(etf_service.py) 주소. 있으면 직접 수집하지 않고 서비스에 붙는다
+SERVICE_URL = os.environ.get('KOR_ETF_SERVICE_URL')
+
+
+class RefreshSignals(QObject):
+    """워커 스레드의 결과를 GUI 스레드로 전달하는 시그널 모음"""
+    result = pyqtSignal(object, object)
+    error = pyqtSignal(object, str)
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(bool)
+    state = pyqtSignal(bool, str)  # 데이터 서비스 연결 여부, 메시지
 
 
 class ETFDataViewer(QMainWindow):
@@ -47,7 +69,7 @@ class ETFDataViewer(QMainWindow):
 
         input_layout = QHBoxLayout()
         self.url_input = QLineEdit()
-        self.url_input.setPlaceholderText("화면 아래 URL을 입력하고 '틱커명 숫자'만 교체 입력하세요")
+        self.url_input.setPlaceholderText("종목코드나 URL을 입력하세요 (여러 개는 공백/쉼표로 구분, 목록 붙여넣기 가능)")
         self.url_input.returnPressed.connect(self.fetch_data)
         self.url_input.setStyleSheet("""
             QLineEdit {
@@ -64,15 +86,18 @@ class ETFDataViewer(QMainWindow):
         input_layout.addWidget(self.url_input)
 
         button_layout = QHBoxLayout()
-        button_colors = ["#FFB3BA", "#BAFFC9", "#BAE1FF", "#FFFFBA"]  # 파스텔 톤 색상
+        button_colors = ["#FFB3BA", "#BAFFC9", "#BAE1FF", "#FFFFBA", "#D5BAFF", "#FFDFBA"]  # 파스텔 톤 색상
         
         # 버튼 생성
         self.fetch_button = QPushButton("가져오기")
         self.update_button = QPushButton("업데이트")
         self.delete_button = QPushButton("삭제")
         self.clear_button = QPushButton("초기화")
+        self.import_button = QPushButton("파일에서 추가")
+        self.export_button = QPushButton("내보내기")
         
-        buttons = [self.fetch_button, self.update_button, self.delete_button, self.clear_button]
+        buttons = [self.fetch_button, self.update_button, self.delete_button, self.clear_button,
+                   self.import_button, self.export_button]
         
         for button, color in zip(buttons, button_colors):
             button.setStyleSheet(f"""
@@ -95,17 +120,124 @@ class ETFDataViewer(QMainWindow):
         self.update_button.clicked.connect(self.update_data)
         self.delete_button.clicked.connect(self.delete_data)
         self.clear_button.clicked.connect(self.clear_input)
+        self.import_button.clicked.connect(self.import_targets)
+        self.export_button.clicked.connect(self.export_table)
 
         input_layout.addLayout(button_layout)
+
+        # 자동 갱신 (장중에는 주기적으로, 장이 닫히면 다음 개장까지 쉰다)
+        self.auto_refresh_check = QCheckBox("자동 갱신")
+        self.auto_refresh_check.setToolTip(
+            f"장중 약 {DEFAULT_INTERVAL // 60}분마다 오래된 종목부터 백그라운드에서 갱신합니다.")
+        self.auto_refresh_check.toggled.connect(self.toggle_auto_refresh)
+        input_layout.addWidget(self.auto_refresh_check)
+
+        # 단계별 소요 시간/카운터를 보여주는 상태 창
+        self.status_button = QPushButton("상태")
+        self.status_button.setStyleSheet("color: black; background-color: #D3D3D3; border-radius: 10px; padding: 5px;")
+        self.status_button.clicked.connect(self.show_status_panel)
+        input_layout.addWidget(self.status_button)
+        self.status_panel = None
+
+        # 보유 종목의 가중 보수/수익률, 운용사별 비중
+        self.portfolio_button = QPushButton("포트폴리오")
+        self.portfolio_button.setStyleSheet("color: black; background-color: #D3D3D3; border-radius: 10px; padding: 5px;")
+        self.portfolio_button.clicked.connect(self.show_portfolio_panel)
+        input_layout.addWidget(self.portfolio_button)
+        self.portfolio_panel = None
         main_layout.addLayout(input_layout)
 
+        # 진행 상황 표시 (작업 중일 때만 보임)
+        progress_layout = QHBoxLayout()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setFormat("%v / %m")
+        self.cancel_button = QPushButton("취소")
+        self.cancel_button.setStyleSheet("""
+            QPushButton {
+                background-color: #E0BBE4;
+                color: black;
+                border: 2px solid #2c3e50;
+                border-radius: 10px;
+                padding: 5px;
+                font-weight: bold;
+            }
+        """)
+        self.cancel_button.clicked.connect(self.cancel_refresh)
+        progress_layout.addWidget(self.progress_bar)
+        progress_layout.addWidget(self.cancel_button)
+        main_layout.addLayout(progress_layout)
+        self.set_busy(False)
+
+        # 백그라운드 작업 엔진 (GUI 스레드를 막지 않도록 워커 풀에서 실행)
+        self.engine = RefreshEngine(DEFAULT_MAX_WORKERS)
+        self.current_job = None
+        self.job_errors = []
+        self.pending_results = []
+        self.scheduled_results = []  # 자동/시작 갱신 결과 (표에 있는 종목만 고친다)
+        self.job_order = {}
+        # 도착한 결과를 잠깐 모아서 한 번에 표에 반영하는 타이머
+        self.apply_timer = QTimer(self)
+        self.apply_timer.setSingleShot(True)
+        self.apply_timer.setInterval(50)
+        self.apply_timer.timeout.connect(self.apply_pending_results)
+        self.metrics = default_metrics()
+        # KOR_ETF_PROFILE이 지정되어 있으면 첫 번째 작업을 cProfile로 기록한다
+        self.profiler = RefreshProfiler(PROFILE_PATH) if PROFILE_PATH else None
+        self.profile_path = None  # 기록한 cProfile 파일 (상태 표시줄/상태 창에 보여 준다)
+
+        # 자동 갱신 스케줄러와, 그 결과를 모아서 저장하는 타이머
+        self.scheduler = None
+        self.scheduler_signals = RefreshSignals()
+        self.scheduler_signals.result.connect(self.on_scheduled_result)
+        self.scheduler_signals.error.connect(self.on_scheduled_error)
+        self.pending_changes = []
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setInterval(2000)
+        self.flush_timer.timeout.connect(self.flush_pending_changes)
+
+        # 시작 직후 오래된 종목 갱신 (사용자 작업과 따로 돌고 결과는 자동 갱신처럼 반영)
+        self.warm_job = None
+        self.warm_signals = RefreshSignals()
+        self.warm_signals.result.connect(self.on_warm_result)
+        self.warm_signals.error.connect(self.on_scheduled_error)
+        self.warm_signals.finished.connect(self.on_warm_finished)
+
+        # 데이터 서비스에 붙은 경우: 서비스가 밀어 주는 결과도 자동 갱신처럼 반영한다
+        self.service = None
+        self.service_listener = None
+        if SERVICE_URL:
+            from etf_service import ServiceClient
+            self.service = ServiceClient(SERVICE_URL)
+            self.service_signals = RefreshSignals()
+            self.service_signals.result.connect(self.on_scheduled_result)
+            self.service_signals.state.connect(self.on_service_state)
+
         # 간격 추가
         spacer = QWidget()
         spacer.setFixedHeight(10)  # 10픽셀 높이의 빈 공간
         main_layout.addWidget(spacer)
 
-        self.table = QTableWidget()
+        # 검색 (이름/운용사/종목코드의 접두어, 한글 초성도 가능). 입력할 때마다 바로 반영
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("검색: 이름/운용사/종목코드 (예: TIGER 미국, ㅁㄱㄴㅅㄷ)")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.setStyleSheet("border: 1px solid #3498db; border-radius: 8px; padding: 3px; background-color: #2c3e50; color: white;")
+        main_layout.addWidget(self.search_input)
+
+        # 지난번 종료할 때 저장한 스냅샷으로 표를 바로 채운다 (DB는 창이 뜬 뒤에 연다)
+        store, self.snapshot_revision = load_snapshot(SNAPSHOT_FILE_PATH)
+        self.model = ETFTableModel(store)
+        self.proxy = ETFSortFilterModel(self.model)
+        self.search_input.textChanged.connect(self.proxy.set_filter)
+        self.table = QTableView()
+        self.table.setModel(self.proxy)
+        # 머리글을 누르면 정렬 (시가총액/보수/수익률은 숫자 기준, N/A는 맨 뒤)
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.table.setSortingEnabled(True)
+        # 행 높이를 고정해 두면 검색/정렬로 행이 바뀔 때 행마다 높이를 계산하지 않는다
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
         main_layout.addWidget(self.table)
+        self.adjust_table_size()
 
         # 테이블 헤더 스타일 설정
         header_style = """
@@ -140,11 +272,77 @@ class ETFDataViewer(QMainWindow):
         container.setLayout(main_layout)
         self.setCentralWidget(container)
 
-        self.load_data_from_json()
+        self._db = None
+        self.history = None
+        self.alerts = None  # 규칙 알림 (alerts.json이 있을 때만)
+        self.tray = None
 
         # 아이콘 설정
         self.setWindowIcon(QIcon('MyIcon.icns'))
 
+        # DB 확인, 검색 색인, 오래된 종목 갱신은 표를 처음 그린 다음에
+        # (창이 가려져 있어 그리지 않는 경우를 위해 1초 뒤에도 한 번 확인)
+        self.started = False
+        self.table.viewport().installEventFilter(self)
+        QTimer.singleShot(1000, self.finish_startup)
+
+    @property
+    def db(self):
+        # 저장소는 SQLite(stock.db). 처음 실행할 때 stock.json 내용을 옮겨 온다
+        if self._db is None:
+            self._db = open_database(DB_FILE_PATH, JSON_FILE_PATH)
+        return self._db
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint and obj is self.table.viewport():
+            obj.removeEventFilter(self)
+            QTimer.singleShot(0, self.finish_startup)
+        return super().eventFilter(obj, event)
+
+    def finish_startup(self):
+        if self.started:
+            return
+        self.started = True
+        # 스냅샷이 없거나 그 뒤에 DB가 바뀌었으면(CLI 등) DB에서 다시 읽는다
+        if self.snapshot_revision is None or self.snapshot_revision != self.db.revision():
+            self.load_data_from_json()
+        self.load_alerts()
+        QTimer.singleShot(0, self.proxy.search_index.build)
+        if self.service is not None:
+            self.start_service_listener()
+        if WARM_REFRESH:
+            QTimer.singleShot(0, self.warm_refresh)
+
+    def warm_refresh(self):
+        # 장중이면 주기보다 오래된 종목, 장이 닫혀 있으면 종가 반영 전에 받은 종목만 다시 받는다
+        if self.warm_job is not None or default_cache().offline:
+            return
+        codes = stale_codes(self.model.store.codes(), self.db.updated_at())
+        if not codes:
+            return
+        fetch = self.job_fetch(codes)
+        self.warm_count = 0
+        self.warm_batch = self.metrics.begin_batch('warm', len(codes))
+        self.statusBar().showMessage(f"오래된 {len(codes)}개 종목을 갱신하는 중...")
+        self.warm_job = self.engine.submit(
+            [ITEM_URL.format(code=code) for code in codes], fetch,
+            on_result=self.warm_signals.result.emit,
+            on_error=lambda url, error: self.warm_signals.error.emit(code_from_url(url) or url, str(error)),
+            on_finished=self.warm_signals.finished.emit)
+
+    def start_service_listener(self):
+        # SSE 연결은 요청용 세션과 따로 둔다. 밀려온 결과는 모아서 주기적으로 저장
+        from etf_service import ServiceClient, ServiceListener
+        self.service_listener = ServiceListener(
+            ServiceClient(SERVICE_URL),
+            on_record=lambda data: self.service_signals.result.emit(data.get('종목코드'), data),
+            on_state=self.service_signals.state.emit)
+        self.service_listener.start()
+        self.flush_timer.start()
+
+    def on_service_state(self, connected, message):
+        self.statusBar().showMessage(message, 10000 if connected else 0)
+
     def center(self):
         qr = self.frameGeometry()
         cp = self.screen().availableGeometry().center()
@@ -152,142 +350,369 @@ class ETFDataViewer(QMainWindow):
         self.move(qr.topLeft())
 
     def fetch_data(self):
-        url = self.url_input.text()
-        if not url:
-            url = "https://finance.naver.com/item/main.naver?code=459580"
-
-        etf_data = self.get_etf_data(url)
-        self.add_data_to_table(etf_data)
-        self.save_data_to_json()
-        self.url_input.clear()  # URL 입력 필드만 초기화
-        QMessageBox.information(self, "성공", "데이터 가져오기에 성공했습니다.")
-
-    def get_etf_data(self, url):
-        response = requests.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        etf_name = soup.select_one('div.wrap_company h2 a').text.strip()
-        code = soup.select_one('div.description span.code').text.strip()
-
-        market_cap = soup.select_one(
-            'div.first table em#_market_sum').text.strip()
-        market_cap = market_cap.replace('\t', '').replace('\n', '')
+        if self.current_job is not None:
+            return
 
-        fee = soup.select_one('table.tbl_type1 td em').text.strip()
+        # 종목코드/URL 여러 개를 공백, 쉼표, 줄바꿈(CSV 붙여넣기)으로 구분해서 한 번에 받는다
+        text = self.url_input.text()
+        urls = etf_core.parse_targets(text) if text.strip() else [ITEM_URL.format(code="459580")]
+        if not urls:
+            QMessageBox.warning(self, "오류", "종목코드나 URL을 찾지 못했습니다.")
+            return
 
-        asset_manager = soup.select('table.tbl_type1')[
-            1].select('td')[1].text.strip()
-
-        returns = soup.select('div#tab_con1 > div:last-child table tr')
-        six_month_return = returns[2].select_one('td em').text.strip()
-        one_year_return = returns[3].select_one('td em').text.strip()
-
-        data = {
-            '자산운용사': asset_manager,
-            'ETF이름': etf_name,
-            '종목코드': code,
-            '시가총액': market_cap,
-            '펀드보수': fee,
-            '6개월 수익률': six_month_return,
-            '1년 수익률': one_year_return
-        }
-
-        return data
+        self.url_input.clear()  # URL 입력 필드만 초기화
+        self.start_job(urls, self.on_fetch_result, "데이터 가져오기에 성공했습니다.",
+                       self.job_fetch([code_from_url(url) for url in urls], bulk=False), name='fetch')
+
+    def start_job(self, keys, on_result, success_message, fetch=None, name='job'):
+        """keys(URL 목록)를 백그라운드에서 수집하고 결과가 도착하는 대로 반영"""
+        signals = RefreshSignals()
+        signals.result.connect(on_result)
+        signals.error.connect(self.on_job_error)
+        signals.progress.connect(self.on_job_progress)
+        signals.finished.connect(
+            lambda cancelled: self.on_job_finished(cancelled, success_message, signals))
+
+        self.job_signals = signals
+        self.job_errors = []
+        self.job_results = []
+        self.pending_results = []
+        self.job_order = {key: i for i, key in enumerate(keys)}
+        self.job_batch = self.metrics.begin_batch(name, len(keys))
+        fetch = fetch or self.get_etf_data
+        if self.profiler is not None:
+            fetch = self.profiler.wrap(fetch)
+        self.progress_bar.setRange(0, len(keys))
+        self.progress_bar.setValue(0)
+        self.set_busy(True)
+        self.current_job = self.engine.submit(
+            keys, fetch,
+            on_result=signals.result.emit,
+            on_error=lambda key, error: signals.error.emit(key, str(error)),
+            on_progress=signals.progress.emit,
+            on_finished=signals.finished.emit)
+
+    def on_fetch_result(self, url, data):
+        # 결과는 모았다가 한 번에 표에 반영한다 (이미 있는 종목은 그 행을 갱신)
+        self.pending_results.append((url, data))
+        self.job_results.append(data)
+        if not self.apply_timer.isActive():
+            self.apply_timer.start()
+
+    def on_update_result(self, url, data):
+        if self.find_row(data['종목코드']) is not None:
+            self.on_fetch_result(url, data)
+
+    def apply_pending_results(self):
+        # 현재 값과 비교해서 바뀐 셀만 한 번에 고친다 (바뀐 셀은 잠깐 색으로 표시)
+        results, self.pending_results = self.pending_results, []
+        scheduled, self.scheduled_results = self.scheduled_results, []
+        if not results and not scheduled:
+            return
+        with self.metrics.timer('apply'):
+            if results:
+                # 새 종목은 입력한 순서대로 추가되게 한다
+                results.sort(key=lambda item: self.job_order.get(item[0], 0))
+                changed, added = self.model.upsert_records([data for _, data in results])
+                self.check_alerts(changed, added)
+            if scheduled:
+                changed, _ = self.model.upsert_records(scheduled, insert=False)
+                self.check_alerts(changed)
+
+    def load_alerts(self):
+        # 규칙 파일이 있으면 지금 표 값을 기준으로 삼고, 그 뒤로 바뀐 행만 확인한다
+        from etf_alerts import AlertEngine
+        try:
+            self.alerts = AlertEngine.from_file(notify=self.show_alerts)
+        except (OSError, ValueError) as e:
+            self.statusBar().showMessage(f"알림 규칙을 읽지 못했습니다: {e}", 10000)
+            return
+        if self.alerts is not None:
+            self.alerts.seed(self.model.store.records())
+
+    def check_alerts(self, rows, added=0):
+        # 값이 바뀐 행(과 새로 추가된 행)만 넘긴다. 새 행은 기준값으로만 기록된다
+        if self.alerts is None:
+            return
+        store = self.model.store
+        rows = list(rows) + list(range(len(store) - added, len(store)))
+        if rows:
+            self.alerts.evaluate([store.record(row) for row in rows])
+
+    def show_alerts(self, alerts):
+        # 데스크톱 알림 (시스템 트레이를 쓸 수 없으면 상태 표시줄)
+        from PyQt6.QtWidgets import QSystemTrayIcon
+        from etf_alerts import format_alerts
+        text = format_alerts(alerts)
+        if self.tray is None and QSystemTrayIcon.isSystemTrayAvailable():
+            self.tray = QSystemTrayIcon(self.windowIcon(), self)
+            self.tray.show()
+        if self.tray is not None:
+            self.tray.showMessage(f"ETF 알림 {len(alerts)}건", text,
+                                  QSystemTrayIcon.MessageIcon.Information, 10000)
+        else:
+            self.statusBar().showMessage(text.replace('\n', ' | '), 30000)
+
+    def on_job_error(self, url, message):
+        # 실패한 종목은 따로 모아서 보여주고 나머지 종목은 계속 진행한다
+        self.job_errors.append(f"{code_from_url(url) or url}: {message}")
+
+    def on_scheduled_error(self, code, message):
+        self.statusBar().showMessage(f"자동 갱신 실패 {code}: {message}", 10000)
+
+    def on_job_progress(self, completed, total):
+        self.progress_bar.setValue(completed)
+
+    def on_job_finished(self, cancelled, success_message, signals=None):
+        # 지금 작업의 완료 알림만 처리한다 (이전 작업의 늦은 알림으로 새 작업을 놓지 않게)
+        if signals is not None and signals is not self.job_signals:
+            return
+        self.current_job = None
+        self.apply_timer.stop()
+        self.apply_pending_results()
+        self.set_busy(False)
+        self.save_data_to_json(self.job_results)
+        self.record_history(self.job_results)
+        self.sync_scheduler()
+        default_cache().save()
+        self.metrics.end_batch(self.job_batch, len(self.job_results), len(self.job_errors))
+        message = default_client().stats.summary() + " | " + default_cache().stats.summary()
+        if self.profiler is not None:
+            self.profile_path = self.profiler.dump()
+            self.profiler = None  # 한 번만 기록
+            if self.profile_path:
+                message += f" | cProfile 결과: {self.profile_path}"
+        self.statusBar().showMessage(message)
+        if cancelled:
+            QMessageBox.information(self, "취소", "작업을 취소했습니다.")
+        elif self.job_errors:
+            QMessageBox.warning(
+                self, "오류", f"{len(self.job_errors)}건 실패했습니다.\n" + "\n".join(self.job_errors[:10]))
+        else:
+            QMessageBox.information(self, "성공", success_message)
+
+    def toggle_auto_refresh(self, enabled):
+        if enabled:
+            if self.scheduler is None:
+                self.scheduler = RefreshScheduler(
+                    self.engine, self.refresh_code,
+                    on_result=self.scheduler_signals.result.emit,
+                    on_error=lambda code, error: self.scheduler_signals.error.emit(code, str(error)))
+            self.sync_scheduler()
+            self.scheduler.start()
+            self.flush_timer.start()
+        elif self.scheduler is not None:
+            self.scheduler.stop()
+            if self.service_listener is None:
+                self.flush_timer.stop()
+            self.flush_pending_changes()
+
+    def sync_scheduler(self):
+        # 마지막 갱신 시각을 알려 줘서 오래된 종목부터 갱신되게 한다.
+        # 시가총액이 큰 종목과 보유 종목은 더 자주 갱신한다
+        if self.scheduler is not None:
+            store = self.model.store
+            codes = store.codes()
+            market_caps = {code: numeric_key('시가총액', str(value))
+                           for code, value in zip(codes, store.column('시가총액'))}
+            self.scheduler.set_codes(codes, market_cap_importance(market_caps, self.db.holdings()),
+                                     last_refreshed=self.db.updated_at())
+
+    def on_scheduled_result(self, code, data):
+        if self.find_row(data['종목코드']) is not None:
+            self.scheduled_results.append(data)
+            self.pending_changes.append(data)
+            if not self.apply_timer.isActive():
+                self.apply_timer.start()
+
+    def on_warm_result(self, url, data):
+        self.warm_count += 1
+        self.on_scheduled_result(code_from_url(url) or url, data)
+
+    def on_warm_finished(self, cancelled):
+        self.warm_job = None
+        self.flush_pending_changes()
+        self.sync_scheduler()
+        default_cache().save()
+        self.metrics.end_batch(self.warm_batch, self.warm_count)
+        if not cancelled:
+            self.statusBar().showMessage(f"시작 갱신 완료: {self.warm_count}개 종목", 10000)
+
+    def flush_pending_changes(self):
+        self.apply_pending_results()
+        changes, self.pending_changes = self.pending_changes, []
+        if changes:
+            self.save_data_to_json(changes)
+            self.record_history(changes)
+
+    def metrics_extra(self):
+        extra = {'http': default_client().stats.as_dict(), 'cache': default_cache().stats.as_dict()}
+        if self.alerts is not None:
+            extra['alerts'] = self.alerts.stats.as_dict()
+        if self.profile_path:
+            extra['profile'] = {'cProfile': self.profile_path}
+        return extra
+
+    def show_status_panel(self):
+        if self.status_panel is None:
+            from etf_status import StatusPanel
+            self.status_panel = StatusPanel(self.metrics, self.metrics_extra, self)
+        self.status_panel.show()
+        self.status_panel.raise_()
+
+    def show_portfolio_panel(self):
+        if self.portfolio_panel is None:
+            from etf_portfolio_panel import PortfolioPanel
+            try:
+                self.portfolio_panel = PortfolioPanel(self.model, self.db, self.selected_codes, self)
+            except ValueError as e:
+                # 저장된 보유 목록의 금액/비중이 섞여 있다 (etf_portfolio.py --set으로 맞춘다)
+                QMessageBox.warning(self, "오류", f"{e}\netf_portfolio.py --set으로 한 단위로 맞춰 주세요.")
+                return
+        self.portfolio_panel.show()
+        self.portfolio_panel.raise_()
+
+    def selected_codes(self):
+        rows = sorted(set(self.proxy.source_row(index.row())
+                          for index in self.table.selectionModel().selectedIndexes()))
+        return [self.model.store.value(row, CODE_COLUMN) for row in rows]
+
+    def cancel_refresh(self):
+        if self.current_job is not None:
+            self.current_job.cancel()
+
+    def set_busy(self, busy):
+        self.progress_bar.setVisible(busy)
+        self.cancel_button.setVisible(busy)
+        self.fetch_button.setEnabled(not busy)
+        self.import_button.setEnabled(not busy)
+        self.update_button.setEnabled(not busy)
+        self.delete_button.setEnabled(not busy)
+
+    def find_row(self, code):
+        return self.model.store.find(code)
+
+    def get_etf_data(self, url, parse_pool=None):
+        if self.service is not None:
+            return self.service.get_etf_data(url)
+        return etf_core.get_etf_data(url, parse_pool=parse_pool)
+
+    def refresh_code(self, code):
+        # 자동 갱신: 서비스에 붙어 있으면 서비스 캐시를 거친다 (다른 뷰어가 방금 받은 값은 그대로 씀)
+        if self.service is not None:
+            return self.service.get_etf_data(code)
+        return etf_core.refresh_code(code)
+
+    def job_fetch(self, codes, bulk=True):
+        """codes를 수집할 때 엔진에 넘길 함수
+
+        종목이 많으면 ETF 목록 API로 시가총액/이름을 한 번에 받아 캐시를 먼저 채우고(bulk),
+        페이지 파싱은 프로세스 풀에서 해서 GIL을 두고 화면과 다투지 않게 한다.
+        """
+        fetch = self.get_etf_data
+        if self.service is not None:
+            return fetch  # 수집과 파싱은 서비스가 한다
+        parse_pool = choose_parse_pool(len(codes))
+        if parse_pool is not None:
+            fetch = etf_core.PooledFetch(parse_pool, self.get_etf_data)
+        if bulk and len(codes) >= BULK_MIN_TARGETS:
+            fetch = BulkPrimedFetch(fetch, codes)
+        return fetch
 
     def add_data_to_table(self, data):
-        if self.table.rowCount() == 0:
-            self.table.setColumnCount(len(data))
-            self.table.setHorizontalHeaderLabels(data.keys())
-
-        row_position = self.table.rowCount()
-        self.table.insertRow(row_position)
-
-        for col, (key, value) in enumerate(data.items()):
-            item = QTableWidgetItem(str(value))
-            if key == '종목코드':
-                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            elif key in ['시가총액', '펀드보수', '6개월 수익률', '1년 수익률']:
-                item.setTextAlignment(
-                    Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
-            self.table.setItem(row_position, col, item)
-
-        self.adjust_table_size()
+        # 같은 종목코드가 이미 있으면 새 행을 만들지 않고 그 행을 갱신한다
+        self.model.upsert_records([data])
 
     def adjust_table_size(self):
         header = self.table.horizontalHeader()
-        for i in range(self.table.columnCount()):
-            if self.table.horizontalHeaderItem(i).text() == "종목코드":
-                header.setSectionResizeMode(i, QHeaderView.ResizeMode.Fixed)
-                self.table.setColumnWidth(i, 70)  # 6자리 정수 + 여유 공간
-            elif self.table.horizontalHeaderItem(i).text() in ["시가총액", "펀드보수", "6개월 수익률", "1년 수익률"]:
-                header.setSectionResizeMode(i, QHeaderView.ResizeMode.Fixed)
-                self.table.setColumnWidth(i, 100)  # 10자리 정수 + 여유 공간
-            else:
+        for i, (name, align, width) in enumerate(COLUMNS):
+            if width is None:
                 header.setSectionResizeMode(i, QHeaderView.ResizeMode.Stretch)
-
-    def save_data_to_json(self):
-        data = []
-        for row in range(self.table.rowCount()):
-            row_data = {}
-            for col in range(self.table.columnCount()):
-                header_item = self.table.horizontalHeaderItem(col)
-                if header_item is not None:
-                    key = header_item.text()
-                    value = self.table.item(row, col).text() if self.table.item(
-                        row, col) is not None else ""
-                    row_data[key] = value
-            data.append(row_data)
-
-        with open(JSON_FILE_PATH, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+            else:
+                header.setSectionResizeMode(i, QHeaderView.ResizeMode.Fixed)
+                self.table.setColumnWidth(i, width)
+
+    def save_data_to_json(self, changed=(), deleted=()):
+        # 바뀐 행만 한 트랜잭션으로 DB에 기록한다 (stock.json은 종료할 때 내보냄)
+        with self.metrics.timer('persist'):
+            if deleted:
+                self.db.delete(deleted)
+            if changed:
+                self.db.upsert(changed, fetched_at=default_cache().fetched_at)
+
+    def record_history(self, records):
+        # 갱신 결과를 이력 저장소(history/)에 스냅샷으로 덧붙인다
+        if not records:
+            return
+        if self.history is None:
+            from etf_history import SnapshotStore
+            self.history = SnapshotStore()
+        self.history.append(records)
+
+    def export_json(self):
+        with self.metrics.timer('persist'):
+            self.db.export_json(JSON_FILE_PATH)
 
     def load_data_from_json(self):
-        if os.path.exists(JSON_FILE_PATH):
-            with open(JSON_FILE_PATH, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            if data:
-                self.table.setColumnCount(len(data[0]))
-                self.table.setHorizontalHeaderLabels(data[0].keys())
-
-                for row_data in data:
-                    row_position = self.table.rowCount()
-                    self.table.insertRow(row_position)
-                    for col, (key, value) in enumerate(row_data.items()):
-                        item = QTableWidgetItem(str(value))
-                        if key == '종목코드':
-                            item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                        elif key in ['시가총액', '펀드보수', '6개월 수익률', '1년 수익률']:
-                            item.setTextAlignment(
-                                Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
-                        self.table.setItem(row_position, col, item)
-
-                self.adjust_table_size()
+        self.model.set_records(self.db.records())
 
     def update_data(self):
-        for row in range(self.table.rowCount()):
-            code = self.table.item(row, 2).text()  # 종목코드는 3번째 열에 있습니다
-            url = f"https://finance.naver.com/item/main.naver?code={code}"
-            updated_data = self.get_etf_data(url)
-            for col, (key, value) in enumerate(updated_data.items()):
-                item = QTableWidgetItem(str(value))
-                if key == '종목코드':
-                    item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                elif key in ['시가총액', '펀드보수', '6개월 수익률', '1년 수익률']:
-                    item.setTextAlignment(
-                        Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
-                self.table.setItem(row, col, item)
-        self.save_data_to_json()
-        QMessageBox.information(self, "성공", "현재날짜 정보로 업데이트 완료했습니다.")
+        if self.current_job is not None:
+            return
+
+        codes = self.model.store.codes()
+        urls = [ITEM_URL.format(code=code) for code in codes]
+        self.start_job(urls, self.on_update_result, "현재날짜 정보로 업데이트 완료했습니다.",
+                       self.job_fetch(codes), name='update')
+
+    def set_row_data(self, row, data):
+        self.model.set_record(row, data)
 
     def delete_data(self):
-        selected_rows = set(index.row()
-                            for index in self.table.selectedIndexes())
-        for row in sorted(selected_rows, reverse=True):
-            self.table.removeRow(row)
-        self.save_data_to_json()
+        codes = self.selected_codes()
+        self.model.remove_rows([self.find_row(code) for code in codes])
+        self.save_data_to_json(deleted=codes)
+        if self.alerts is not None:
+            self.alerts.forget(codes)
+        self.sync_scheduler()
         QMessageBox.information(self, "성공", "삭제 완료했습니다.")
 
+    def import_targets(self):
+        # CSV/Parquet/Excel/텍스트 파일의 종목 목록을 읽어서 한꺼번에 받는다
+        if self.current_job is not None:
+            return
+        path, _ = QFileDialog.getOpenFileName(
+            self, "종목 목록 불러오기", "", "종목 목록 (*.csv *.txt *.tsv *.parquet *.xlsx)")
+        if not path:
+            return
+        from etf_export import read_targets
+        try:
+            urls = read_targets(path)
+        except (OSError, ValueError, ImportError) as e:
+            QMessageBox.warning(self, "오류", f"파일을 읽지 못했습니다.\n{e}")
+            return
+        if not urls:
+            QMessageBox.warning(self, "오류", "종목코드나 URL을 찾지 못했습니다.")
+            return
+        self.start_job(urls, self.on_fetch_result, f"{len(urls)}개 종목을 가져왔습니다.",
+                       self.job_fetch([code_from_url(url) for url in urls], bulk=False), name='import')
+
+    def export_table(self):
+        # 지금 보이는 표(검색/정렬 적용)를 CSV/Parquet/Excel로 저장
+        path, _ = QFileDialog.getSaveFileName(
+            self, "표 내보내기", "etf.xlsx", "Excel (*.xlsx);;CSV (*.csv);;Parquet (*.parquet)")
+        if not path:
+            return
+        from etf_export import export_records
+        store = self.model.store
+        rows = (store.record(self.proxy.source_row(row)) for row in range(self.proxy.rowCount()))
+        try:
+            count = export_records(path, rows)
+        except (OSError, ValueError, ImportError) as e:
+            QMessageBox.warning(self, "오류", f"저장하지 못했습니다.\n{e}")
+            return
+        QMessageBox.information(self, "성공", f"{count}행을 저장했습니다.")
+
     def clear_input(self):
         self.url_input.clear()
         QMessageBox.information(self, "성공", "초기화 완료했습니다.")
@@ -299,8 +724,31 @@ class ETFDataViewer(QMainWindow):
         new_rgb = [max(0, min(255, c + amount)) for c in rgb]
         return '#{:02x}{:02x}{:02x}'.format(*new_rgb)
 
+    def closeEvent(self, event):
+        # 실행 중인 작업은 취소하고 창을 바로 닫는다
+        if self.scheduler is not None:
+            self.scheduler.stop()
+        if self.current_job is not None:
+            # 표에 이미 반영된 결과는 저장해서 다음 스냅샷과 DB가 어긋나지 않게 한다
+            self.current_job.cancel()
+            self.apply_pending_results()
+            self.save_data_to_json(self.job_results)
+        self.flush_pending_changes()
+        self.engine.shutdown(wait=False)
+        if self.service is not None:
+            if self.service_listener is not None:
+                self.service_listener.stop(timeout=2)
+            self.service.close()
+        set_default_parse_pool(None)
+        self.export_json()
+        save_snapshot(self.model.store, SNAPSHOT_FILE_PATH, self.db.revision())
+        self.db.close()
+        super().closeEvent(event)
+
 
 if __name__ == '__main__':
+    # pyinstaller로 묶은 실행 파일에서 파싱 프로세스 풀이 창을 또 띄우지 않게
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     viewer = ETFDataViewer()
     viewer.show()
@@ -0,0 +1,233 @@
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+from refresh_engine import DEFAULT_MAX_WORKERS
+from resilience import TokenBucket, CircuitBreaker, RetryPolicy, parse_retry_after
+
+# 호스트별 초당 요청 수와 순간 최대 요청 수
+DEFAULT_RATE = float(os.environ.get('KOR_ETF_RATE', '5'))
+DEFAULT_BURST = float(os.environ.get('KOR_ETF_BURST', '10'))
+# (연결, 읽기) 제한 시간(초)
+DEFAULT_TIMEOUT = tuple(float(value) for value in
+                        os.environ.get('KOR_ETF_TIMEOUT', '5,15').split(','))
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (kor_etf viewer)',
+    'Accept': 'text/html,application/xhtml+xml,application/json;q=0.9,*/*;q=0.8',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+
+class FetchStats:
+    """요청 수, 연결 재사용, 절약한 전송량 등 수집 통계"""
+
+    def __init__(self):
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_received = 0   # 실제 네트워크로 받은 바이트 (압축 상태)
+        self.bytes_decoded = 0    # 압축 해제 후 바이트
+        self.bytes_saved = 0      # 압축 + 304 응답으로 받지 않아도 된 바이트
+        self.connections_opened = 0
+        self.connections_reused = 0
+        self.retries = 0
+        self.throttled_seconds = 0.0  # 속도 제한으로 기다린 시간
+        self.failures = 0
+        self.circuit_trips = 0
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    def summary(self):
+        return (f"요청 {self.requests}건 (304: {self.not_modified}건), "
+                f"연결 재사용 {self.connections_reused}/{self.connections_reused + self.connections_opened}, "
+                f"수신 {self.bytes_received / 1024:.0f}KB, 절약 {self.bytes_saved / 1024:.0f}KB, "
+                f"재시도 {self.retries}, 실패 {self.failures}")
+
+
+class NaverClient:
+    """keep-alive 연결 풀과 조건부 GET을 사용하는 공용 HTTP 클라이언트
+
+    ETag/Last-Modified 값을 기억했다가 다음 요청에 If-None-Match/
+    If-Modified-Since로 보내고, 304 응답이면 이전 본문을 그대로 돌려준다.
+    호스트마다 토큰 버킷으로 속도를 제한하고, 429/5xx/연결 오류는 백오프
+    후 재시도하며, 계속 실패하면 회로 차단기가 잠시 요청을 막는다.
+    """
+
+    def __init__(self, pool_size=DEFAULT_MAX_WORKERS, headers=None,
+                 rate=DEFAULT_RATE, burst=DEFAULT_BURST, timeout=DEFAULT_TIMEOUT,
+                 retry=None, failure_threshold=5, reset_timeout=30.0):
+        # requests(urllib3 등)는 불러오는 데 시간이 걸리므로 처음 클라이언트를 만들 때 불러온다
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        self.adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        self.stats = FetchStats()
+        self._validators = {}  # url -> 마지막 200 응답
+        self._lock = threading.Lock()
+        self.rate = rate
+        self.burst = burst
+        self.timeout = timeout
+        self.retry = retry or RetryPolicy()
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._limiters = {}
+        self._breakers = {}
+
+    def _host_state(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._limiters:
+                self._limiters[host] = TokenBucket(self.rate, self.burst)
+                self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self._limiters[host], self._breakers[host]
+
+    def breaker_states(self):
+        with self._lock:
+            return {host: breaker.state for host, breaker in self._breakers.items()}
+
+    def _send(self, url, headers, kwargs):
+        """속도 제한 + 재시도를 거쳐 요청 (회로 차단기 상태도 갱신)"""
+        import requests
+        limiter, breaker = self._host_state(url)
+        breaker.before_request()
+        kwargs.setdefault('timeout', self.timeout)
+        attempt = 0
+        while True:
+            waited = limiter.acquire()
+            retry_after = None
+            try:
+                response = self.session.get(url, headers=headers, **kwargs)
+            except requests.RequestException as e:
+                retryable = isinstance(e, (requests.ConnectionError, requests.Timeout))
+                if not retryable or attempt >= self.retry.max_retries:
+                    self._record_failure(breaker)
+                    raise
+            else:
+                if response.status_code not in RetryPolicy.RETRY_STATUS:
+                    breaker.record_success()
+                    break
+                # 다시 보내거나 오류로 끝낼 응답은 닫는다 (stream=True면 본문을 안 읽은 채 연결을 계속 잡고 있다)
+                response.close()
+                if attempt >= self.retry.max_retries:
+                    self._record_failure(breaker)
+                    response.raise_for_status()
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            with self._lock:
+                self.stats.retries += 1
+                self.stats.throttled_seconds += waited
+            time.sleep(self.retry.delay(attempt, retry_after))
+            attempt += 1
+        with self._lock:
+            self.stats.throttled_seconds += waited
+        return response
+
+    def _record_failure(self, breaker):
+        breaker.record_failure()
+        with self._lock:
+            self.stats.failures += 1
+            self.stats.circuit_trips = sum(b.trips for b in self._breakers.values())
+
+    def get(self, url, **kwargs):
+        with self._lock:
+            cached = self._validators.get(url)
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if cached is not None:
+            if cached.headers.get('ETag'):
+                headers['If-None-Match'] = cached.headers['ETag']
+            if cached.headers.get('Last-Modified'):
+                headers['If-Modified-Since'] = cached.headers['Last-Modified']
+
+        response = self._send(url, headers, kwargs)
+        received = self._wire_bytes(response)
+
+        with self._lock:
+            self.stats.requests += 1
+            self.stats.bytes_received += received
+            if response.status_code == 304 and cached is not None:
+                self.stats.not_modified += 1
+                self.stats.bytes_saved += len(cached.content)
+                response = cached
+            else:
+                decoded = len(response.content)
+                self.stats.bytes_decoded += decoded
+                self.stats.bytes_saved += max(0, decoded - received)
+                if response.status_code == 200 and (
+                        'ETag' in response.headers or 'Last-Modified' in response.headers):
+                    self._validators[url] = response
+            self._update_connection_stats()
+        if response.status_code >= 400:
+            response.raise_for_status()
+        return response
+
+    def open_stream(self, url, **kwargs):
+        """본문을 조금씩 읽을 수 있는 응답을 연다 (with 문으로 닫을 것)
+
+        조건부 GET은 하지 않지만 속도 제한/재시도/회로 차단기는 똑같이 거친다.
+        """
+        headers = dict(kwargs.pop('headers', None) or {})
+        kwargs['stream'] = True
+        response = self._send(url, headers, kwargs)
+        with self._lock:
+            self.stats.requests += 1
+            self._update_connection_stats()
+        if response.status_code >= 400:
+            response.close()
+            response.raise_for_status()
+        return response
+
+    def _wire_bytes(self, response):
+        raw = getattr(response, 'raw', None)
+        try:
+            return int(raw.tell())
+        except (AttributeError, TypeError, ValueError):
+            return int(response.headers.get('Content-Length') or len(response.content))
+
+    def _update_connection_stats(self):
+        opened = requests_made = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened += pool.num_connections
+            requests_made += pool.num_requests
+        self.stats.connections_opened = opened
+        self.stats.connections_reused = max(0, requests_made - opened)
+
+    def close(self):
+        self.session.close()
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def _client_from_env():
+    # KOR_ETF_RECORD / KOR_ETF_REPLAY가 있으면 녹화/재생 클라이언트 (etf_replay.py)
+    if not (os.environ.get('KOR_ETF_RECORD') or os.environ.get('KOR_ETF_REPLAY')):
+        return None
+    from etf_replay import client_from_env
+    return client_from_env()
+
+
+def default_client():
+    """프로그램 전체에서 공유하는 NaverClient"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = _client_from_env() or NaverClient()
+        return _default_client
+
+
+def set_default_client(client):
+    """공유 NaverClient를 바꾼다 (벤치마크/재생 모드 등에서 사용)"""
+    global _default_client
+    with _default_lock:
+        _default_client = client
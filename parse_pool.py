@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+
+from etf_metrics import default_metrics
+
+# 종목 페이지 파싱을 별도 프로세스에서 실행하는 풀.
+#
+# 파싱은 순수 파이썬 CPU 작업이라 수집 스레드를 늘려도 GIL 때문에 코어 하나만 쓴다.
+# 수백 종목을 한꺼번에 갱신할 때는 수집 스레드가 받은 본문(bytes)을 이 풀에 넘기고,
+# 파싱은 여러 프로세스에서 동시에 한다. 결과는 지금처럼 끝나는 순서대로 돌아온다.
+
+# 파싱 프로세스 수 (0이면 풀을 쓰지 않고 수집 스레드에서 파싱)
+DEFAULT_PARSE_WORKERS = int(os.environ.get('KOR_ETF_PARSE_WORKERS', str(os.cpu_count() or 1)))
+
+# 이 개수 이상을 한꺼번에 갱신할 때만 공유 풀을 쓴다 (적으면 프로세스 간 전달 비용이 더 크다)
+PARSE_POOL_MIN_TARGETS = int(os.environ.get('KOR_ETF_PARSE_POOL_MIN', '200'))
+
+
+def _parse(content, content_type, backend):
+    """풀 프로세스에서 실행: (결과 dict, 파싱에 걸린 초)"""
+    from etf_parser import parse_etf_page
+    start = time.perf_counter()
+    data = parse_etf_page(content, content_type, backend)
+    return data, time.perf_counter() - start
+
+
+def _warm_up():
+    import etf_parser  # noqa: F401
+    return os.getpid()
+
+
+class ParsePool:
+    """parse_etf_page를 프로세스 풀에서 실행한다
+
+    프로세스는 처음 쓸 때 만든다. fork 대신 spawn으로 띄우므로 PyQt 창이나
+    수집 스레드가 있는 프로세스에서 써도 안전하고, Windows/macOS와 동작이 같다.
+    여러 스레드에서 동시에 parse/submit을 불러도 된다.
+    """
+
+    def __init__(self, workers=DEFAULT_PARSE_WORKERS, backend=None):
+        if backend:
+            from etf_parser import check_backend
+            check_backend(backend)  # 잘못된 이름은 파싱할 때마다가 아니라 여기서 알린다
+        self.workers = max(1, int(workers))
+        self.backend = backend
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def start(self):
+        """프로세스를 미리 모두 띄우고 파서를 불러 둔다 (첫 갱신이 느려지지 않게)"""
+        executor = self._get_executor()
+        futures = [executor.submit(_warm_up) for _ in range(self.workers)]
+        return sorted({future.result() for future in futures})
+
+    def submit(self, content, content_type=None):
+        """Future를 돌려준다. 결과는 (dict, 파싱 초)"""
+        return self._get_executor().submit(_parse, content, content_type, self.backend)
+
+    def parse(self, content, content_type=None, code=None):
+        """본문을 풀에 넘기고 결과를 기다린다. 파싱 시간은 'parse' 단계로 기록"""
+        data, seconds = self.submit(content, content_type).result()
+        default_metrics().observe('parse', seconds, code)
+        return data
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+_default_pool = None
+_default_lock = threading.Lock()
+
+
+def default_parse_pool():
+    """프로그램 전체에서 공유하는 ParsePool (KOR_ETF_PARSE_WORKERS가 0이면 None)"""
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None and DEFAULT_PARSE_WORKERS > 0:
+            _default_pool = ParsePool(DEFAULT_PARSE_WORKERS)
+        return _default_pool
+
+
+def set_default_parse_pool(pool):
+    """공유 ParsePool을 바꾼다. 이전 풀의 프로세스는 정리한다"""
+    global _default_pool
+    with _default_lock:
+        previous, _default_pool = _default_pool, pool
+    if previous is not None and previous is not pool:
+        previous.shutdown(wait=False)
+
+
+def choose_parse_pool(count, parse_pool=None):
+    """count개를 갱신할 때 쓸 풀
+
+    None이면 종목이 PARSE_POOL_MIN_TARGETS 이상이고 코어가 여러 개일 때만 공유 풀,
+    False면 쓰지 않는다(수집 스레드에서 파싱). ParsePool을 주면 그대로 쓴다.
+    """
+    if parse_pool is False:
+        return None
+    if parse_pool is None:
+        if count < PARSE_POOL_MIN_TARGETS or (os.cpu_count() or 1) < 2:
+            return None
+        return default_parse_pool()
+    return parse_pool
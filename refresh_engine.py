@@ -0,0 +1,131 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# 동시에 실행할 최대 작업 수 (환경변수로 조정 가능)
+DEFAULT_MAX_WORKERS = int(os.environ.get('KOR_ETF_MAX_WORKERS', '8'))
+
+
+class RefreshJob:
+    """여러 종목을 한 번에 처리하는 일괄 작업 핸들"""
+
+    def __init__(self, keys, on_result=None, on_error=None,
+                 on_progress=None, on_finished=None):
+        self._keys = list(keys)
+        self.total = len(self._keys)
+        self.completed = 0
+        self.failed = 0
+        self._futures = []
+        self._lock = threading.Lock()
+        self._cancel_event = threading.Event()
+        self._done_event = threading.Event()
+        self._on_result = on_result
+        self._on_error = on_error
+        self._on_progress = on_progress
+        self._on_finished = on_finished
+        self._on_done = None
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    @property
+    def done(self):
+        return self._done_event.is_set()
+
+    def cancel(self):
+        """아직 시작하지 않은 작업은 취소하고, 실행 중인 작업의 결과는 버린다"""
+        self._cancel_event.set()
+        for future in self._futures:
+            future.cancel()
+
+    def wait(self, timeout=None):
+        return self._done_event.wait(timeout)
+
+    def _run(self, func, key):
+        # 대기열에 있다가 취소된 경우 네트워크 요청을 보내지 않는다
+        if self._cancel_event.is_set():
+            return None
+        return func(key)
+
+    def _task_done(self, key, future):
+        if future.cancelled() or self._cancel_event.is_set():
+            outcome = None
+        else:
+            error = future.exception()
+            outcome = ('error', error) if error is not None else (
+                'result', future.result())
+
+        if outcome is not None:
+            kind, value = outcome
+            if kind == 'result' and self._on_result:
+                self._on_result(key, value)
+            elif kind == 'error':
+                with self._lock:
+                    self.failed += 1
+                if self._on_error:
+                    self._on_error(key, value)
+
+        with self._lock:
+            self.completed += 1
+            completed = self.completed
+        if self._on_progress:
+            self._on_progress(completed, self.total)
+        if completed == self.total:
+            self._finish()
+
+    def _finish(self):
+        self._done_event.set()
+        if self._on_done:
+            self._on_done(self)
+        if self._on_finished:
+            self._on_finished(self.cancelled)
+
+
+class RefreshEngine:
+    """제한된 워커 풀에서 수집/파싱 작업을 실행하는 백그라운드 엔진
+
+    콜백은 워커 스레드에서 호출되므로 GUI에서는 시그널 등으로
+    메인 스레드에 넘겨서 처리해야 한다.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        self.max_workers = max(1, int(max_workers))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix='etf-refresh')
+        self._jobs = set()
+        self._lock = threading.Lock()
+
+    def submit(self, keys, func, on_result=None, on_error=None,
+               on_progress=None, on_finished=None):
+        """keys 각각에 대해 func(key)를 실행하는 작업을 등록한다"""
+        job = RefreshJob(keys, on_result, on_error, on_progress, on_finished)
+        job._on_done = self._forget
+        with self._lock:
+            self._jobs.add(job)
+        if not job.total:
+            # 빈 작업도 워커에서 끝낸다. 여기서 바로 끝내면 호출한 쪽이 job을 받기 전에
+            # on_finished가 불려서, 끝난 작업을 진행 중인 작업으로 잡아 두게 된다
+            self._executor.submit(job._finish)
+        for key in job._keys:
+            future = self._executor.submit(job._run, func, key)
+            job._futures.append(future)
+            future.add_done_callback(
+                lambda f, key=key: job._task_done(key, f))
+        return job
+
+    def _forget(self, job):
+        with self._lock:
+            self._jobs.discard(job)
+
+    def active_jobs(self):
+        with self._lock:
+            return [job for job in self._jobs if not job.done]
+
+    def cancel_all(self):
+        for job in self.active_jobs():
+            job.cancel()
+
+    def shutdown(self, wait=False):
+        self.cancel_all()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
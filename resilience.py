@@ -0,0 +1,110 @@
+import random
+import threading
+import time
+
+# 요청 속도 제한, 재시도, 회로 차단기 (네이버에 차단당하지 않으면서 최대한 빨리 받기 위함)
+
+
+class CircuitOpenError(ConnectionError):
+    """연속 실패로 회로가 열려 있어서 요청을 보내지 않았을 때 발생"""
+
+
+class TokenBucket:
+    """초당 rate개, 최대 burst개까지 모아 둘 수 있는 토큰 버킷 (rate가 0 이하면 제한 없음)"""
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self.tokens = self.burst
+        self.clock = clock
+        self.sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """토큰 하나를 쓸 수 있을 때까지 기다린다. 기다린 시간(초)을 반환"""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(self.clock())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            self.sleep(delay)
+            waited += delay
+
+
+class CircuitBreaker:
+    """failure_threshold번 연속 실패하면 reset_timeout초 동안 요청을 막는다
+
+    시간이 지나면 한 번만 시험 요청을 허용(half-open)하고, 성공하면 다시 닫는다.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self._opened_at + self.reset_timeout - self.clock()
+                if remaining > 0:
+                    raise CircuitOpenError(f"요청 실패가 계속되어 {remaining:.1f}초 동안 요청을 멈춥니다")
+                self.state = self.HALF_OPEN
+                return
+            if self.state == self.HALF_OPEN:
+                raise CircuitOpenError("시험 요청 결과를 기다리는 중입니다")
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                self.state = self.OPEN
+                self._opened_at = self.clock()
+
+
+class RetryPolicy:
+    """429/5xx와 연결 오류를 지수 백오프(full jitter)로 재시도"""
+
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+
+    def __init__(self, max_retries=3, base_delay=0.5, max_delay=10.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt, retry_after=None):
+        """attempt번째(0부터) 재시도 전에 기다릴 시간"""
+        if retry_after is not None:
+            return min(self.max_delay, retry_after)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+def parse_retry_after(value):
+    """Retry-After 헤더(초 단위)를 float로. 해석할 수 없으면 None"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,45 @@
+import pytest
+
+from etf_portfolio import Portfolio, check_units, main
+
+
+def _record(code, fee):
+    return {'종목코드': code, 'ETF이름': f"ETF {code}", '자산운용사': '운용사', '펀드보수': fee,
+            '6개월 수익률': '', '1년 수익률': ''}
+
+
+RECORDS = [_record('111111', '0.10%'), _record('222222', '0.50%')]
+
+
+def test_mixed_holdings_rejected_on_load():
+    holdings = {'111111': {'amount': 5000000.0, 'weight': None},
+                '222222': {'amount': None, 'weight': 30.0}}
+    with pytest.raises(ValueError, match='111111.*222222'):
+        Portfolio(RECORDS, holdings)
+
+
+def test_set_holding_keeps_one_unit():
+    portfolio = Portfolio(RECORDS, {'111111': {'amount': 1000.0, 'weight': None}})
+    with pytest.raises(ValueError):
+        portfolio.set_holding('222222', weight=30.0, record=RECORDS[1])
+    # 거절되면 아무것도 바뀌지 않는다
+    assert '222222' not in portfolio.holdings
+    assert portfolio.summary()['종목 수'] == 1
+
+    portfolio.set_holding('222222', amount=3000.0, record=RECORDS[1])
+    assert portfolio.unit == 'amount'
+    assert portfolio.summary()['펀드보수(%)'] == pytest.approx(0.4)
+
+
+def test_one_unit_is_fine():
+    assert check_units({'111111': {'amount': None, 'weight': 1.0},
+                        '222222': {'amount': None, 'weight': 3.0}}) == 'weight'
+    assert check_units({}) is None
+
+
+def test_cli_refuses_mixed_set(tmp_path, capsys):
+    db = str(tmp_path / 'stock.db')
+    assert not main(['--db', db, '--set', '111111', '--amount', '1000'])
+    with pytest.raises(SystemExit):
+        main(['--db', db, '--set', '222222', '--weight', '30'])
+    assert '금액과 비중' in capsys.readouterr().err
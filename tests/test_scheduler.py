@@ -0,0 +1,28 @@
+import math
+
+from etf_scheduler import RefreshScheduler, market_cap_importance
+
+
+def test_market_cap_importance_tiers():
+    caps = {str(code): float(code) for code in range(10)}
+    caps['unknown'] = math.nan
+    importance = market_cap_importance(caps, held=['0'])
+    assert importance['9'] == 2.0          # 상위 10%
+    assert importance['8'] == importance['7'] == 1.5
+    assert importance['1'] == 1.0
+    assert importance['unknown'] == 1.0
+    assert importance['0'] == 2.0          # 보유 종목
+
+
+def test_set_codes_only_requeues_changed_codes():
+    scheduler = RefreshScheduler(engine=None, fetch=None, clock=lambda: 1000.0)
+    last = {'111111': 500.0, '222222': 600.0}
+    scheduler.set_codes(last, last_refreshed=last)
+    size = len(scheduler._heap)
+    scheduler.set_codes(last, last_refreshed=last)
+    assert len(scheduler._heap) == size
+
+    scheduler.set_codes(last, last_refreshed={**last, '222222': 900.0})
+    assert len(scheduler._heap) == size + 1
+    scheduler.set_codes(last, {'111111': 2.0}, last_refreshed={**last, '222222': 900.0})
+    assert len(scheduler._heap) == size + 2